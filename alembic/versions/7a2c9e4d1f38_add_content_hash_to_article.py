@@ -0,0 +1,60 @@
+"""Add content_hash to article
+
+Revision ID: 7a2c9e4d1f38
+Revises: 5f0d3b8e21c4
+Create Date: 2026-10-17 13:41:09.522187
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2c9e4d1f38'
+down_revision: Union[str, Sequence[str], None] = '5f0d3b8e21c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('articles')}
+    if 'content_hash' not in columns:
+        op.add_column('articles', sa.Column('content_hash', sa.String(length=64), nullable=True))
+        op.create_index(op.f('ix_articles_content_hash'), 'articles', ['content_hash'], unique=False)
+
+    # Hash existing rows in committed batches so a bulk retag right after the
+    # deploy does not re-embed everything; safe to re-run if interrupted.
+    last_id = 0
+    with op.get_context().autocommit_block():
+        while True:
+            rows = bind.execute(
+                sa.text(
+                    "SELECT id, content FROM articles "
+                    "WHERE id > :last_id AND content_hash IS NULL "
+                    "ORDER BY id LIMIT :batch_size"
+                ),
+                {"last_id": last_id, "batch_size": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+            bind.execute(
+                sa.text("UPDATE articles SET content_hash = :value WHERE id = :id"),
+                [
+                    {"id": row_id, "value": hashlib.sha256(content.encode('utf-8')).hexdigest()}
+                    for row_id, content in rows
+                ],
+            )
+            last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_articles_content_hash'), table_name='articles')
+    op.drop_column('articles', 'content_hash')
@@ -0,0 +1,27 @@
+"""Index embedding_cache.created_at for expiry
+
+Revision ID: a3d9c5e17b82
+Revises: f6b3d28a7c41
+Create Date: 2026-10-18 10:04:52.381926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9c5e17b82'
+down_revision: Union[str, Sequence[str], None] = 'f6b3d28a7c41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_embedding_cache_created_at'), 'embedding_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_embedding_cache_created_at'), table_name='embedding_cache')
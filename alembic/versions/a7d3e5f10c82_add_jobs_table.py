@@ -0,0 +1,55 @@
+"""Add jobs table and article embedding_status
+
+Revision ID: a7d3e5f10c82
+Revises: f2c9d81e4b57
+Create Date: 2026-10-17 22:15:52.130964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5f10c82'
+down_revision: Union[str, Sequence[str], None] = 'f2c9d81e4b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_jobs_key'), 'jobs', ['key'], unique=False)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_jobs_run_at'), 'jobs', ['run_at'], unique=False)
+    op.create_index(op.f('ix_jobs_claim_token'), 'jobs', ['claim_token'], unique=False)
+    # Every existing article was embedded synchronously on write
+    op.add_column('articles', sa.Column('embedding_status', sa.String(length=16), server_default='ready', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('articles', 'embedding_status')
+    op.drop_index(op.f('ix_jobs_claim_token'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_run_at'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_key'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
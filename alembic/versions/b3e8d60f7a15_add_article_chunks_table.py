@@ -0,0 +1,43 @@
+"""Add article_chunks table
+
+Revision ID: b3e8d60f7a15
+Revises: 7a2c9e4d1f38
+Create Date: 2026-10-17 15:22:53.180644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8d60f7a15'
+down_revision: Union[str, Sequence[str], None] = '7a2c9e4d1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('article_chunks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('chunk_index', sa.Integer(), nullable=False),
+    sa.Column('start_offset', sa.Integer(), nullable=False),
+    sa.Column('end_offset', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=True),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_article_chunks_id'), 'article_chunks', ['id'], unique=False)
+    op.create_index(op.f('ix_article_chunks_article_id'), 'article_chunks', ['article_id'], unique=False)
+    # Existing articles are chunked with: python -m knowledge_base_app.cli backfill-chunks
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_article_chunks_article_id'), table_name='article_chunks')
+    op.drop_index(op.f('ix_article_chunks_id'), table_name='article_chunks')
+    op.drop_table('article_chunks')
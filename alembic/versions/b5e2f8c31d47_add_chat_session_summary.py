@@ -0,0 +1,30 @@
+"""Add rolling summary to chat sessions
+
+Revision ID: b5e2f8c31d47
+Revises: a7d3e5f10c82
+Create Date: 2026-10-17 23:40:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2f8c31d47'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5f10c82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('summary_through_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'summary_through_id')
+    op.drop_column('chat_sessions', 'summary')
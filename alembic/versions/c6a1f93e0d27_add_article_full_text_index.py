@@ -0,0 +1,56 @@
+"""Add full-text index over article title and content
+
+Revision ID: c6a1f93e0d27
+Revises: b3e8d60f7a15
+Create Date: 2026-10-17 17:08:15.447902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1f93e0d27'
+down_revision: Union[str, Sequence[str], None] = 'b3e8d60f7a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED""")
+        # Build the GIN index without blocking writes
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)")
+        return
+
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, content, content='articles', content_rowid='id')")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""")
+    op.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_articles_search_vector")
+        op.execute("ALTER TABLE articles DROP COLUMN IF EXISTS search_vector")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_update")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_delete")
+    op.execute("DROP TRIGGER IF EXISTS articles_fts_insert")
+    op.execute("DROP TABLE IF EXISTS articles_fts")
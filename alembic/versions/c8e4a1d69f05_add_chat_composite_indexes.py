@@ -0,0 +1,29 @@
+"""Add composite indexes for chat history and session listing
+
+Revision ID: c8e4a1d69f05
+Revises: b5e2f8c31d47
+Create Date: 2026-10-17 23:58:41.207315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e4a1d69f05'
+down_revision: Union[str, Sequence[str], None] = 'b5e2f8c31d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_chat_messages_session_id_created_at', 'chat_messages', ['session_id', 'created_at'], unique=False)
+    op.create_index('ix_chat_sessions_user_id_created_at', 'chat_sessions', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_sessions_user_id_created_at', table_name='chat_sessions')
+    op.drop_index('ix_chat_messages_session_id_created_at', table_name='chat_messages')
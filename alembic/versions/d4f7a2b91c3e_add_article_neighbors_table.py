@@ -0,0 +1,38 @@
+"""Add article_neighbors table
+
+Revision ID: d4f7a2b91c3e
+Revises: c6a1f93e0d27
+Create Date: 2026-10-17 18:41:06.215390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7a2b91c3e'
+down_revision: Union[str, Sequence[str], None] = 'c6a1f93e0d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('article_neighbors',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('neighbor_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['neighbor_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('article_id', 'neighbor_id')
+    )
+    op.create_index(op.f('ix_article_neighbors_neighbor_id'), 'article_neighbors', ['neighbor_id'], unique=False)
+    # Existing articles are linked with: python -m knowledge_base_app.cli rebuild-related
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_article_neighbors_neighbor_id'), table_name='article_neighbors')
+    op.drop_table('article_neighbors')
@@ -0,0 +1,75 @@
+"""Add binary embedding_vector column and migrate JSON embeddings
+
+Revision ID: e41f7c2a9b06
+Revises: d98c5b102dd1
+Create Date: 2026-10-17 09:12:41.302518
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41f7c2a9b06'
+down_revision: Union[str, Sequence[str], None] = 'd98c5b102dd1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows converted per committed batch; small enough that row locks are brief
+BATCH_SIZE = 500
+
+
+def _convert_in_batches(select_sql: str, update_sql: str, convert) -> None:
+    """
+    Walk the table in id order, committing each batch on its own.
+    Only unconverted rows are selected, so an interrupted run can simply be
+    started again and carries on where it stopped.
+    """
+    bind = op.get_bind()
+    last_id = 0
+    with op.get_context().autocommit_block():
+        while True:
+            rows = bind.execute(
+                sa.text(select_sql), {"last_id": last_id, "batch_size": BATCH_SIZE}
+            ).fetchall()
+            if not rows:
+                break
+            bind.execute(
+                sa.text(update_sql),
+                [{"id": row_id, "value": convert(value)} for row_id, value in rows],
+            )
+            last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('articles')}
+    if 'embedding_vector' not in columns:
+        op.add_column('articles', sa.Column('embedding_vector', sa.LargeBinary(), nullable=True))
+
+    _convert_in_batches(
+        "SELECT id, embedding FROM articles "
+        "WHERE id > :last_id AND embedding IS NOT NULL AND embedding_vector IS NULL "
+        "ORDER BY id LIMIT :batch_size",
+        "UPDATE articles SET embedding_vector = :value WHERE id = :id",
+        lambda text: np.asarray(json.loads(text), dtype='<f4').tobytes(),
+    )
+    # The JSON column is left in place for readers still on the old code;
+    # a follow-up migration drops it once the rollout is complete.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows written after the upgrade only have the binary form
+    _convert_in_batches(
+        "SELECT id, embedding_vector FROM articles "
+        "WHERE id > :last_id AND embedding_vector IS NOT NULL AND embedding IS NULL "
+        "ORDER BY id LIMIT :batch_size",
+        "UPDATE articles SET embedding = :value WHERE id = :id",
+        lambda blob: json.dumps(np.frombuffer(blob, dtype='<f4').tolist()),
+    )
+    op.drop_column('articles', 'embedding_vector')
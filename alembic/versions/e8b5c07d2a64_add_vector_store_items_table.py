@@ -0,0 +1,34 @@
+"""Add vector_store_items table
+
+Revision ID: e8b5c07d2a64
+Revises: d4f7a2b91c3e
+Create Date: 2026-10-17 20:12:44.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b5c07d2a64'
+down_revision: Union[str, Sequence[str], None] = 'd4f7a2b91c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vector_store_items',
+    sa.Column('namespace', sa.String(length=32), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('namespace', 'item_id')
+    )
+    # Filled on first startup with SEARCH_INDEX=sql, or with: python -m knowledge_base_app.cli rebuild-index
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vector_store_items')
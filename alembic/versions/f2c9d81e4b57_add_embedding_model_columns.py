@@ -0,0 +1,64 @@
+"""Add embedding_model columns and staged_embeddings table
+
+Revision ID: f2c9d81e4b57
+Revises: e8b5c07d2a64
+Create Date: 2026-10-17 21:03:27.941226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9d81e4b57'
+down_revision: Union[str, Sequence[str], None] = 'e8b5c07d2a64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every vector stored so far came from the model that used to be hardcoded
+LEGACY_MODEL = 'text-embedding-ada-002'
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('articles', sa.Column('embedding_model', sa.String(length=100), nullable=True))
+    op.create_index(op.f('ix_articles_embedding_model'), 'articles', ['embedding_model'], unique=False)
+    op.add_column('article_chunks', sa.Column('embedding_model', sa.String(length=100), nullable=True))
+    op.create_index(op.f('ix_article_chunks_embedding_model'), 'article_chunks', ['embedding_model'], unique=False)
+    op.create_table('staged_embeddings',
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.PrimaryKeyConstraint('kind', 'item_id')
+    )
+
+    # Stamp existing vectors in committed id ranges so no single statement locks the whole table
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for table, has_vector in (
+            ('articles', 'embedding_vector IS NOT NULL OR embedding IS NOT NULL'),
+            ('article_chunks', 'embedding IS NOT NULL'),
+        ):
+            max_id = bind.execute(sa.text(f"SELECT MAX(id) FROM {table}")).scalar() or 0
+            for start in range(0, max_id, BATCH_SIZE):
+                bind.execute(
+                    sa.text(
+                        f"UPDATE {table} SET embedding_model = :model "
+                        f"WHERE id > :start AND id <= :end AND embedding_model IS NULL AND ({has_vector})"
+                    ),
+                    {"model": LEGACY_MODEL, "start": start, "end": start + BATCH_SIZE},
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('staged_embeddings')
+    op.drop_index(op.f('ix_article_chunks_embedding_model'), table_name='article_chunks')
+    op.drop_column('article_chunks', 'embedding_model')
+    op.drop_index(op.f('ix_articles_embedding_model'), table_name='articles')
+    op.drop_column('articles', 'embedding_model')
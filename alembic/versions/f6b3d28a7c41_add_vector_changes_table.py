@@ -0,0 +1,37 @@
+"""Add vector_changes table
+
+Revision ID: f6b3d28a7c41
+Revises: c8e4a1d69f05
+Create Date: 2026-10-18 09:21:37.614205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d28a7c41'
+down_revision: Union[str, Sequence[str], None] = 'c8e4a1d69f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vector_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('namespace', sa.String(length=32), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index(op.f('ix_vector_changes_created_at'), 'vector_changes', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_vector_changes_created_at'), table_name='vector_changes')
+    op.drop_table('vector_changes')
@@ -1,30 +1,147 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+import logging
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from ..schemas.article import ArticleCreate, ArticleRead
+from ..db.session import SessionLocal
+from ..schemas.article import ArticleCreate, ArticleRead, ArticleBulkItemResult, ArticleBulkResult, ChunkSearchResult, SearchMode, RelatedArticle, ArticleBatchSearchRequest, ArticleBatchSearchResult, ArticleSearchHit
 from ..repositories.article import ArticleRepository
+from ..repositories.job import JobRepository
+from ..repositories.neighbor import NeighborRepository
 from ..services.article import ArticleService
 from ..services.search import SearchService
+from ..services.related import RelatedArticlesService
 from ..models.user import User
-from ..core.deps import get_article_service, require_role, get_current_user, get_search_service
+from ..services.embedding_cache import EmbeddingCache
+from ..core.deps import get_article_service, require_role, get_current_user, get_search_service, get_query_embedding_cache, get_related_articles_service, get_vector_index, get_job_repository, EMBEDDING_MODEL_ID
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Upper bound on items per bulk request; larger imports should be split client-side
+BULK_IMPORT_MAX_ITEMS = 10000
+BULK_ITEM_FAILED = "The article could not be stored; please try again."
+
+
+def refresh_related_articles(article_ids: list[int], removed: bool = False) -> None:
+    """
+    Background task: update the related-articles graph after articles were deleted (or written
+    without the job queue; queued embedding jobs refresh the graph themselves).
+    """
+    db = SessionLocal()
+    try:
+        service = RelatedArticlesService(
+            NeighborRepository(db), ArticleRepository(db), get_vector_index(), embedding_model=EMBEDDING_MODEL_ID
+        )
+        for article_id in article_ids:
+            if removed:
+                service.remove(article_id)
+            else:
+                service.refresh(article_id)
+    finally:
+        db.close()
+
+
+def _parse_ndjson_line(line: bytes):
+    """The decoded item, or the decode error to report for that item."""
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return e
 
 
 @router.post("/articles", response_model=ArticleRead)
 def create_article(article: ArticleCreate, service: ArticleService = Depends(get_article_service), current_user = Depends(get_current_user)):
+    """Store the article and queue its embedding; embedding_status turns "ready" once it is searchable."""
     author_id = current_user.id
-    return service.create_article(article, author_id)
+    db_article = service.create_article(article, author_id)
+    return db_article
+
+@router.post("/articles/bulk", response_model=ArticleBulkResult)
+async def bulk_import_articles(request: Request, service: ArticleService = Depends(get_article_service), current_user = Depends(get_current_user)):
+    """
+    Import many articles from a JSON array or NDJSON (application/x-ndjson) body.
+    Each item is reported separately so one bad document does not fail the import.
+    Embedding is queued for the background workers.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(("application/x-ndjson", "application/jsonl")):
+        # Each line is its own item, so a malformed line only fails itself
+        items = [_parse_ndjson_line(line) for line in body.splitlines() if line.strip()]
+    else:
+        try:
+            items = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON lines")
+    if len(items) > BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_IMPORT_MAX_ITEMS} articles per request")
+
+    results: list[ArticleBulkItemResult | None] = [None] * len(items)
+    valid: list[tuple[int, ArticleCreate]] = []
+    for i, item in enumerate(items):
+        if isinstance(item, json.JSONDecodeError):
+            results[i] = ArticleBulkItemResult(index=i, error=f"Invalid JSON: {item}")
+            continue
+        try:
+            valid.append((i, ArticleCreate.model_validate(item)))
+        except ValidationError as e:
+            results[i] = ArticleBulkItemResult(index=i, error=str(e))
+
+    # Inserts are blocking I/O; keep them off the event loop
+    outcomes = await run_in_threadpool(service.bulk_create_articles, [article for _, article in valid], current_user.id)
+    for (i, _), outcome in zip(valid, outcomes):
+        if isinstance(outcome, Exception):
+            # Database and provider errors stay in the log; their text is not for clients
+            logger.error("Bulk import item %d failed", i, exc_info=outcome)
+            results[i] = ArticleBulkItemResult(index=i, error=BULK_ITEM_FAILED)
+        else:
+            results[i] = ArticleBulkItemResult(index=i, id=outcome)
+
+    created = sum(1 for result in results if result.id is not None)
+    return ArticleBulkResult(created=created, failed=len(results) - created, results=results)
 
 @router.get("/articles", response_model=list[ArticleRead])
 def list_articles(skip: int = 0, limit: int = 10, tags: list[str] = Query(None), service: ArticleService = Depends(get_article_service)):
     return service.list_articles(skip=skip, limit=limit, tags=tags)
 
 @router.get("/articles/search", response_model=list[ArticleRead])
-def search_articles(query: str, top_k: int = 5, search_service: SearchService = Depends(get_search_service)):
-    results = search_service.search_articles(query, top_k=top_k)
+def search_articles(
+    query: str,
+    top_k: int = 5,
+    mode: SearchMode = SearchMode.VECTOR,
+    tags: list[str] = Query(None),
+    author_id: int | None = None,
+    search_service: SearchService = Depends(get_search_service),
+):
+    results = search_service.search_articles(query, top_k=top_k, mode=mode, tags=tags, author_id=author_id)
     articles = [article for article, score in results]
     return articles
 
+@router.post("/articles/search/batch", response_model=list[ArticleBatchSearchResult])
+def search_articles_batch(request: ArticleBatchSearchRequest, search_service: SearchService = Depends(get_search_service)):
+    """Run many vector searches with one embedding request and one pass over the index."""
+    results = search_service.search_articles_batch(
+        request.queries, top_k=request.top_k, tags=request.tags, author_id=request.author_id
+    )
+    return [
+        ArticleBatchSearchResult(query=query, hits=[ArticleSearchHit(article=article, score=score) for article, score in hits])
+        for query, hits in zip(request.queries, results)
+    ]
+
+@router.get("/articles/search/chunks", response_model=list[ChunkSearchResult])
+def search_article_chunks(
+    query: str,
+    top_k: int = 5,
+    tags: list[str] = Query(None),
+    author_id: int | None = None,
+    search_service: SearchService = Depends(get_search_service),
+):
+    results = search_service.search_chunks(query, top_k=top_k, tags=tags, author_id=author_id)
+    return [ChunkSearchResult(chunk=chunk, score=score) for chunk, score in results]
+
 @router.get("/articles/{article_id}", response_model=ArticleRead)
 def get_article(article_id: int, service: ArticleService = Depends(get_article_service)):
     db_article = service.get_article(article_id)
@@ -32,6 +149,17 @@ def get_article(article_id: int, service: ArticleService = Depends(get_article_s
         raise HTTPException(status_code=404, detail="Article not found")
     return db_article
 
+@router.get("/articles/{article_id}/related", response_model=list[RelatedArticle])
+def get_related_articles(
+    article_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    service: ArticleService = Depends(get_article_service),
+    related_service: RelatedArticlesService = Depends(get_related_articles_service),
+):
+    if not service.get_article(article_id):
+        raise HTTPException(status_code=404, detail="Article not found")
+    return [RelatedArticle(article=article, score=score) for article, score in related_service.get_related(article_id, limit)]
+
 @router.put("/articles/{article_id}", response_model=ArticleRead)
 def update_article(article_id: int, article: ArticleCreate, service: ArticleService = Depends(get_article_service), current_user = Depends(get_current_user)):
     db_article = service.get_article(article_id)
@@ -45,7 +173,7 @@ def update_article(article_id: int, article: ArticleCreate, service: ArticleServ
     return updated_article
 
 @router.delete("/articles/{article_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_article(article_id: int, service: ArticleService = Depends(get_article_service), current_user = Depends(get_current_user)):
+def delete_article(article_id: int, background_tasks: BackgroundTasks, service: ArticleService = Depends(get_article_service), current_user = Depends(get_current_user)):
     db_article = service.get_article(article_id)
     if not db_article:
         raise HTTPException(status_code=404, detail="Article not found")
@@ -54,8 +182,22 @@ def delete_article(article_id: int, service: ArticleService = Depends(get_articl
     success = service.delete_article(article_id)
     if not success:
         raise HTTPException(status_code=404, detail="Article not found")
+    background_tasks.add_task(refresh_related_articles, [article_id], removed=True)
     return None
 
 @router.get("/admin-only")
 def admin_endpoint(current_user: User = Depends(require_role("admin"))):
     return {"message": "This is an admin-only endpoint."}
+
+@router.get("/admin/embedding-cache")
+def embedding_cache_stats(current_user: User = Depends(require_role("admin")), cache: EmbeddingCache = Depends(get_query_embedding_cache)):
+    return cache.stats()
+
+@router.get("/admin/jobs")
+def job_stats(current_user: User = Depends(require_role("admin")), jobs: JobRepository = Depends(get_job_repository)):
+    """Background job counts per kind and status; "dead" jobs ran out of retries."""
+    return jobs.count_by_status()
+
+@router.post("/admin/jobs/retry-dead")
+def retry_dead_jobs(current_user: User = Depends(require_role("admin")), jobs: JobRepository = Depends(get_job_repository)):
+    return {"requeued": jobs.retry_dead()}
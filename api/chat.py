@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import AsyncIterator
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..schemas.chat import ChatSessionCreate, ChatMessageCreate, ChatSessionRead, ChatMessageRead, ChatRequest, ChatResponse
 from ..services.chat import ChatService
 from ..models.user import User
-from ..core.deps import get_chat_service, get_current_user
+from ..core.deps import get_chat_service, get_current_user, get_db
 import json
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Response header carrying the `before` cursor of the next (older) page, when there is one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
 
 @router.post("/chat/sessions", response_model=ChatSessionRead, status_code=status.HTTP_201_CREATED)
@@ -19,11 +30,18 @@ def create_chat_session(
 
 @router.get("/chat/sessions", response_model=list[ChatSessionRead])
 def list_chat_sessions(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = None,
     chat_service: ChatService = Depends(get_chat_service),
     current_user: User = Depends(get_current_user)
 ):
-    """List all chat sessions for the current user."""
-    return chat_service.list_user_sessions(current_user.id)
+    """List the current user's chat sessions, newest first, a page at a time (pass X-Next-Cursor as before)."""
+    sessions = chat_service.list_user_sessions(current_user.id, limit=limit + 1, before_id=before)
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(sessions[-1].id)
+    return sessions
 
 @router.get("/chat/sessions/{session_id}", response_model=ChatSessionRead)
 def get_chat_session(
@@ -42,30 +60,92 @@ def get_chat_session(
 @router.get("/chat/sessions/{session_id}/messages", response_model=list[ChatMessageRead])
 def get_session_messages(
     session_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: int | None = None,
     chat_service: ChatService = Depends(get_chat_service),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all messages for a specific chat session."""
+    """
+    Get the newest messages of a chat session, oldest first. Earlier pages are
+    fetched by passing the X-Next-Cursor header value as before.
+    """
     session = chat_service.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     if session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this chat session")
-    return chat_service.get_session_messages(session_id)
+    messages = chat_service.get_session_messages(session_id, limit=limit + 1, before_id=before)
+    if len(messages) > limit:
+        messages = messages[1:]
+        response.headers[NEXT_CURSOR_HEADER] = str(messages[0].id)
+    return messages
 
 @router.post("/chat/sessions/{session_id}/messages", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
-def send_message(
+async def send_message(
     session_id: int,
     chat_request: ChatRequest,
     chat_service: ChatService = Depends(get_chat_service),
     current_user: User = Depends(get_current_user)
 ):
     """Send a message and get AI response with RAG."""
-    session = chat_service.get_session(session_id)
+    session = await run_in_threadpool(chat_service.get_session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
     if session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this chat session")
     
-    assistant_message, source_ids = chat_service.send_message(session_id, chat_request.message)
-    return ChatResponse(message=assistant_message, sources=source_ids)
\ No newline at end of file
+    assistant_message, source_ids = await chat_service.send_message(
+        session_id, chat_request.message, tags=chat_request.tags, author_id=chat_request.author_id
+    )
+    return ChatResponse(message=assistant_message, sources=source_ids)
+
+@router.post("/chat/sessions/{session_id}/messages/stream")
+async def stream_message(
+    session_id: int,
+    chat_request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Send a message and stream the AI response as Server-Sent Events: a "sources" event
+    with the article ids, a "token" event per piece of the reply, then "done" with the
+    stored assistant message (or "error" if the model call fails).
+    """
+    session = await run_in_threadpool(chat_service.get_session, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    if session.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this chat session")
+
+    events = chat_service.stream_message(
+        session_id, chat_request.message, tags=chat_request.tags, author_id=chat_request.author_id
+    )
+    return StreamingResponse(
+        _server_sent_events(events, db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _server_sent_events(events: AsyncIterator[tuple[str, object]], db: Session):
+    try:
+        async for event, data in events:
+            if event == "done":
+                data = data.model_dump(mode="json")
+            yield _sse(event, data)
+    except Exception:
+        # Headers are already sent, so the failure can only be reported in the stream
+        logger.exception("Streaming chat response failed")
+        yield _sse("error", {"detail": "The assistant failed to answer; please try again."})
+    finally:
+        # Also runs when the client disconnects: closing the generator stores the partial
+        # reply. The request's session is closed here because it outlives the dependency.
+        with anyio.CancelScope(shield=True):
+            await events.aclose()
+            await anyio.to_thread.run_sync(db.close)
@@ -0,0 +1,68 @@
+"""
+Memory and recall of int8 and binary quantized indexes against exact search.
+
+Run from the directory containing the package:
+
+    python -m knowledge_base_app.benchmarks.quantization_benchmark --sizes 100000 1000000 --dim 1536
+
+Rescoring reads full-precision rows from the generated matrix here; in the
+application they come from the embedding columns, so only the codes count
+towards resident memory.
+"""
+import argparse
+
+import numpy as np
+
+from ..services.quantized_index import QuantizedIndex
+from ..services.vector_index import VectorIndex
+from .search_benchmark import synthetic_embeddings, time_queries, recall
+
+
+def run(size: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    data = synthetic_embeddings(size, args.dim, max(16, size // 500), rng)
+    ids = np.arange(1, size + 1, dtype=np.int64)
+    queries = data[rng.choice(size, args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    def full_vectors(article_ids: list[int]) -> dict[int, np.ndarray]:
+        return {article_id: data[article_id - 1] for article_id in article_ids}
+
+    exact = VectorIndex()
+    exact.build_arrays(ids, data)
+    truth, exact_ms = time_queries(exact, queries, args.top_k)
+    exact_mb = exact.matrix.nbytes / 2**20
+    print(f"\nn={size:,} dim={args.dim} top_k={args.top_k}")
+    print(f"  {'exact float32':<26} {exact_mb:9.1f} MB  recall=1.000  p50={np.percentile(exact_ms, 50):7.2f} ms")
+    del exact
+
+    for mode in QuantizedIndex.MODES:
+        index = QuantizedIndex(mode, full_vectors=full_vectors)
+        index.build_arrays(ids, data)
+        mb = index.nbytes / 2**20
+        for factor in args.rescore_factors:
+            index.rescore_factor = factor
+            found, ms = time_queries(index, queries, args.top_k)
+            label = f"{mode} rescore x{factor}"
+            print(f"  {label:<26} {mb:9.1f} MB  recall={recall(found, truth):.3f}  p50={np.percentile(ms, 50):7.2f} ms")
+        index.full_vectors = None
+        found, ms = time_queries(index, queries, args.top_k)
+        label = f"{mode} no rescore"
+        print(f"  {label:<26} {mb:9.1f} MB  recall={recall(found, truth):.3f}  p50={np.percentile(ms, 50):7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Recall and latency of the IVF index against exact search on synthetic embeddings.
+
+Run from the directory containing the package:
+
+    python -m knowledge_base_app.benchmarks.search_benchmark --sizes 10000 100000 1000000
+
+Vectors are drawn around random cluster centres so that, like real text
+embeddings, they have neighbourhood structure. 1M vectors at --dim 1536 need
+about 6 GB per copy, so the default dimension is smaller.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..services.ivf_index import IVFIndex
+from ..services.vector_index import VectorIndex
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, rng: np.random.Generator, chunk_size: int = 100_000) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    data = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        labels = rng.integers(0, clusters, stop - start)
+        data[start:stop] = centres[labels] + 0.5 * rng.standard_normal((stop - start, dim), dtype=np.float32)
+    return data
+
+
+def time_queries(index, queries: np.ndarray, top_k: int) -> tuple[list[list[int]], np.ndarray]:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, top_k=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([article_id for article_id, _ in hits])
+    return results, np.array(latencies)
+
+
+def recall(approximate: list[list[int]], exact: list[list[int]]) -> float:
+    found = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return found / sum(len(e) for e in exact)
+
+
+def run(size: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    data = synthetic_embeddings(size, args.dim, max(16, size // 500), rng)
+    ids = np.arange(1, size + 1, dtype=np.int64)
+    queries = data[rng.choice(size, args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+    exact = VectorIndex()
+    exact.build_arrays(ids, data)
+    truth, exact_ms = time_queries(exact, queries, args.top_k)
+    print(f"\nn={size:,} dim={args.dim} top_k={args.top_k}")
+    print(f"  {'exact':<24} recall=1.000  p50={np.percentile(exact_ms, 50):7.2f} ms  p99={np.percentile(exact_ms, 99):7.2f} ms")
+    del exact
+
+    nlist = args.nlist or int(4 * np.sqrt(size))
+    ivf = IVFIndex(nlist=nlist, min_train_size=min(size, nlist * 39), seed=args.seed)
+    start = time.perf_counter()
+    ivf.build_arrays(ids, data)
+    print(f"  ivf build nlist={nlist}: {time.perf_counter() - start:.1f} s")
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ivf_ms = time_queries(ivf, queries, args.top_k)
+        label = f"ivf nprobe={nprobe}"
+        print(f"  {label:<24} recall={recall(found, truth):.3f}  p50={np.percentile(ivf_ms, 50):7.2f} ms  p99={np.percentile(ivf_ms, 99):7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=None, help="default: 4 * sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
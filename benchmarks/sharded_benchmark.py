@@ -0,0 +1,60 @@
+"""
+Latency of sharded exact search against the single-threaded exact index.
+
+Run from the directory containing the package:
+
+    OPENBLAS_NUM_THREADS=1 python -m knowledge_base_app.benchmarks.sharded_benchmark --sizes 100000 1000000 --shards 1 2 4 8 16
+
+Pin the BLAS library to one thread (OPENBLAS_NUM_THREADS, MKL_NUM_THREADS)
+as in production workers, otherwise its own threading competes with the
+shards. Results are identical by construction; only latency is reported.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from ..services.sharded_index import ShardedVectorIndex
+from ..services.vector_index import VectorIndex
+from .search_benchmark import synthetic_embeddings, time_queries
+
+
+def run(size: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    data = synthetic_embeddings(size, args.dim, max(16, size // 500), rng)
+    ids = np.arange(1, size + 1, dtype=np.int64)
+    queries = data[rng.choice(size, args.queries, replace=False)]
+
+    exact = VectorIndex()
+    exact.build_arrays(ids, data)
+    truth, exact_ms = time_queries(exact, queries, args.top_k)
+    print(f"\nn={size:,} dim={args.dim} top_k={args.top_k} cores={os.cpu_count()}")
+    print(f"  {'single thread':<14} p50={np.percentile(exact_ms, 50):7.2f} ms  p99={np.percentile(exact_ms, 99):7.2f} ms")
+    del exact
+
+    for shards in args.shards:
+        index = ShardedVectorIndex(shards=shards, min_shard_rows=args.min_shard_rows)
+        index.build_arrays(ids, data)
+        found, ms = time_queries(index, queries, args.top_k)
+        assert found == truth, "sharded search must match exact search"
+        label = f"shards={shards}"
+        speedup = np.percentile(exact_ms, 50) / np.percentile(ms, 50)
+        print(f"  {label:<14} p50={np.percentile(ms, 50):7.2f} ms  p99={np.percentile(ms, 99):7.2f} ms  speedup={speedup:4.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--min-shard-rows", type=int, default=16384)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Maintenance commands, run from the directory containing the package:
+
+    python -m knowledge_base_app.cli backfill-chunks
+    python -m knowledge_base_app.cli rebuild-index
+    python -m knowledge_base_app.cli rebuild-related
+    python -m knowledge_base_app.cli run-jobs
+    python -m knowledge_base_app.cli prune
+    python -m knowledge_base_app.cli reembed --model text-embedding-3-small --dimensions 512
+    python -m knowledge_base_app.cli reembed --model text-embedding-3-small --dimensions 512 --cutover
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from .db.session import SessionLocal
+from .core.deps import (
+    get_embedding_service, get_embedding_cache_repository, article_index, chunk_index, flush_vector_indexes, CHUNK_SIZE, CHUNK_OVERLAP,
+    AZURE_OPENAI_API_BASE, AZURE_OPENAI_API_KEY, EMBEDDING_MODEL_ID, job_workers, get_openai_client,
+    SEARCH_INDEX_SYNC_RETENTION,
+)
+from .repositories.article import ArticleRepository
+from .repositories.chunk import ChunkRepository
+from .repositories.embedding_backfill import EmbeddingBackfillRepository
+from .repositories.neighbor import NeighborRepository
+from .repositories.vector_change import VectorChangeRepository
+from .services.chunk import ChunkService
+from .services.chunking import TextChunker
+from .services.embedding import EmbeddingService, decode_embedding
+from .services.embedding_backfill import EmbeddingBackfillService, RateLimiter
+from .services.related import RelatedArticlesService
+from .services.search import SearchService
+
+
+def backfill_chunks(args: argparse.Namespace) -> None:
+    """Chunk and embed every article that has no chunks yet. Safe to re-run."""
+    db = SessionLocal()
+    try:
+        article_repo = ArticleRepository(db)
+        chunk_service = ChunkService(
+            ChunkRepository(db),
+            get_embedding_service(get_embedding_cache_repository(db)),
+            chunk_index,
+            TextChunker(CHUNK_SIZE, CHUNK_OVERLAP),
+        )
+        last_id, total = 0, 0
+        while True:
+            rows = article_repo.list_without_chunks(after_id=last_id, limit=args.batch_size)
+            if not rows:
+                break
+            chunk_service.index_articles([
+                # A vector from an older model cannot stand in for a chunk embedded now
+                (article_id, content, decode_embedding(vector) if model == EMBEDDING_MODEL_ID else None)
+                for article_id, content, vector, model in rows
+            ])
+            last_id = rows[-1][0]
+            total += len(rows)
+            print(f"chunked {total} articles (last id {last_id})")
+        flush_vector_indexes()
+    finally:
+        db.close()
+
+
+def rebuild_index(args: argparse.Namespace) -> None:
+    """Rebuild the article and chunk indexes from the database (a new generation when SEARCH_INDEX=mmap)."""
+    db = SessionLocal()
+    try:
+        search_service = SearchService(
+            ArticleRepository(db),
+            get_embedding_service(get_embedding_cache_repository(db)),
+            article_index,
+            ChunkRepository(db),
+            chunk_index,
+        )
+        search_service.build_index()
+        search_service.build_chunk_index()
+        print(f"indexed {len(article_index)} articles and {len(chunk_index)} chunks")
+    finally:
+        db.close()
+
+
+def rebuild_related(args: argparse.Namespace) -> None:
+    """Recompute the related-articles graph for every embedded article. Safe to re-run."""
+    db = SessionLocal()
+    try:
+        article_repo = ArticleRepository(db)
+        if not article_index.built:
+            SearchService(article_repo, get_embedding_service(get_embedding_cache_repository(db)), article_index).build_index()
+        service = RelatedArticlesService(NeighborRepository(db), article_repo, article_index, embedding_model=EMBEDDING_MODEL_ID)
+        total = 0
+        for rows in article_repo.iter_embedding_blocks(batch_size=args.batch_size, model=EMBEDDING_MODEL_ID):
+            service.rebuild([article_id for article_id, _, _ in rows])
+            total += len(rows)
+            print(f"linked {total} articles (last id {rows[-1][0]})")
+    finally:
+        db.close()
+
+
+def reembed(args: argparse.Namespace) -> None:
+    """
+    Re-embed the corpus with another model while search keeps serving the current vectors.
+    Resumable: re-running skips everything already staged. With --cutover the staged
+    vectors go live; then set AZURE_OPENAI_EMBEDDING_DEPLOYMENT / EMBEDDING_DIMENSIONS to match, restart,
+    and run rebuild-related.
+    """
+    db = SessionLocal()
+    try:
+        embedding_service = EmbeddingService(
+            api_key=AZURE_OPENAI_API_KEY,
+            azure_endpoint=AZURE_OPENAI_API_BASE,
+            model=args.model,
+            dimensions=args.dimensions,
+            client=get_openai_client(),
+        )
+        service = EmbeddingBackfillService(
+            EmbeddingBackfillRepository(db),
+            ChunkRepository(db),
+            embedding_service,
+            RateLimiter(args.requests_per_minute),
+        )
+        if args.cutover:
+            articles, chunks = service.cutover()
+            print(f"switched {articles} articles and {chunks} chunks to {service.model_id}")
+            return
+        last_id, total = args.after_id, 0
+        while True:
+            article_ids = service.stage_batch(after_id=last_id, limit=args.batch_size)
+            if not article_ids:
+                break
+            last_id = article_ids[-1]
+            total += len(article_ids)
+            print(f"staged {total} articles for {service.model_id} (last id {last_id})")
+    finally:
+        db.close()
+
+
+def run_jobs(args: argparse.Namespace) -> None:
+    """Process background jobs in this process, e.g. a dedicated worker with JOB_WORKERS=0 on the web nodes."""
+    if args.drain:
+        print(f"processed {job_workers.drain()} jobs")
+        flush_vector_indexes()
+        return
+    job_workers.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        job_workers.stop()
+        flush_vector_indexes()
+
+
+def prune(args: argparse.Namespace) -> None:
+    """
+    Drop expired rows: shared query embeddings past EMBEDDING_CACHE_DB_TTL, and the vector
+    change log (running index syncs prune that themselves). Schedule it, e.g. daily from cron.
+    """
+    db = SessionLocal()
+    try:
+        print(f"pruned {get_embedding_cache_repository(db).prune()} cached query embeddings")
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=SEARCH_INDEX_SYNC_RETENTION)
+        print(f"pruned {VectorChangeRepository(db).prune(cutoff)} vector changes")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Knowledge base maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    chunks = commands.add_parser("backfill-chunks", help="create chunks for articles that have none")
+    chunks.add_argument("--batch-size", type=int, default=50)
+    chunks.set_defaults(handler=backfill_chunks)
+
+    rebuild = commands.add_parser("rebuild-index", help="rebuild the vector indexes from stored embeddings")
+    rebuild.set_defaults(handler=rebuild_index)
+
+    related = commands.add_parser("rebuild-related", help="recompute the related-articles graph")
+    related.add_argument("--batch-size", type=int, default=500)
+    related.set_defaults(handler=rebuild_related)
+
+    backfill = commands.add_parser("reembed", help="re-embed articles and chunks with another embedding model")
+    backfill.add_argument("--model", required=True, help="embedding model (Azure deployment) to switch to")
+    backfill.add_argument("--dimensions", type=int, default=None, help="reduced output size, if the model supports it")
+    backfill.add_argument("--batch-size", type=int, default=100)
+    backfill.add_argument("--requests-per-minute", type=float, default=60, help="provider request limit; 0 for none")
+    backfill.add_argument("--after-id", type=int, default=0, help="skip articles up to this id")
+    backfill.add_argument("--cutover", action="store_true", help="make the staged vectors live")
+    backfill.set_defaults(handler=reembed)
+
+    jobs = commands.add_parser("run-jobs", help="run background job workers in the foreground")
+    jobs.add_argument("--drain", action="store_true", help="process every due job once and exit")
+    jobs.set_defaults(handler=run_jobs)
+
+    expire = commands.add_parser("prune", help="drop expired cached query embeddings and vector changes")
+    expire.set_defaults(handler=prune)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 from fastapi import Cookie
 from fastapi.responses import RedirectResponse
 from datetime import datetime, timezone
+import logging
 import os
+import threading
+import numpy as np
 
 from fastapi import Depends, HTTPException, status
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -16,21 +19,283 @@ from ..services.user import UserService
 from ..repositories.session import SessionRepository
 from ..services.session import SessionService
 from ..repositories.article import ArticleRepository
-from ..services.article import ArticleService
+from ..services.article import ArticleService, EMBED_ARTICLE_JOB
+from ..repositories.job import JobRepository
+from ..services.jobs import JobWorkerPool
 from ..services.comment import CommentService
 from ..repositories.comment import CommentRepository
-from ..services.embedding import EmbeddingService
+from ..services.embedding import DEFAULT_EMBEDDING_MODEL, EmbeddingService, decode_embedding, embedding_model_id
+from ..services.embedding_cache import EmbeddingCache
+from ..repositories.embedding_cache import EmbeddingCacheRepository
 from ..services.search import SearchService
+from ..services.vector_index import VectorIndex
+from ..services.ivf_index import IVFIndex
+from ..services.sharded_index import ShardedVectorIndex
+from ..services.index_sync import IndexSync
+from ..services.mmap_index import MappedVectorIndex
+from ..services.quantized_index import QuantizedIndex
+from ..services.vector_store import SqlVectorStore, VectorStore
+from ..repositories.chunk import ChunkRepository
+from ..services.chunk import ChunkService
+from ..services.chunking import TextChunker
+from ..repositories.neighbor import NeighborRepository
+from ..services.related import RelatedArticlesService
 from ..repositories.chat import ChatRepository
 from ..services.chat import ChatService
+from ..services.chat_summary import SUMMARIZE_CHAT_JOB, ChatSummaryService, summary_job_key
+from ..services.context_builder import ContextBuilder, TokenCounter
+from ..services.openai_client import AsyncOpenAIClient, OpenAIClient, create_async_openai_client, create_openai_client
+from ..services.local_provider import LOCAL_EMBEDDING_MODEL, AsyncLocalOpenAIClient, LocalOpenAIClient
 
 # Load from environment variables
 AZURE_OPENAI_API_BASE = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 
-if not AZURE_OPENAI_API_BASE or not AZURE_OPENAI_API_KEY:
+# "azure" calls Azure OpenAI; "local" answers offline (hash-seeded embeddings, canned or
+# echoed chat) so search and chat can be benchmarked without network access or cost
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "azure")
+if LLM_PROVIDER not in ("azure", "local"):
+    raise EnvironmentError(f"Unknown LLM_PROVIDER {LLM_PROVIDER!r}; expected 'azure' or 'local'.")
+
+if LLM_PROVIDER == "azure" and (not AZURE_OPENAI_API_BASE or not AZURE_OPENAI_API_KEY):
     raise EnvironmentError("AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY must be set in environment variables.")
 
+# Local provider: embedding size when EMBEDDING_DIMENSIONS is unset, fixed chat reply
+# (unset: echo the question) and artificial latency per call in milliseconds
+LOCAL_EMBEDDING_DIMENSIONS = int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "1536"))
+LOCAL_CHAT_RESPONSE = os.getenv("LOCAL_CHAT_RESPONSE")
+LOCAL_EMBEDDING_LATENCY_MS = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+LOCAL_CHAT_LATENCY_MS = float(os.getenv("LOCAL_CHAT_LATENCY_MS", "0"))
+
+# Connection pool of the process-wide Azure OpenAI client shared by embeddings and chat
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))  # idle connections kept open
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))  # seconds an idle connection is kept
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Embedding model (Azure deployment name) and optional reduced output size for models that
+# support it; stored vectors record the model id and are only compared with the same model.
+# Local vectors get their own model id so they never mix with real ones.
+EMBEDDING_MODEL = (
+    LOCAL_EMBEDDING_MODEL if LLM_PROVIDER == "local"
+    else os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", DEFAULT_EMBEDDING_MODEL)
+)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None  # 0: the model's full size
+EMBEDDING_MODEL_ID = embedding_model_id(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+
+# Search index: "exact" scans every vector, "ivf" probes the closest k-means buckets,
+# "mmap" scans every vector from a file shared by all workers on the host,
+# "int8"/"binary" scan compressed codes and rescore the best with stored vectors,
+# "sql" keeps vectors as blobs in the database and streams them for every query
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "exact")
+SEARCH_SHARDS = int(os.getenv("SEARCH_SHARDS", "1"))  # >1 scores exact search on that many threads
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "32"))
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "./search_index")
+SEARCH_INDEX_FLUSH_DELAY = float(os.getenv("SEARCH_INDEX_FLUSH_DELAY", "2.0"))
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "0")) or None  # 0: per-mode default
+
+def load_article_vectors(article_ids: list[int]) -> dict[int, np.ndarray]:
+    """Full-precision article vectors for rescoring quantized search results."""
+    db = SessionLocal()
+    try:
+        rows = ArticleRepository(db).list_embeddings_for(article_ids, model=EMBEDDING_MODEL_ID)
+    finally:
+        db.close()
+    return {article_id: decode_embedding(vector if vector is not None else legacy_json) for article_id, vector, legacy_json in rows}
+
+def load_chunk_vectors(chunk_ids: list[int]) -> dict[int, np.ndarray]:
+    """Full-precision chunk vectors for rescoring quantized search results."""
+    db = SessionLocal()
+    try:
+        rows = ChunkRepository(db).list_embeddings_for(chunk_ids, model=EMBEDDING_MODEL_ID)
+    finally:
+        db.close()
+    return {chunk_id: decode_embedding(vector) for chunk_id, vector in rows}
+
+VECTOR_LOADERS = {"articles": load_article_vectors, "chunks": load_chunk_vectors}
+
+def create_vector_index(name: str) -> VectorStore:
+    if SEARCH_INDEX == "exact":
+        return ShardedVectorIndex(shards=SEARCH_SHARDS) if SEARCH_SHARDS > 1 else VectorIndex()
+    if SEARCH_INDEX == "ivf":
+        return IVFIndex(nlist=IVF_NLIST, nprobe=IVF_NPROBE)
+    if SEARCH_INDEX == "mmap":
+        return MappedVectorIndex(os.path.join(SEARCH_INDEX_DIR, f"{name}.idx"), flush_delay=SEARCH_INDEX_FLUSH_DELAY)
+    if SEARCH_INDEX in QuantizedIndex.MODES:
+        return QuantizedIndex(SEARCH_INDEX, full_vectors=VECTOR_LOADERS[name], rescore_factor=QUANTIZED_RESCORE_FACTOR)
+    if SEARCH_INDEX == "sql":
+        return SqlVectorStore(SessionLocal, name)
+    raise EnvironmentError(f"Unknown SEARCH_INDEX {SEARCH_INDEX!r}; expected 'exact', 'ivf', 'mmap', 'int8', 'binary' or 'sql'.")
+
+def flush_vector_indexes() -> None:
+    """Write out pending changes of file-backed indexes, e.g. before the process exits."""
+    for index in (article_index, chunk_index):
+        if isinstance(index, MappedVectorIndex):
+            index.flush()
+
+# Process-wide LRU of query embeddings; the embedding_cache table is the shared second tier
+query_embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL", "3600")),
+)
+EMBEDDING_CACHE_DB_TTL = float(os.getenv("EMBEDDING_CACHE_DB_TTL", "604800"))  # seconds a shared-tier entry is served
+
+# Process-wide index of article embeddings, warmed at startup and kept current by ArticleService
+article_index = create_vector_index("articles")
+
+# Passage-level retrieval: articles are split into overlapping character windows
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+chunk_index = create_vector_index("chunks")
+
+# In-memory indexes only see this process's writes; embeddings stored by other processes
+# (cli run-jobs, sibling web workers) are polled from the vector_changes log every interval (0: never),
+# which keeps the last SEARCH_INDEX_SYNC_RETENTION seconds of changes
+SEARCH_INDEX_SYNC_INTERVAL = float(os.getenv("SEARCH_INDEX_SYNC_INTERVAL", "5"))
+SEARCH_INDEX_SYNC_RETENTION = float(os.getenv("SEARCH_INDEX_SYNC_RETENTION", "86400"))
+index_syncs = [] if SEARCH_INDEX in ("mmap", "sql") or not SEARCH_INDEX_SYNC_INTERVAL else [
+    IndexSync(article_index, "articles", SessionLocal, load_article_vectors, interval=SEARCH_INDEX_SYNC_INTERVAL, retention=SEARCH_INDEX_SYNC_RETENTION),
+    IndexSync(chunk_index, "chunks", SessionLocal, load_chunk_vectors, interval=SEARCH_INDEX_SYNC_INTERVAL, retention=SEARCH_INDEX_SYNC_RETENTION),
+]
+
+# Chat prompt budgets in tokens: retrieved context, and conversation history (newest messages first)
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "1500"))
+CHAT_HISTORY_MESSAGES = int(os.getenv("CHAT_HISTORY_MESSAGES", "10"))
+chat_context_builder = ContextBuilder(
+    TokenCounter(), context_tokens=CHAT_CONTEXT_TOKENS, history_tokens=CHAT_HISTORY_TOKENS, max_messages=CHAT_HISTORY_MESSAGES
+)
+
+# Rolling chat summaries: refreshed in the background every CHAT_SUMMARY_EVERY_TURNS turns (0: never),
+# folding in everything but the CHAT_RECENT_MESSAGES newest messages, which prompts send verbatim
+CHAT_SUMMARY_EVERY_TURNS = int(os.getenv("CHAT_SUMMARY_EVERY_TURNS", "4"))
+CHAT_RECENT_MESSAGES = int(os.getenv("CHAT_RECENT_MESSAGES", "6"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "gpt-4o")
+# Each refresh folds at most this many messages / transcript tokens; a longer backlog is caught up by follow-up jobs
+CHAT_SUMMARY_BATCH_MESSAGES = int(os.getenv("CHAT_SUMMARY_BATCH_MESSAGES", "40"))
+CHAT_SUMMARY_INPUT_TOKENS = int(os.getenv("CHAT_SUMMARY_INPUT_TOKENS", "6000"))
+
+# Background jobs (article embedding, chat summaries): worker threads per process, 0 to leave them to `cli run-jobs`
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))  # seconds before a stuck job is retried
+
+logger = logging.getLogger(__name__)
+
+def run_embedding_jobs(db: Session, payloads: list[dict]) -> None:
+    """Job handler: embed, index and chunk the articles, then update their related-articles rows."""
+    embedding_service = get_embedding_service(get_embedding_cache_repository(db))
+    chunk_service = ChunkService(ChunkRepository(db), embedding_service, chunk_index, TextChunker(CHUNK_SIZE, CHUNK_OVERLAP))
+    article_repo = ArticleRepository(db)
+    changed = ArticleService(article_repo, embedding_service, article_index, chunk_service).embed_articles(
+        [payload["article_id"] for payload in payloads]
+    )
+    related = RelatedArticlesService(NeighborRepository(db), article_repo, article_index, embedding_model=EMBEDDING_MODEL_ID)
+    for article_id in changed:
+        try:
+            related.refresh(article_id)
+        except Exception:
+            # The embedding is stored; the graph is repaired by the next refresh or rebuild-related
+            logger.exception("Related-articles refresh failed for article %d", article_id)
+
+def mark_embedding_failed(db: Session, payloads: list[dict]) -> None:
+    """Dead-letter hook: surface articles whose embedding job ran out of retries."""
+    ArticleRepository(db).set_embedding_status([payload["article_id"] for payload in payloads], "failed")
+
+def run_chat_summary_jobs(db: Session, payloads: list[dict]) -> None:
+    """Job handler: fold older messages of each chat session into its rolling summary."""
+    summaries = ChatSummaryService(
+        ChatRepository(db), get_openai_client(), model=CHAT_SUMMARY_MODEL,
+        keep_recent=CHAT_RECENT_MESSAGES, max_tokens=CHAT_SUMMARY_TOKENS,
+        max_messages=CHAT_SUMMARY_BATCH_MESSAGES, input_tokens=CHAT_SUMMARY_INPUT_TOKENS,
+    )
+    for session_id in dict.fromkeys(payload["session_id"] for payload in payloads):
+        if summaries.summarize(session_id) and summaries.has_backlog(session_id):
+            # The running job's key still admits one queued follow-up, which continues the backlog
+            JobRepository(db).enqueue(SUMMARIZE_CHAT_JOB, {"session_id": session_id}, key=summary_job_key(session_id))
+
+job_workers = JobWorkerPool(
+    SessionLocal,
+    handlers={EMBED_ARTICLE_JOB: run_embedding_jobs, SUMMARIZE_CHAT_JOB: run_chat_summary_jobs},
+    on_dead={EMBED_ARTICLE_JOB: mark_embedding_failed},
+    workers=JOB_WORKERS,
+    poll_interval=JOB_POLL_INTERVAL,
+    visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+)
+
+# Sync client for embeddings (called from worker threads), async client for chat completions
+_openai_client: OpenAIClient | None = None
+_async_openai_client: AsyncOpenAIClient | None = None
+_openai_client_lock = threading.Lock()
+
+OPENAI_POOL_OPTIONS = dict(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    timeout=OPENAI_TIMEOUT,
+    connect_timeout=OPENAI_CONNECT_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+)
+
+def _create_openai_client() -> OpenAIClient:
+    if LLM_PROVIDER == "local":
+        return LocalOpenAIClient(
+            embedding_dimensions=LOCAL_EMBEDDING_DIMENSIONS,
+            chat_response=LOCAL_CHAT_RESPONSE,
+            embedding_latency=LOCAL_EMBEDDING_LATENCY_MS / 1000,
+            chat_latency=LOCAL_CHAT_LATENCY_MS / 1000,
+        )
+    return create_openai_client(AZURE_OPENAI_API_KEY, AZURE_OPENAI_API_BASE, **OPENAI_POOL_OPTIONS)
+
+def open_openai_client() -> OpenAIClient:
+    """Create the shared client once per process; the app lifespan calls this at startup."""
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            _openai_client = _create_openai_client()
+        return _openai_client
+
+def close_openai_client() -> None:
+    """Close the shared client's connections, e.g. at shutdown."""
+    global _openai_client
+    with _openai_client_lock:
+        client, _openai_client = _openai_client, None
+    if client is not None:
+        client.close()
+
+def get_openai_client() -> OpenAIClient:
+    # Opened on first use outside the app (CLI, job workers in a separate process)
+    return _openai_client or open_openai_client()
+
+def open_async_openai_client() -> AsyncOpenAIClient:
+    """Create the shared async client; the app lifespan calls this so its pool belongs to the serving event loop."""
+    global _async_openai_client
+    with _openai_client_lock:
+        if _async_openai_client is None:
+            if LLM_PROVIDER == "local":
+                _async_openai_client = AsyncLocalOpenAIClient(
+                    chat_response=LOCAL_CHAT_RESPONSE, chat_latency=LOCAL_CHAT_LATENCY_MS / 1000
+                )
+            else:
+                _async_openai_client = create_async_openai_client(
+                    AZURE_OPENAI_API_KEY, AZURE_OPENAI_API_BASE, **OPENAI_POOL_OPTIONS
+                )
+        return _async_openai_client
+
+async def close_async_openai_client() -> None:
+    global _async_openai_client
+    with _openai_client_lock:
+        client, _async_openai_client = _async_openai_client, None
+    if client is not None:
+        await client.close()
+
+def get_async_openai_client() -> AsyncOpenAIClient:
+    return _async_openai_client or open_async_openai_client()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -53,11 +318,54 @@ def get_session_service(repo: SessionRepository = Depends(get_session_repository
 def get_article_repository(db: Session = Depends(get_db)) -> ArticleRepository:
     return ArticleRepository(db)
 
-def get_embedding_service() -> EmbeddingService:
-    return EmbeddingService(api_key=AZURE_OPENAI_API_KEY, azure_endpoint=AZURE_OPENAI_API_BASE)
+def get_query_embedding_cache() -> EmbeddingCache:
+    return query_embedding_cache
+
+def get_embedding_cache_repository(db: Session = Depends(get_db)) -> EmbeddingCacheRepository:
+    return EmbeddingCacheRepository(db, ttl_seconds=EMBEDDING_CACHE_DB_TTL)
+
+def get_embedding_service(cache_repo: EmbeddingCacheRepository = Depends(get_embedding_cache_repository)) -> EmbeddingService:
+    return EmbeddingService(
+        api_key=AZURE_OPENAI_API_KEY,
+        azure_endpoint=AZURE_OPENAI_API_BASE,
+        cache=query_embedding_cache,
+        cache_repo=cache_repo,
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS,
+        client=get_openai_client(),
+    )
+
+def get_vector_index() -> VectorStore:
+    return article_index
+
+def get_chunk_index() -> VectorStore:
+    return chunk_index
 
-def get_article_service(repo: ArticleRepository = Depends(get_article_repository), embedding_service: EmbeddingService = Depends(get_embedding_service)) -> ArticleService:
-    return ArticleService(repo, embedding_service)
+def get_chunk_repository(db: Session = Depends(get_db)) -> ChunkRepository:
+    return ChunkRepository(db)
+
+def get_chunk_service(
+    repo: ChunkRepository = Depends(get_chunk_repository),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    index: VectorStore = Depends(get_chunk_index),
+) -> ChunkService:
+    return ChunkService(repo, embedding_service, index, TextChunker(CHUNK_SIZE, CHUNK_OVERLAP))
+
+def get_job_repository(db: Session = Depends(get_db)) -> JobRepository:
+    return JobRepository(db)
+
+def get_article_service(repo: ArticleRepository = Depends(get_article_repository), embedding_service: EmbeddingService = Depends(get_embedding_service), index: VectorStore = Depends(get_vector_index), chunk_service: ChunkService = Depends(get_chunk_service), jobs: JobRepository = Depends(get_job_repository)) -> ArticleService:
+    return ArticleService(repo, embedding_service, index, chunk_service, jobs)
+
+def get_neighbor_repository(db: Session = Depends(get_db)) -> NeighborRepository:
+    return NeighborRepository(db)
+
+def get_related_articles_service(
+    repo: NeighborRepository = Depends(get_neighbor_repository),
+    article_repo: ArticleRepository = Depends(get_article_repository),
+    index: VectorStore = Depends(get_vector_index),
+) -> RelatedArticlesService:
+    return RelatedArticlesService(repo, article_repo, index, embedding_model=EMBEDDING_MODEL_ID)
 
 def get_comment_repository(db: Session = Depends(get_db)) -> CommentRepository:
     return CommentRepository(db)
@@ -67,15 +375,22 @@ def get_comment_service(repo: CommentRepository = Depends(get_comment_repository
 
 def get_search_service(
     article_repo: ArticleRepository = Depends(get_article_repository),
-    embedding_service: EmbeddingService = Depends(get_embedding_service)
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+    index: VectorStore = Depends(get_vector_index),
+    chunk_repo: ChunkRepository = Depends(get_chunk_repository),
+    chunks: VectorStore = Depends(get_chunk_index),
 ) -> SearchService:
-    return SearchService(article_repo, embedding_service)
+    return SearchService(article_repo, embedding_service, index, chunk_repo, chunks)
 
 def get_chat_repository(db: Session = Depends(get_db)) -> ChatRepository:
     return ChatRepository(db)
 
 def get_chat_service(repo: ChatRepository = Depends(get_chat_repository), search_service: SearchService = Depends(get_search_service), azure_openai_key: str = AZURE_OPENAI_API_KEY, azure_openai_endpoint: str = AZURE_OPENAI_API_BASE) -> ChatService:
-    return ChatService(repo, search_service, azure_openai_key, azure_openai_endpoint)
+    return ChatService(
+        repo, search_service, azure_openai_key, azure_openai_endpoint,
+        client=get_async_openai_client(), session_factory=SessionLocal, context_builder=chat_context_builder,
+        summarize_every=CHAT_SUMMARY_EVERY_TURNS, recent_messages=CHAT_RECENT_MESSAGES,
+    )
 
 def get_current_user(
     session_token: str = Cookie(None),
@@ -4,12 +4,67 @@ from dotenv import load_dotenv
 # Load .env file in development
 load_dotenv()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .db.session import engine, Base
+from .db.session import engine, Base, SessionLocal
 from .api import articles, auth, users, comments, chat, views
+from .core.deps import (
+    get_embedding_service, get_embedding_cache_repository, get_vector_index, get_chunk_index, flush_vector_indexes, job_workers, index_syncs,
+    open_openai_client, close_openai_client, open_async_openai_client, close_async_openai_client,
+)
+from .repositories.article import ArticleRepository
+from .repositories.job import JobRepository
+from .services.article import ArticleService
+from .repositories.chunk import ChunkRepository
+from .models import embedding_backfill  # noqa: F401 - staged_embeddings is only used by the reembed command
+from .services.mmap_index import MappedVectorIndex
+from .services.search import SearchService
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for every embedding and chat request of this process
+    open_openai_client()
+    open_async_openai_client()
+    # Build the shared vector indexes once so searches never rescan the tables; a file-backed
+    # index already written is reused, after catching up on writes a crash kept from reaching it
+    db = SessionLocal()
+    try:
+        search_service = SearchService(
+            ArticleRepository(db),
+            get_embedding_service(get_embedding_cache_repository(db)),
+            get_vector_index(),
+            ChunkRepository(db),
+            get_chunk_index(),
+        )
+        for sync in index_syncs:
+            sync.reset()  # changes stored from here on are picked up by the sync
+        if not get_vector_index().built:
+            search_service.build_index()
+        elif isinstance(get_vector_index(), MappedVectorIndex):
+            search_service.reconcile_index()
+        if not get_chunk_index().built:
+            search_service.build_chunk_index()
+        elif isinstance(get_chunk_index(), MappedVectorIndex):
+            search_service.reconcile_chunk_index()
+        # Articles left pending without a job (e.g. a crash right after the insert) are queued again
+        ArticleService(ArticleRepository(db), None, get_vector_index(), jobs=JobRepository(db)).enqueue_pending()
+    finally:
+        db.close()
+    job_workers.start()
+    for sync in index_syncs:
+        sync.start()
+    yield
+    for sync in index_syncs:
+        sync.stop()
+    job_workers.stop()
+    flush_vector_indexes()
+    close_openai_client()
+    await close_async_openai_client()
+
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Knowledge Base API")
+    app = FastAPI(title="Knowledge Base API", lifespan=lifespan)
 
     # Create database tables
     Base.metadata.create_all(bind=engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func, Table, LargeBinary, DDL, event
 from sqlalchemy.orm import relationship
 from ..db.session import Base
 
@@ -17,11 +17,46 @@ class Article(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     summary = Column(String(500), nullable=True)
-    embedding = Column(Text, nullable=True)
+    embedding = Column(Text, nullable=True)  # legacy JSON, read only until rows are migrated
+    embedding_vector = Column(LargeBinary, nullable=True)  # packed little-endian float32
+    embedding_model = Column(String(100), nullable=True, index=True)  # model id the vector was built with
+    embedding_status = Column(String(16), nullable=False, default="ready", server_default="ready")  # pending, ready or failed
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of content the vector was built from
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     author = relationship("User", back_populates="articles")
     tags = relationship("Tag", secondary=article_tags, back_populates="articles")
     comments = relationship("Comment", back_populates="article", cascade="all, delete-orphan")
-    
\ No newline at end of file
+    chunks = relationship("ArticleChunk", back_populates="article", cascade="all, delete-orphan", order_by="ArticleChunk.chunk_index")
+    
+
+# Full-text index over title and content, maintained by the database itself:
+# an FTS5 table kept in sync by triggers on SQLite, a generated tsvector column
+# with a GIN index on PostgreSQL. Used by lexical and hybrid search.
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, content, content='articles', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+POSTGRES_FTS_DDL = [
+    """ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+]
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(Article.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Article.__table__, "before_drop", DDL("DROP TABLE IF EXISTS articles_fts").execute_if(dialect="sqlite"))
+for statement in POSTGRES_FTS_DDL:
+    event.listen(Article.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
@@ -1,21 +1,26 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, func, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index, func, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..db.session import Base
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (Index("ix_chat_sessions_user_id_created_at", "user_id", "created_at"),)
 
     id  = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Rolling summary of the messages up to and including summary_through_id, sent in place of them
+    summary = Column(Text, nullable=True)
+    summary_through_id = Column(Integer, nullable=True)
 
     user = relationship("User", back_populates="chat_sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, ForeignKey
+from sqlalchemy.orm import relationship
+from ..db.session import Base
+
+class ArticleChunk(Base):
+    __tablename__ = "article_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, ForeignKey("articles.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)  # position within the article
+    start_offset = Column(Integer, nullable=False)  # character offsets into Article.content
+    end_offset = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    embedding = Column(LargeBinary, nullable=True)  # packed little-endian float32
+    embedding_model = Column(String(100), nullable=True, index=True)  # model id the vector was built with
+
+    article = relationship("Article", back_populates="chunks")
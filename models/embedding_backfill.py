@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, LargeBinary
+from ..db.session import Base
+
+class StagedEmbedding(Base):
+    """
+    Vector re-embedded with a new model, held here until the backfill is cut over
+    so search keeps serving the live vectors in articles and article_chunks meanwhile.
+    """
+    __tablename__ = "staged_embeddings"
+
+    kind = Column(String(16), primary_key=True)  # "articles" or "chunks"
+    item_id = Column(Integer, primary_key=True)
+    model = Column(String(100), nullable=False)  # model id the vector was built with
+    embedding = Column(LargeBinary, nullable=False)  # packed little-endian float32
+    content_hash = Column(String(64), nullable=True)  # article content the vector was built from
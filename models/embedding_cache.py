@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, LargeBinary, DateTime, func
+from ..db.session import Base
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of model + normalized text
+    model = Column(String(100), nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # packed little-endian float32
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # entries expire EMBEDDING_CACHE_DB_TTL after
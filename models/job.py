@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from ..db.session import Base
+
+class Job(Base):
+    """Unit of deferred work (e.g. embedding an article), claimed and run by the in-process worker pool."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    key = Column(String(100), nullable=True, index=True)  # e.g. "article:42"; a queued job per key is enough
+    payload = Column(Text, nullable=False)  # JSON arguments for the handler
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued, running or dead
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False, index=True)  # not claimed before this (retry backoff)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # a running job past this is reclaimed
+    claim_token = Column(String(32), nullable=True, index=True)  # identifies the worker holding the job
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
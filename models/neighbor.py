@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from ..db.session import Base
+
+class ArticleNeighbor(Base):
+    """Precomputed nearest neighbours of an article, maintained as embeddings change."""
+    __tablename__ = "article_neighbors"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True)
+    score = Column(Float, nullable=False)  # cosine similarity
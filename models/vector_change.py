@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from ..db.session import Base
+
+class VectorChange(Base):
+    """
+    An article or chunk whose stored vector was written or deleted, appended in the
+    same transaction; in-memory indexes of other processes replay these by id.
+    """
+    __tablename__ = "vector_changes"
+    __table_args__ = {"sqlite_autoincrement": True}  # ids must never be reused once pruned
+
+    id = Column(Integer, primary_key=True)  # increasing; the position a sync has read up to
+    namespace = Column(String(32), nullable=False)  # "articles" or "chunks"
+    item_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
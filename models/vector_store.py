@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String, LargeBinary
+from ..db.session import Base
+
+class VectorStoreItem(Base):
+    """One embedding held by the SQL vector store, keyed by store name and item id."""
+    __tablename__ = "vector_store_items"
+
+    namespace = Column(String(32), primary_key=True)  # e.g. "articles", "chunks"
+    item_id = Column(Integer, primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)  # packed little-endian float32, unit length
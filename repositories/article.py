@@ -1,7 +1,13 @@
+import re
+from typing import Iterator
+import numpy as np
+from sqlalchemy import Select, bindparam, select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from ..models.article import Article
 from ..models.tag import Tag
 from ..schemas.article import ArticleCreate
+from .vector_change import VectorChangeRepository
 
 class ArticleRepository:
     def __init__(self, db: Session):
@@ -10,62 +16,303 @@ class ArticleRepository:
     def get(self, article_id: int) -> Article | None:
         return self.db.query(Article).filter(Article.id == article_id).first()
     
+    def get_many(self, article_ids: list[int]) -> list[Article]:
+        """Fetch articles by id, preserving the order of article_ids."""
+        if not article_ids:
+            return []
+        rows = self.db.query(Article).filter(Article.id.in_(article_ids)).all()
+        by_id = {article.id: article for article in rows}
+        return [by_id[article_id] for article_id in article_ids if article_id in by_id]
+
+    def find_embedding_by_content_hash(self, content_hash: str, model: str | None = None) -> bytes | None:
+        """Return the stored vector of any article with identical content (built with model, if given)."""
+        query = self.db.query(Article.embedding_vector).filter(
+            Article.content_hash == content_hash, Article.embedding_vector.isnot(None)
+        )
+        if model is not None:
+            query = query.filter(Article.embedding_model == model)
+        row = query.first()
+        return row.embedding_vector if row else None
+
+    def find_embeddings_by_content_hashes(self, content_hashes: set[str], model: str | None = None) -> dict[str, bytes]:
+        """Map each known content hash to a stored vector (built with model, if given), in one query."""
+        if not content_hashes:
+            return {}
+        query = self.db.query(Article.content_hash, Article.embedding_vector).filter(
+            Article.content_hash.in_(content_hashes), Article.embedding_vector.isnot(None)
+        )
+        if model is not None:
+            query = query.filter(Article.embedding_model == model)
+        return {content_hash: vector for content_hash, vector in query.all()}
+
+    def iter_embedding_blocks(self, batch_size: int = 1000, model: str | None = None) -> Iterator[list[tuple[int, bytes | None, str | None]]]:
+        """
+        Stream (id, embedding_vector, legacy JSON embedding) for every embedded article
+        (only vectors built with model, if given), batch_size rows at a time over a server-side cursor.
+        """
+        query = (
+            select(Article.id, Article.embedding_vector, Article.embedding)
+            .where((Article.embedding_vector.isnot(None)) | (Article.embedding.isnot(None)))
+            .order_by(Article.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if model is not None:
+            query = query.where(Article.embedding_model == model)
+        for rows in self.db.execute(query).partitions():
+            yield [tuple(row) for row in rows]
+
+    def list_embeddings_for(self, article_ids: list[int], model: str | None = None) -> list[tuple[int, bytes | None, str | None]]:
+        """Return (id, embedding_vector, legacy JSON embedding) for the given articles, built with model if given."""
+        if not article_ids:
+            return []
+        query = self.db.query(Article.id, Article.embedding_vector, Article.embedding).filter(Article.id.in_(article_ids))
+        if model is not None:
+            query = query.filter(Article.embedding_model == model)
+        return query.all()
+
+    def list_without_chunks(self, after_id: int = 0, limit: int = 100) -> list[tuple[int, str, bytes | None, str | None]]:
+        """Return (id, content, embedding_vector, embedding_model) for articles with no chunks yet, in id order."""
+        return (
+            self.db.query(Article.id, Article.content, Article.embedding_vector, Article.embedding_model)
+            .filter(Article.id > after_id, ~Article.chunks.any())
+            .order_by(Article.id)
+            .limit(limit)
+            .all()
+        )
+
+    def filtered_ids_select(self, tags: list[str] | None = None, author_id: int | None = None) -> Select:
+        """SELECT of the ids of articles carrying any of tags and/or written by author_id."""
+        query = select(Article.id)
+        if tags:
+            query = query.where(Article.tags.any(Tag.name.in_(tags)))
+        if author_id is not None:
+            query = query.where(Article.author_id == author_id)
+        return query
+
+    def list_ids(self, tags: list[str] | None = None, author_id: int | None = None) -> np.ndarray:
+        """Ids of the articles matching the filters, as an array for masking vector search."""
+        rows = self.db.execute(self.filtered_ids_select(tags, author_id)).scalars().all()
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def search_lexical(
+        self,
+        query: str,
+        limit: int = 10,
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> list[tuple[int, float]]:
+        """
+        Keyword search over title and content using the database's full-text index.
+        Terms are OR-ed and ranked (title weighted above content); returns (id, score), best first.
+        """
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return []
+        postgres = self.db.get_bind().dialect.name == "postgresql"
+        id_column = "id" if postgres else "rowid"
+        filters, params = "", {"limit": limit}
+        if tags:
+            filters += (
+                f" AND {id_column} IN (SELECT article_tags.article_id FROM article_tags "
+                "JOIN tags ON tags.id = article_tags.tag_id WHERE tags.name IN :tags)"
+            )
+            params["tags"] = list(tags)
+        if author_id is not None:
+            filters += f" AND {id_column} IN (SELECT id FROM articles WHERE author_id = :author_id)"
+            params["author_id"] = author_id
+        if postgres:
+            statement = text(
+                "SELECT id, ts_rank_cd(search_vector, q) AS score "
+                "FROM articles, to_tsquery('english', :q) AS q "
+                f"WHERE search_vector @@ q{filters} ORDER BY score DESC LIMIT :limit"
+            )
+            params["q"] = " | ".join(terms)
+        else:
+            # bm25() is lower-is-better; quoting each term keeps FTS5 syntax out of user input
+            statement = text(
+                "SELECT rowid, -bm25(articles_fts, 10.0, 1.0) AS score "
+                f"FROM articles_fts WHERE articles_fts MATCH :q{filters} ORDER BY score DESC LIMIT :limit"
+            )
+            params["q"] = " OR ".join(f'"{term}"' for term in terms)
+        if tags:
+            statement = statement.bindparams(bindparam("tags", expanding=True))
+        rows = self.db.execute(statement, params)
+        return [(article_id, float(score)) for article_id, score in rows]
+
     def list_articles(self, skip: int = 0, limit: int = 10, tags: list[str] | None = None) -> list[Article]:
         query = self.db.query(Article)
         if tags:
             query = query.filter(Article.tags.any(Tag.name.in_(tags)))
         return query.order_by(Article.created_at.desc()).offset(skip).limit(limit).all()
 
-    def create(self, article: ArticleCreate, author_id: int, embedding: list[float] | None = None) -> Article:
-        tag_objs = []
-        if article.tags:
-            for tag_name in article.tags:
-                tag = self.db.query(Tag).filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    self.db.add(tag)
-                    self.db.flush() # Ensure tag gets an ID
-                tag_objs.append(tag)
+    def get_or_create_tags(self, names: list[str]) -> dict[str, Tag]:
+        """Load existing tags and add any missing ones in a single pass."""
+        names = set(names)
+        if not names:
+            return {}
+        tags = {tag.name: tag for tag in self.db.query(Tag).filter(Tag.name.in_(names)).all()}
+        for name in names - tags.keys():
+            tags[name] = Tag(name=name)
+            self.db.add(tags[name])
+        self.db.flush() # Ensure new tags get an ID
+        return tags
+
+    def create(
+        self,
+        article: ArticleCreate,
+        author_id: int,
+        embedding: bytes | None = None,
+        content_hash: str | None = None,
+        embedding_model: str | None = None,
+        embedding_status: str = "ready",
+    ) -> Article:
+        tags = self.get_or_create_tags(article.tags or [])
         db_article = Article(
             title=article.title, 
             content=article.content, 
-            embedding=embedding,
+            embedding_vector=embedding,
+            embedding_model=embedding_model,
+            embedding_status=embedding_status,
+            content_hash=content_hash,
             author_id=author_id,
-            tags=tag_objs,
+            tags=[tags[name] for name in dict.fromkeys(article.tags or [])],
         )
         self.db.add(db_article)
+        if embedding is not None:
+            self.db.flush()
+            VectorChangeRepository(self.db).record("articles", [db_article.id])
         self.db.commit()
         self.db.refresh(db_article)
         return db_article
 
-    def update(self, article_id: int, article: ArticleCreate, embedding: list[float] | None = None) -> Article | None:
+    def create_many(
+        self,
+        rows: list[tuple[ArticleCreate, bytes | None, str | None]],
+        author_id: int,
+        embedding_model: str | None = None,
+        embedding_status: str = "ready",
+    ) -> list[int | Exception]:
+        """
+        Insert (article, embedding, content_hash) rows in one transaction and return their ids.
+        If the batch fails it is retried row by row so only the bad items report an error.
+        """
+        try:
+            ids = self._add_many(rows, author_id, embedding_model, embedding_status)
+            self.db.commit()
+            return ids
+        except SQLAlchemyError:
+            self.db.rollback()
+
+        results: list[int | Exception] = []
+        for row in rows:
+            try:
+                [article_id] = self._add_many([row], author_id, embedding_model, embedding_status)
+                self.db.commit()
+                results.append(article_id)
+            except SQLAlchemyError as exc:
+                self.db.rollback()
+                results.append(exc)
+        return results
+
+    def _add_many(
+        self,
+        rows: list[tuple[ArticleCreate, bytes | None, str | None]],
+        author_id: int,
+        embedding_model: str | None,
+        embedding_status: str,
+    ) -> list[int]:
+        tags = self.get_or_create_tags([name for article, _, _ in rows for name in article.tags or []])
+        db_articles = [
+            Article(
+                title=article.title,
+                content=article.content,
+                embedding_vector=embedding,
+                embedding_model=embedding_model,
+                embedding_status=embedding_status,
+                content_hash=content_hash,
+                author_id=author_id,
+                tags=[tags[name] for name in dict.fromkeys(article.tags or [])],
+            )
+            for article, embedding, content_hash in rows
+        ]
+        self.db.add_all(db_articles)
+        self.db.flush()
+        VectorChangeRepository(self.db).record(
+            "articles", [db_article.id for db_article in db_articles if db_article.embedding_vector is not None]
+        )
+        return [db_article.id for db_article in db_articles]
+
+    def update(
+        self,
+        article_id: int,
+        article: ArticleCreate,
+        embedding: bytes | None = None,
+        content_hash: str | None = None,
+        embedding_model: str | None = None,
+        embedding_status: str | None = None,
+    ) -> Article | None:
         db_article = self.get(article_id)
         if not db_article:
             return None
         for key, value in article.dict().items():
             if key == "tags":
-                tag_objs = []
-                if value:
-                    for tag_name in value:
-                        tag = self.db.query(Tag).filter_by(name=tag_name).first()
-                        if not tag:
-                            tag = Tag(name=tag_name)
-                            self.db.add(tag)
-                            self.db.flush() # Ensure tag gets an ID
-                        tag_objs.append(tag)
-                setattr(db_article, "tags", tag_objs)
+                tags = self.get_or_create_tags(value or [])
+                setattr(db_article, "tags", [tags[name] for name in dict.fromkeys(value or [])])
             else:
                 setattr(db_article, key, value)
         if embedding is not None:
-            db_article.embedding = embedding
+            db_article.embedding_vector = embedding
+            db_article.embedding_model = embedding_model
+            db_article.embedding = None
+            db_article.embedding_status = "ready"
+            VectorChangeRepository(self.db).record("articles", [article_id])
+        if content_hash is not None:
+            db_article.content_hash = content_hash
+        if embedding_status is not None:
+            db_article.embedding_status = embedding_status
         self.db.commit()
         self.db.refresh(db_article)
         return db_article
     
+    def save_embeddings(self, rows: list[tuple[int, str, bytes, str, str | None]]) -> list[int]:
+        """
+        Store (id, content, embedding, content_hash, embedding_model) computed in the background and
+        mark the articles ready. Articles whose content has changed since are skipped; returns the saved ids.
+        """
+        saved = []
+        for article_id, content, embedding, content_hash, embedding_model in rows:
+            updated = self.db.query(Article).filter(Article.id == article_id, Article.content == content).update(
+                {
+                    Article.embedding_vector: embedding,
+                    Article.embedding: None,
+                    Article.content_hash: content_hash,
+                    Article.embedding_model: embedding_model,
+                    Article.embedding_status: "ready",
+                },
+                synchronize_session=False,
+            )
+            if updated:
+                saved.append(article_id)
+        VectorChangeRepository(self.db).record("articles", saved)
+        self.db.commit()
+        return saved
+
+    def set_embedding_status(self, article_ids: list[int], status: str) -> None:
+        if not article_ids:
+            return
+        self.db.query(Article).filter(Article.id.in_(article_ids)).update(
+            {Article.embedding_status: status}, synchronize_session=False
+        )
+        self.db.commit()
+
+    def list_ids_by_embedding_status(self, status: str) -> list[int]:
+        return [article_id for (article_id,) in self.db.query(Article.id).filter(Article.embedding_status == status).all()]
+
     def delete(self, article_id: int) -> bool:
         db_article = self.get(article_id)
         if not db_article:
             return False
         self.db.delete(db_article)
+        VectorChangeRepository(self.db).record("articles", [article_id])
         self.db.commit()
         return True
\ No newline at end of file
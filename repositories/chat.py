@@ -1,3 +1,4 @@
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from ..models.chat import ChatSession, ChatMessage
 
@@ -16,8 +17,15 @@ class ChatRepository:
     def get_session(self, session_id: int) -> ChatSession | None:
         return self.db.query(ChatSession).filter(ChatSession.id == session_id).first()
     
-    def list_user_sessions(self, user_id: int) -> list[ChatSession]:
-        return self.db.query(ChatSession).filter(ChatSession.user_id == user_id).order_by(ChatSession.created_at.desc()).all()
+    def list_user_sessions(self, user_id: int, limit: int | None = None, before_id: int | None = None) -> list[ChatSession]:
+        """The user's sessions, newest first; with before_id, only those older than that session (a page cursor)."""
+        query = self.db.query(ChatSession).filter(ChatSession.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(self._older_than(ChatSession, before_id))
+        query = query.order_by(ChatSession.created_at.desc(), ChatSession.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
 
     def add_message(self, session_id: int, role: str, content: str, sources: str | None = None) -> ChatMessage:
         message = ChatMessage(session_id=session_id, role=role, content=content, sources=sources)
@@ -26,5 +34,58 @@ class ChatRepository:
         self.db.refresh(message)
         return message
     
-    def get_session_messages(self, session_id: int) -> list[ChatMessage]:
-        return self.db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.created_at).all()
+    def get_session_messages(self, session_id: int, limit: int | None = None, before_id: int | None = None) -> list[ChatMessage]:
+        """
+        The newest limit messages of the session (all when None), oldest first; with before_id,
+        only those older than that message (a page cursor for scrolling back).
+        """
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        if before_id is not None:
+            query = query.filter(self._older_than(ChatMessage, before_id))
+        return self._newest(query, limit)
+
+    def get_recent_messages(self, session_id: int, limit: int, after_id: int | None = None) -> list[ChatMessage]:
+        """The newest limit messages of the session newer than after_id (any when None), oldest first."""
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        if after_id is not None:
+            query = query.filter(ChatMessage.id > after_id)
+        return self._newest(query, limit)
+
+    def get_messages_after(self, session_id: int, after_id: int | None = None, limit: int | None = None) -> list[ChatMessage]:
+        """The oldest limit messages of the session newer than after_id (all when None), oldest first."""
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        if after_id is not None:
+            query = query.filter(ChatMessage.id > after_id)
+        query = query.order_by(ChatMessage.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def update_summary(self, session_id: int, summary: str, through_id: int, expected_through_id: int | None) -> bool:
+        """
+        Replace the session's rolling summary, unless another refresh already moved it
+        past expected_through_id. Returns whether the summary was written.
+        """
+        covered = (
+            ChatSession.summary_through_id.is_(None) if expected_through_id is None
+            else ChatSession.summary_through_id == expected_through_id
+        )
+        updated = self.db.query(ChatSession).filter(ChatSession.id == session_id, covered).update(
+            {ChatSession.summary: summary, ChatSession.summary_through_id: through_id},
+            synchronize_session=False,
+        )
+        self.db.commit()
+        return bool(updated)
+
+    @staticmethod
+    def _newest(query, limit: int | None) -> list[ChatMessage]:
+        # Read backwards along the (session_id, created_at) index so only limit rows are touched
+        query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()[::-1]
+
+    def _older_than(self, model, cursor_id: int):
+        """Keyset condition for rows before the cursor row in (created_at, id) order."""
+        cursor = self.db.query(model.created_at).filter(model.id == cursor_id).scalar_subquery()
+        return or_(model.created_at < cursor, and_(model.created_at == cursor, model.id < cursor_id))
@@ -0,0 +1,81 @@
+from typing import Iterator
+
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+from ..models.chunk import ArticleChunk
+from .vector_change import VectorChangeRepository
+
+
+class ChunkRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, chunk_ids: list[int]) -> list[ArticleChunk]:
+        """Fetch chunks by id, preserving the order of chunk_ids."""
+        if not chunk_ids:
+            return []
+        rows = self.db.query(ArticleChunk).filter(ArticleChunk.id.in_(chunk_ids)).all()
+        by_id = {chunk.id: chunk for chunk in rows}
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+
+    def list_chunk_ids(self, article_ids: list[int] | Select) -> list[int]:
+        return [
+            chunk_id for (chunk_id,) in
+            self.db.query(ArticleChunk.id).filter(ArticleChunk.article_id.in_(article_ids)).all()
+        ]
+
+    def list_ids_for_articles(self, article_ids: Select) -> np.ndarray:
+        """Ids of the chunks belonging to the selected articles, as an array for masking vector search."""
+        chunk_ids = self.list_chunk_ids(article_ids)
+        return np.fromiter(chunk_ids, dtype=np.int64, count=len(chunk_ids))
+
+    def list_for_articles(self, article_ids: list[int]) -> list[tuple[int, str]]:
+        """Return (chunk id, content) for every chunk of the given articles."""
+        if not article_ids:
+            return []
+        return (
+            self.db.query(ArticleChunk.id, ArticleChunk.content)
+            .filter(ArticleChunk.article_id.in_(article_ids))
+            .order_by(ArticleChunk.id)
+            .all()
+        )
+
+    def iter_embedding_blocks(self, batch_size: int = 1000, model: str | None = None) -> Iterator[list[tuple[int, bytes]]]:
+        """Stream (chunk id, embedding) for every embedded chunk (built with model, if given), batch_size rows at a time."""
+        query = (
+            select(ArticleChunk.id, ArticleChunk.embedding)
+            .where(ArticleChunk.embedding.isnot(None))
+            .order_by(ArticleChunk.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if model is not None:
+            query = query.where(ArticleChunk.embedding_model == model)
+        for rows in self.db.execute(query).partitions():
+            yield [tuple(row) for row in rows]
+
+    def list_embeddings_for(self, chunk_ids: list[int], model: str | None = None) -> list[tuple[int, bytes | None]]:
+        """Return (chunk id, embedding) for the given chunks, built with model if given."""
+        if not chunk_ids:
+            return []
+        query = self.db.query(ArticleChunk.id, ArticleChunk.embedding).filter(ArticleChunk.id.in_(chunk_ids))
+        if model is not None:
+            query = query.filter(ArticleChunk.embedding_model == model)
+        return query.all()
+
+    def replace_chunks(self, chunks_by_article: dict[int, list[ArticleChunk]]) -> tuple[list[int], list[int]]:
+        """
+        Swap each article's chunks for new ones in one transaction.
+        Returns (removed chunk ids, new chunk ids in input order).
+        """
+        article_ids = list(chunks_by_article)
+        removed = self.list_chunk_ids(article_ids)
+        if removed:
+            self.db.query(ArticleChunk).filter(ArticleChunk.article_id.in_(article_ids)).delete(synchronize_session=False)
+        new_chunks = [chunk for chunks in chunks_by_article.values() for chunk in chunks]
+        self.db.add_all(new_chunks)
+        self.db.flush()
+        new_ids = [chunk.id for chunk in new_chunks]
+        VectorChangeRepository(self.db).record("chunks", removed + new_ids)
+        self.db.commit()
+        return removed, new_ids
@@ -0,0 +1,89 @@
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session
+from ..models.article import Article
+from ..models.chunk import ArticleChunk
+from ..models.embedding_backfill import StagedEmbedding
+from .vector_change import VectorChangeRepository
+
+
+class EmbeddingBackfillRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_articles_to_stage(self, model: str, after_id: int = 0, limit: int = 100) -> list[tuple[int, str, str | None]]:
+        """
+        Return (id, content, content_hash) for articles past after_id whose live vector was
+        built with another model and that have no staged vector for model and their current content.
+        """
+        staged = exists().where(and_(
+            StagedEmbedding.kind == "articles",
+            StagedEmbedding.item_id == Article.id,
+            StagedEmbedding.model == model,
+            StagedEmbedding.content_hash == Article.content_hash,
+        ))
+        return (
+            self.db.query(Article.id, Article.content, Article.content_hash)
+            .filter(
+                Article.id > after_id,
+                or_(Article.embedding_model.is_(None), Article.embedding_model != model),
+                ~staged,
+            )
+            .order_by(Article.id)
+            .limit(limit)
+            .all()
+        )
+
+    def stage(self, kind: str, model: str, rows: list[tuple[int, bytes, str | None]]) -> None:
+        """Store (item_id, embedding, content_hash) rows for model, replacing earlier staged vectors."""
+        for item_id, embedding, content_hash in rows:
+            self.db.merge(StagedEmbedding(
+                kind=kind, item_id=item_id, model=model, embedding=embedding, content_hash=content_hash,
+            ))
+        self.db.commit()
+
+    def count_staged(self, model: str) -> int:
+        return self.db.query(StagedEmbedding).filter(StagedEmbedding.model == model).count()
+
+    def cutover(self, model: str, batch_size: int = 500) -> tuple[int, int]:
+        """
+        Copy the vectors staged for model into articles and article_chunks, batch by batch,
+        then drop whatever is left (content edited or chunks replaced since staging).
+        Returns the number of (articles, chunks) switched over.
+        """
+        articles = self._swap(
+            "articles", model, batch_size, Article, Article.embedding_vector.key,
+            StagedEmbedding.content_hash == Article.content_hash,
+        )
+        chunks = self._swap("chunks", model, batch_size, ArticleChunk, ArticleChunk.embedding.key)
+        self.db.query(StagedEmbedding).filter(StagedEmbedding.model == model).delete(synchronize_session=False)
+        self.db.commit()
+        return articles, chunks
+
+    def _swap(self, kind: str, model: str, batch_size: int, target, vector_attr: str, *conditions) -> int:
+        swapped, last_id = 0, 0
+        while True:
+            rows = (
+                self.db.query(StagedEmbedding, target)
+                .join(target, target.id == StagedEmbedding.item_id)
+                .filter(
+                    StagedEmbedding.kind == kind,
+                    StagedEmbedding.model == model,
+                    StagedEmbedding.item_id > last_id,
+                    *conditions,
+                )
+                .order_by(StagedEmbedding.item_id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return swapped
+            last_id = rows[-1][0].item_id
+            for staged, item in rows:
+                setattr(item, vector_attr, staged.embedding)
+                item.embedding_model = model
+                if kind == "articles":
+                    item.embedding = None  # legacy JSON copy, superseded
+                self.db.delete(staged)
+            VectorChangeRepository(self.db).record(kind, [staged.item_id for staged, _ in rows])
+            self.db.commit()
+            swapped += len(rows)
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.embedding_cache import EmbeddingCacheEntry
+
+
+class EmbeddingCacheRepository:
+    def __init__(self, db: Session, ttl_seconds: float | None = None):
+        self.db = db
+        self.ttl_seconds = ttl_seconds  # None: entries never expire
+
+    def get(self, key: str) -> bytes | None:
+        """The cached vector, unless it is older than the TTL."""
+        query = self.db.query(EmbeddingCacheEntry.embedding).filter(EmbeddingCacheEntry.key == key)
+        if self.ttl_seconds is not None:
+            query = query.filter(EmbeddingCacheEntry.created_at >= self._expired_before())
+        row = query.first()
+        return row.embedding if row else None
+
+    def put(self, key: str, model: str, embedding: bytes) -> None:
+        self.db.add(EmbeddingCacheEntry(key=key, model=model, embedding=embedding))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Already cached: by another worker just now, or an expired entry being refreshed
+            self.db.rollback()
+            self.db.query(EmbeddingCacheEntry).filter(EmbeddingCacheEntry.key == key).update(
+                {
+                    EmbeddingCacheEntry.model: model,
+                    EmbeddingCacheEntry.embedding: embedding,
+                    EmbeddingCacheEntry.created_at: func.now(),
+                },
+                synchronize_session=False,
+            )
+            self.db.commit()
+
+    def prune(self) -> int:
+        """Delete the entries older than the TTL; returns how many."""
+        if self.ttl_seconds is None:
+            return 0
+        deleted = (
+            self.db.query(EmbeddingCacheEntry)
+            .filter(EmbeddingCacheEntry.created_at < self._expired_before())
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return deleted
+
+    def _expired_before(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
@@ -0,0 +1,128 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from ..models.job import Job
+
+
+class JobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, kind: str, payload: dict, key: str | None = None, max_attempts: int = 5) -> None:
+        self.enqueue_many(kind, [(key, payload)], max_attempts=max_attempts)
+
+    def enqueue_many(self, kind: str, items: list[tuple[str | None, dict]], max_attempts: int = 5) -> None:
+        """
+        Queue (key, payload) jobs in one commit. A keyed job that is already queued and
+        not yet claimed is not queued twice; one that is running gets a follow-up job.
+        """
+        keys = [key for key, _ in items if key is not None]
+        queued = set()
+        if keys:
+            queued = {
+                key for (key,) in
+                self.db.query(Job.key).filter(Job.kind == kind, Job.status == "queued", Job.key.in_(keys)).all()
+            }
+        now = datetime.now(timezone.utc)
+        for key, payload in items:
+            if key in queued:
+                continue
+            if key is not None:
+                queued.add(key)
+            self.db.add(Job(
+                kind=kind, key=key, payload=json.dumps(payload), status="queued",
+                attempts=0, max_attempts=max_attempts, run_at=now,
+            ))
+        self.db.commit()
+
+    def open_keys(self, kind: str, keys: list[str]) -> set[str]:
+        """Keys among keys that have a queued or running job."""
+        if not keys:
+            return set()
+        rows = self.db.query(Job.key).filter(Job.kind == kind, Job.status != "dead", Job.key.in_(keys)).all()
+        return {key for (key,) in rows}
+
+    def claim(self, kind: str, limit: int, visibility_timeout: float) -> list[Job]:
+        """
+        Take up to limit runnable jobs: queued ones that are due, and running ones whose
+        visibility timeout passed (their worker died). The conditional UPDATE makes
+        concurrent claims by other workers or processes skip rows already taken.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = and_(
+            Job.kind == kind,
+            or_(
+                and_(Job.status == "queued", Job.run_at <= now),
+                and_(Job.status == "running", Job.locked_until < now),
+            ),
+        )
+        ids = [job_id for (job_id,) in self.db.query(Job.id).filter(claimable).order_by(Job.run_at, Job.id).limit(limit).all()]
+        if not ids:
+            self.db.rollback()
+            return []
+        token = uuid.uuid4().hex
+        self.db.query(Job).filter(Job.id.in_(ids), claimable).update(
+            {
+                Job.status: "running",
+                Job.claim_token: token,
+                Job.locked_until: now + timedelta(seconds=visibility_timeout),
+                Job.attempts: Job.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        self.db.commit()
+        jobs = self.db.query(Job).filter(Job.claim_token == token).order_by(Job.id).all()
+        for job in jobs:
+            self.db.expunge(job)  # keep the claimed values readable after the handler commits
+        return jobs
+
+    def complete(self, jobs: list[Job]) -> None:
+        """Delete finished jobs, unless another worker has reclaimed them meanwhile."""
+        for job in jobs:
+            self.db.query(Job).filter(Job.id == job.id, Job.claim_token == job.claim_token).delete(synchronize_session=False)
+        self.db.commit()
+
+    def fail(self, jobs: list[Job], error: str, retry_delay) -> list[Job]:
+        """
+        Record a failed attempt: requeue each job after retry_delay(attempts) seconds, or move it
+        to the dead-letter state once it has used max_attempts. Returns the jobs that died.
+        """
+        now = datetime.now(timezone.utc)
+        dead = []
+        for job in jobs:
+            values = {Job.last_error: error, Job.claim_token: None, Job.locked_until: None}
+            if job.attempts >= job.max_attempts:
+                values[Job.status] = "dead"
+                dead.append(job)
+            else:
+                values[Job.status] = "queued"
+                values[Job.run_at] = now + timedelta(seconds=retry_delay(job.attempts))
+            self.db.query(Job).filter(Job.id == job.id, Job.claim_token == job.claim_token).update(
+                values, synchronize_session=False
+            )
+        self.db.commit()
+        return dead
+
+    def retry_dead(self, kind: str | None = None) -> int:
+        """Give dead-lettered jobs a fresh set of attempts; returns how many were requeued."""
+        query = self.db.query(Job).filter(Job.status == "dead")
+        if kind is not None:
+            query = query.filter(Job.kind == kind)
+        count = query.update(
+            {Job.status: "queued", Job.attempts: 0, Job.run_at: datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+        self.db.commit()
+        return count
+
+    def count_by_status(self) -> dict[str, int]:
+        """Number of jobs per "kind.status", e.g. {"embed_article.queued": 3}."""
+        rows = self.db.query(Job.kind, Job.status, func.count(Job.id)).group_by(Job.kind, Job.status).all()
+        return {f"{kind}.{status}": count for kind, status, count in rows}
+
+    @staticmethod
+    def payloads(jobs: list[Job]) -> list[dict]:
+        return [json.loads(job.payload) for job in jobs]
@@ -0,0 +1,60 @@
+from sqlalchemy.orm import Session
+from ..models.article import Article
+from ..models.neighbor import ArticleNeighbor
+
+
+class NeighborRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_related(self, article_id: int, limit: int = 10) -> list[tuple[Article, float]]:
+        """Return (neighbouring article, score) pairs, most similar first."""
+        return (
+            self.db.query(Article, ArticleNeighbor.score)
+            .join(ArticleNeighbor, ArticleNeighbor.neighbor_id == Article.id)
+            .filter(ArticleNeighbor.article_id == article_id)
+            .order_by(ArticleNeighbor.score.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def list_sources(self, article_id: int) -> list[int]:
+        """Ids of the articles that currently list article_id as a neighbour."""
+        return [
+            source_id for (source_id,) in
+            self.db.query(ArticleNeighbor.article_id).filter(ArticleNeighbor.neighbor_id == article_id).all()
+        ]
+
+    def replace_neighbors(self, article_id: int, neighbors: list[tuple[int, float]]) -> None:
+        self.db.query(ArticleNeighbor).filter(ArticleNeighbor.article_id == article_id).delete(synchronize_session=False)
+        self.db.add_all(
+            ArticleNeighbor(article_id=article_id, neighbor_id=neighbor_id, score=score)
+            for neighbor_id, score in neighbors
+        )
+        self.db.commit()
+
+    def offer_neighbor(self, article_id: int, neighbor_id: int, score: float, k: int) -> bool:
+        """Add or rescore one edge if it belongs in article_id's top k; returns whether the list changed."""
+        edges = {
+            edge.neighbor_id: edge for edge in
+            self.db.query(ArticleNeighbor).filter(ArticleNeighbor.article_id == article_id).all()
+        }
+        if neighbor_id in edges:
+            edges[neighbor_id].score = score
+        elif len(edges) < k:
+            self.db.add(ArticleNeighbor(article_id=article_id, neighbor_id=neighbor_id, score=score))
+        else:
+            weakest = min(edges.values(), key=lambda edge: edge.score)
+            if score <= weakest.score:
+                return False
+            self.db.delete(weakest)
+            self.db.add(ArticleNeighbor(article_id=article_id, neighbor_id=neighbor_id, score=score))
+        self.db.commit()
+        return True
+
+    def delete_article(self, article_id: int) -> None:
+        """Drop every edge from or to article_id."""
+        self.db.query(ArticleNeighbor).filter(
+            (ArticleNeighbor.article_id == article_id) | (ArticleNeighbor.neighbor_id == article_id)
+        ).delete(synchronize_session=False)
+        self.db.commit()
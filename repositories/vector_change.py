@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from ..models.vector_change import VectorChange
+
+
+class VectorChangeRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, namespace: str, item_ids: list[int]) -> None:
+        """Log that the items' vectors changed; committed with the caller's write."""
+        self.db.add_all([VectorChange(namespace=namespace, item_id=item_id) for item_id in dict.fromkeys(item_ids)])
+
+    def latest_id(self) -> int:
+        return self.db.query(func.max(VectorChange.id)).scalar() or 0
+
+    def list_after(self, after_id: int, limit: int, also_ids: list[int] | None = None) -> list[tuple[int, str, int]]:
+        """(change id, namespace, item id) of the changes past after_id (plus the changes also_ids), oldest first."""
+        newer = VectorChange.id > after_id
+        query = self.db.query(VectorChange.id, VectorChange.namespace, VectorChange.item_id).filter(
+            or_(newer, VectorChange.id.in_(also_ids)) if also_ids else newer
+        )
+        return [tuple(row) for row in query.order_by(VectorChange.id).limit(limit).all()]
+
+    def prune(self, before: datetime) -> int:
+        """Drop changes logged before the given time; returns how many."""
+        deleted = self.db.query(VectorChange).filter(VectorChange.created_at < before).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
@@ -0,0 +1,54 @@
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models.vector_store import VectorStoreItem
+
+
+class VectorStoreRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def count(self, namespace: str) -> int:
+        return self.db.query(VectorStoreItem).filter(VectorStoreItem.namespace == namespace).count()
+
+    def exists(self, namespace: str, item_id: int | None = None) -> bool:
+        """Whether the namespace holds any item (or the given one)."""
+        query = self.db.query(VectorStoreItem.item_id).filter(VectorStoreItem.namespace == namespace)
+        if item_id is not None:
+            query = query.filter(VectorStoreItem.item_id == item_id)
+        return query.first() is not None
+
+    def upsert(self, namespace: str, item_id: int, embedding: bytes) -> None:
+        self.db.merge(VectorStoreItem(namespace=namespace, item_id=item_id, embedding=embedding))
+        self.db.commit()
+
+    def delete(self, namespace: str, item_id: int) -> bool:
+        deleted = (
+            self.db.query(VectorStoreItem)
+            .filter(VectorStoreItem.namespace == namespace, VectorStoreItem.item_id == item_id)
+            .delete(synchronize_session=False)
+        )
+        self.db.commit()
+        return deleted > 0
+
+    def replace_all(self, namespace: str, rows: Iterator[list[tuple[int, bytes]]]) -> None:
+        """Swap the namespace's contents for the given blocks of (item_id, embedding) in one transaction."""
+        self.db.query(VectorStoreItem).filter(VectorStoreItem.namespace == namespace).delete(synchronize_session=False)
+        for block in rows:
+            self.db.bulk_insert_mappings(
+                VectorStoreItem,
+                [{"namespace": namespace, "item_id": item_id, "embedding": embedding} for item_id, embedding in block],
+            )
+        self.db.commit()
+
+    def iter_blocks(self, namespace: str, batch_size: int = 1000) -> Iterator[list[tuple[int, bytes]]]:
+        """Stream (item_id, embedding) rows, batch_size at a time over a server-side cursor."""
+        query = (
+            select(VectorStoreItem.item_id, VectorStoreItem.embedding)
+            .where(VectorStoreItem.namespace == namespace)
+            .order_by(VectorStoreItem.item_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for rows in self.db.execute(query).partitions():
+            yield [tuple(row) for row in rows]
@@ -1,8 +1,19 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
+from enum import Enum
 
 from .tag import TagRead
 
+class SearchMode(str, Enum):
+    LEXICAL = "lexical"  # full-text index only, no embedding call
+    VECTOR = "vector"
+    HYBRID = "hybrid"  # reciprocal rank fusion of both
+
+class EmbeddingStatus(str, Enum):
+    PENDING = "pending"  # queued for the background embedding worker; not yet in vector search
+    READY = "ready"
+    FAILED = "failed"  # the embedding job exhausted its retries
+
 class ArticleBase(BaseModel):
     title: str
     content: str
@@ -11,11 +22,52 @@ class ArticleCreate(ArticleBase):
     tags: list[str] | None = None
 
 class ArticleRead(ArticleBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     author_id: int
     tags: list[TagRead] | None = None
     created_at: datetime
+    embedding_status: EmbeddingStatus = EmbeddingStatus.READY
+
+class ArticleBulkItemResult(BaseModel):
+    index: int  # position of the item in the request
+    id: int | None = None
+    error: str | None = None
 
-    class Config:
-        orm_mode = True
+class ArticleBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: list[ArticleBulkItemResult]
+
+class ArticleChunkRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    article_id: int
+    chunk_index: int
+    start_offset: int
+    end_offset: int
+    content: str
+
+class ChunkSearchResult(BaseModel):
+    chunk: ArticleChunkRead
+    score: float
+
+class RelatedArticle(BaseModel):
+    article: ArticleRead
+    score: float
+
+class ArticleSearchHit(BaseModel):
+    article: ArticleRead
+    score: float
+
+class ArticleBatchSearchRequest(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=100)
+    top_k: int = Field(5, ge=1, le=100)
+    tags: list[str] | None = None
+    author_id: int | None = None
 
+class ArticleBatchSearchResult(BaseModel):
+    query: str
+    hits: list[ArticleSearchHit]
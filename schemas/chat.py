@@ -32,6 +32,8 @@ class ChatMessageRead(ChatMessageBase):
 
 class ChatRequest(BaseModel):
     message: str
+    tags: list[str] | None = None  # Only retrieve from articles with any of these tags
+    author_id: int | None = None  # Only retrieve from this author's articles
 
 class ChatResponse(BaseModel):
     message: ChatMessageRead
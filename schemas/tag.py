@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class TagBase(BaseModel):
     name: str
@@ -7,7 +7,6 @@ class TagCreate(TagBase):
     pass
 
 class TagRead(TagBase):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    id: int
\ No newline at end of file
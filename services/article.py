@@ -1,12 +1,53 @@
+import hashlib
+import logging
+
+import openai
+
 from ..repositories.article import ArticleRepository
-from ..schemas.article import ArticleCreate
+from ..repositories.job import JobRepository
+from ..schemas.article import ArticleCreate, EmbeddingStatus
 from ..models.article import Article
-from .embedding import EmbeddingService
+from .embedding import EmbeddingService, decode_embedding
+from .vector_store import VectorStore
+from .chunk import ChunkService
+
+
+logger = logging.getLogger(__name__)
+
+# Articles embedded and inserted per transaction during bulk import
+BULK_BATCH_SIZE = 100
+
+# Provider failures that say nothing about the inputs, so splitting the request would not help
+TRANSIENT_EMBEDDING_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+# Background job that embeds, indexes and chunks one article; see ArticleService.embed_articles
+EMBED_ARTICLE_JOB = "embed_article"
+
+
+def embed_job_key(article_id: int) -> str:
+    return f"article:{article_id}"
+
+
+def hash_content(content: str) -> str:
+    """Fingerprint of the text an article's embedding is built from."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
 
 class ArticleService:
-    def __init__(self, repo: ArticleRepository, embedding_service: EmbeddingService):
+    def __init__(
+        self,
+        repo: ArticleRepository,
+        embedding_service: EmbeddingService,
+        index: VectorStore,
+        chunk_service: ChunkService | None = None,
+        jobs: JobRepository | None = None,
+    ):
         self.repo = repo
         self.embedding_service = embedding_service
+        self.index = index
+        self.chunk_service = chunk_service
+        # With a job queue, writes store the text and leave embedding to the background workers
+        self.jobs = jobs
 
     def get_article(self, article_id: int) -> Article | None:
         return self.repo.get(article_id)
@@ -14,15 +55,183 @@ class ArticleService:
     def list_articles(self, skip: int = 0, limit: int = 10, tags: list[str] | None = None) -> list[Article]:
         return self.repo.list_articles(skip=skip, limit=limit, tags=tags)
 
+    def _embed_content(self, content: str, content_hash: str):
+        """Reuse the vector of an article with identical content and model, otherwise call the provider."""
+        stored = self.repo.find_embedding_by_content_hash(content_hash, model=self.embedding_service.model_id)
+        if stored is not None:
+            return decode_embedding(stored)
+        return self.embedding_service.generate_embedding(content)
+
     def create_article(self, article: ArticleCreate, author_id: int) -> Article:
-        embedding = self.embedding_service.generate_embedding(article.content)
-        embedding = self.embedding_service.embedding_to_json(embedding)
-        return self.repo.create(article, author_id, embedding=embedding)
+        if self.jobs is not None:
+            db_article = self.repo.create(article, author_id, embedding_status=EmbeddingStatus.PENDING.value)
+            self._enqueue_embedding([db_article.id])
+            return db_article
+        content_hash = hash_content(article.content)
+        vector = self._embed_content(article.content, content_hash)
+        embedding = self.embedding_service.embedding_to_bytes(vector)
+        db_article = self.repo.create(
+            article, author_id, embedding=embedding, content_hash=content_hash, embedding_model=self.embedding_service.model_id
+        )
+        self.index.upsert(db_article.id, vector)
+        if self.chunk_service:
+            self.chunk_service.index_article(db_article.id, article.content, vector)
+        return db_article
+
+    def bulk_create_articles(self, articles: list[ArticleCreate], author_id: int, batch_size: int = BULK_BATCH_SIZE) -> list[int | Exception]:
+        """
+        Create many articles, embedding and inserting them batch by batch.
+        Returns one entry per input: the new article id, or the error for that item.
+        """
+        results: list[int | Exception] = []
+        for start in range(0, len(articles), batch_size):
+            batch = articles[start:start + batch_size]
+            if self.jobs is not None:
+                created = self.repo.create_many(
+                    [(article, None, None) for article in batch], author_id, embedding_status=EmbeddingStatus.PENDING.value
+                )
+                self._enqueue_embedding([outcome for outcome in created if not isinstance(outcome, Exception)])
+                results.extend(created)
+            else:
+                results.extend(self._create_batch(batch, author_id))
+        return results
+
+    def _create_batch(self, batch: list[ArticleCreate], author_id: int) -> list[int | Exception]:
+        hashes = [hash_content(article.content) for article in batch]
+        vectors = self._embed_contents([article.content for article in batch], hashes)
+
+        results: list[int | Exception | None] = [None] * len(batch)
+        pending = []
+        for i, (article, content_hash) in enumerate(zip(batch, hashes)):
+            vector = vectors[content_hash]
+            if isinstance(vector, Exception):
+                results[i] = vector
+            else:
+                pending.append((i, vector, (article, self.embedding_service.embedding_to_bytes(vector), content_hash)))
+
+        created = self.repo.create_many([row for _, _, row in pending], author_id, embedding_model=self.embedding_service.model_id)
+        to_chunk = []
+        for (i, vector, (article, _, _)), outcome in zip(pending, created):
+            results[i] = outcome
+            if not isinstance(outcome, Exception):
+                self.index.upsert(outcome, vector)
+                to_chunk.append((outcome, article.content, vector))
+        if self.chunk_service and to_chunk:
+            try:
+                self.chunk_service.index_articles(to_chunk)
+            except Exception:
+                # The articles are stored and searchable; chunks can be backfilled later
+                logger.exception("Chunking failed for %d imported articles", len(to_chunk))
+        return results
+
+    def _embed_contents(self, contents: list[str], hashes: list[str]) -> dict:
+        """Vectors for each distinct hash: reused from the database or embedded in packed requests."""
+        stored = self.repo.find_embeddings_by_content_hashes(set(hashes), model=self.embedding_service.model_id)
+        vectors: dict = {content_hash: decode_embedding(blob) for content_hash, blob in stored.items()}
+        missing = {content_hash: content for content, content_hash in zip(contents, hashes) if content_hash not in vectors}
+        if missing:
+            vectors.update(zip(missing.keys(), self._embed_isolating_failures(list(missing.values()))))
+        return vectors
+
+    def _embed_isolating_failures(self, texts: list[str]) -> list:
+        """
+        One vector or error per text. A rejected request is split in halves until the
+        inputs that fail on their own are found, so they alone get the error.
+        """
+        try:
+            return self.embedding_service.generate_embeddings(texts)
+        except TRANSIENT_EMBEDDING_ERRORS as exc:
+            return [exc] * len(texts)
+        except Exception as exc:
+            if len(texts) == 1:
+                return [exc]
+            middle = len(texts) // 2
+            return self._embed_isolating_failures(texts[:middle]) + self._embed_isolating_failures(texts[middle:])
 
     def update_article(self, article_id: int, article: ArticleCreate) -> Article | None:
-        embedding = self.embedding_service.generate_embedding(article.content)
-        embedding = self.embedding_service.embedding_to_json(embedding)
-        return self.repo.update(article_id, article, embedding=embedding)
+        db_article = self.repo.get(article_id)
+        if not db_article:
+            return None
+        content_hash = hash_content(article.content)
+        if (
+            db_article.content_hash == content_hash
+            and db_article.embedding_vector is not None
+            and db_article.embedding_model == self.embedding_service.model_id
+        ):
+            # Title or tags only: the stored vector is still correct
+            return self.repo.update(article_id, article)
+
+        if self.jobs is not None:
+            # The previous vector keeps serving search until the job replaces it
+            db_article = self.repo.update(article_id, article, embedding_status=EmbeddingStatus.PENDING.value)
+            self._enqueue_embedding([article_id])
+            return db_article
+
+        vector = self._embed_content(article.content, content_hash)
+        embedding = self.embedding_service.embedding_to_bytes(vector)
+        db_article = self.repo.update(
+            article_id, article, embedding=embedding, content_hash=content_hash, embedding_model=self.embedding_service.model_id
+        )
+        if db_article:
+            self.index.upsert(db_article.id, vector)
+            if self.chunk_service:
+                self.chunk_service.index_article(db_article.id, article.content, vector)
+        return db_article
+
+    def _enqueue_embedding(self, article_ids: list[int]) -> None:
+        self.jobs.enqueue_many(EMBED_ARTICLE_JOB, [(embed_job_key(i), {"article_id": i}) for i in article_ids])
+
+    def enqueue_pending(self) -> int:
+        """Queue embedding for pending articles that have no job, e.g. after a crash between the two commits."""
+        pending = self.repo.list_ids_by_embedding_status(EmbeddingStatus.PENDING.value)
+        queued = self.jobs.open_keys(EMBED_ARTICLE_JOB, [embed_job_key(i) for i in pending])
+        missing = [i for i in pending if embed_job_key(i) not in queued]
+        if missing:
+            self._enqueue_embedding(missing)
+        return len(missing)
+
+    def embed_articles(self, article_ids: list[int]) -> list[int]:
+        """
+        Background half of create/update: embed stored articles whose vector is missing or
+        stale, in packed provider requests, then update the index and chunks. Raises if the
+        provider fails so the job is retried. Returns the ids whose vector changed.
+        """
+        model = self.embedding_service.model_id
+        articles = self.repo.get_many(list(dict.fromkeys(article_ids)))
+        stale = []
+        for article in articles:
+            content_hash = hash_content(article.content)
+            if article.embedding_vector is not None and article.content_hash == content_hash and article.embedding_model == model:
+                if article.embedding_status != EmbeddingStatus.READY.value:
+                    self.repo.set_embedding_status([article.id], EmbeddingStatus.READY.value)
+            else:
+                stale.append((article.id, article.content, content_hash))
+        if not stale:
+            return []
+
+        vectors = self._embed_contents([content for _, content, _ in stale], [content_hash for _, _, content_hash in stale])
+        for vector in vectors.values():
+            if isinstance(vector, Exception):
+                raise vector
+        # An article edited meanwhile is skipped; the edit queued its own job
+        saved = set(self.repo.save_embeddings([
+            (article_id, content, self.embedding_service.embedding_to_bytes(vectors[content_hash]), content_hash, model)
+            for article_id, content, content_hash in stale
+        ]))
+        stale = [row for row in stale if row[0] in saved]
+        for article_id, _, content_hash in stale:
+            self.index.upsert(article_id, vectors[content_hash])
+        if self.chunk_service and stale:
+            self.chunk_service.index_articles([
+                (article_id, content, vectors[content_hash]) for article_id, content, content_hash in stale
+            ])
+        return [article_id for article_id, _, _ in stale]
 
     def delete_article(self, article_id: int) -> bool:
-        return self.repo.delete(article_id)
\ No newline at end of file
+        chunk_ids = self.chunk_service.chunk_ids_for(article_id) if self.chunk_service else []
+        deleted = self.repo.delete(article_id)
+        if deleted:
+            self.index.remove(article_id)
+            if self.chunk_service:
+                self.chunk_service.remove_from_index(chunk_ids)
+        return deleted
@@ -1,27 +1,65 @@
+import asyncio
 import json
-from openai import AzureOpenAI
+from typing import AsyncIterator, Callable, TypeVar
+
+import anyio
+from openai import AsyncAzureOpenAI
+from sqlalchemy.orm import Session
 from ..repositories.chat import ChatRepository
+from ..repositories.job import JobRepository
 from ..services.search import SearchService
 from ..models.chat import ChatSession, ChatMessage
-from ..models.article import Article
 from ..schemas.chat import ChatMessageRead
+from .chat_summary import SUMMARIZE_CHAT_JOB, summary_job_key
+from .context_builder import ContextBuilder
+from .openai_client import DEFAULT_API_VERSION, AsyncOpenAIClient
+
+T = TypeVar("T")
+
+SYSTEM_PROMPT = """You are a helpful AI assistant for a knowledge base. Answer questions based
+        on the provided context from the knowledge base articles. If the context doesn't contain relevant
+        information, say so clearly. Always cite which articles you used to answer."""
 
 class ChatService:
+    """
+    RAG chat. Session and history reads are plain blocking calls; sending a message
+    is async: retrieval (query embedding and vector search), the history load and
+    the user-message insert run concurrently on worker threads, and the model is
+    awaited on the event loop so no thread is held while it answers.
+
+    With session_factory, each concurrent database step gets its own session (a
+    Session must not be shared across threads); without it the steps run one
+    after another on repo's session.
+
+    Prompts carry the session's rolling summary plus the messages it does not
+    cover yet. With summarize_every set, a background summary refresh is queued
+    once that many turns have piled up beyond the recent_messages kept verbatim.
+    """
+
     def __init__(
         self,
         repo: ChatRepository,
         search_service: SearchService,
         azure_openai_key: str,
         azure_openai_endpoint: str,
-        api_version: str = "2025-04-01-preview",
+        api_version: str = DEFAULT_API_VERSION,
+        client: AsyncOpenAIClient | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        context_builder: ContextBuilder | None = None,
+        summarize_every: int = 0,
+        recent_messages: int = 6,
     ):
         self.repo = repo
         self.search_service = search_service
-        self.client = AzureOpenAI(
+        self.client = client or AsyncAzureOpenAI(
             api_key=azure_openai_key,
             azure_endpoint=azure_openai_endpoint,
             api_version=api_version
         )
+        self.session_factory = session_factory
+        self.context_builder = context_builder or ContextBuilder()
+        self.summarize_every = summarize_every  # turns; 0 never summarizes
+        self.recent_messages = recent_messages
     
     def create_session(self, user_id: int, title: str | None = None) -> ChatSession:
         return self.repo.create_session(user_id, title)
@@ -29,73 +67,159 @@ class ChatService:
     def get_session(self, session_id: int) -> ChatSession | None:
         return self.repo.get_session(session_id)
     
-    def list_user_sessions(self, user_id: int) -> list[ChatSession]:
-        return self.repo.list_user_sessions(user_id)
+    def list_user_sessions(self, user_id: int, limit: int | None = None, before_id: int | None = None) -> list[ChatSession]:
+        return self.repo.list_user_sessions(user_id, limit=limit, before_id=before_id)
     
-    def get_session_messages(self, session_id: int) -> list[ChatMessage]:
-        return self.repo.get_session_messages(session_id)
+    def get_session_messages(self, session_id: int, limit: int | None = None, before_id: int | None = None) -> list[ChatMessage]:
+        return self.repo.get_session_messages(session_id, limit=limit, before_id=before_id)
     
-    def send_message(self, session_id: int, user_message: str, model: str = "gpt-4o") -> tuple[ChatMessageRead, list[int]]:
+    async def send_message(
+        self,
+        session_id: int,
+        user_message: str,
+        model: str = "gpt-4o",
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> tuple[ChatMessageRead, list[int]]:
         """
         Send a message and get AI response using RAG.
+        Retrieval is limited to articles carrying one of tags and/or written by author_id.
         Return: (assistant_message, source_article_ids)
         """
-        # 1. Store user message
-        self.repo.add_message(session_id, role="user", content=user_message)
+        prompt, source_ids, unsummarized = await self._prepare_turn(session_id, user_message, tags, author_id)
 
-        # 2. Search for relevant articles (RAG retrieval)
-        search_results = self.search_service.search_articles(user_message, top_k=3)
+        # Call Azure OpenAI chat completion
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=prompt,
+            temperature=0.7,
+            max_tokens=500
+        )
 
-        # 3. Build context from search results
-        context = self._build_context(search_results)
-        source_ids = [article.id for article, score in search_results]
+        assistant_message = response.choices[0].message.content
 
-        # 4. Get chat history for context
-        messages = self.repo.get_session_messages(session_id)
-        conversation_history = self._build_conversation_history(messages[-10:])  # Last 10 messages
+        # Store assistant message with sources
+        message = await self._store_reply(session_id, assistant_message, source_ids, unsummarized)
+        return message, source_ids
 
-        # 5. Create prompt with context
-        system_prompt = """You are a helpful AI assistant for a knowledge base. Answer questions based
-        on the provided context from the knowledge base articles. If the context doesn't contain relevant
-        information, say so clearly. Always cite which articles you used to answer."""
+    async def stream_message(
+        self,
+        session_id: int,
+        user_message: str,
+        model: str = "gpt-4o",
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> AsyncIterator[tuple[str, object]]:
+        """
+        Streaming variant of send_message. Yields ("sources", article_ids) once retrieval
+        is done, then ("token", text) for each piece of the reply as the model produces
+        it, and finally ("done", ChatMessageRead) once the reply is stored. Closing the
+        generator early (the client went away) stores the reply received so far.
+        """
+        prompt, source_ids, unsummarized = await self._prepare_turn(session_id, user_message, tags, author_id)
+        yield "sources", source_ids
+
+        parts: list[str] = []
+        finished = False
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=prompt,
+            temperature=0.7,
+            max_tokens=500,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    parts.append(content)
+                    yield "token", content
+            finished = True
+        finally:
+            # Shielded so a cancelled request (client disconnect) still stores the partial reply
+            with anyio.CancelScope(shield=True):
+                await stream.close()  # stop generating tokens nobody will read
+                if finished or parts:
+                    message = await self._store_reply(session_id, "".join(parts), source_ids, unsummarized)
+        yield "done", message
+
+    async def _prepare_turn(
+        self, session_id: int, user_message: str, tags: list[str] | None, author_id: int | None
+    ) -> tuple[list[dict], list[int], int]:
+        """
+        Store the user message and build the completion prompt. Returns (messages,
+        source_article_ids, number of messages the summary does not cover, this turn's included).
+        The insert, the retrieval and the history load do not depend on each other and run together.
+        """
+        steps = (
+            lambda: self._in_session(lambda repo: repo.add_message(session_id, role="user", content=user_message)),
+            lambda: anyio.to_thread.run_sync(self._retrieve, user_message, tags, author_id),
+            lambda: self._in_session(lambda repo: self._load_history(repo, session_id)),
+        )
+        if self.session_factory is not None:
+            _, (context, source_ids), (summary, history) = await asyncio.gather(*(step() for step in steps))
+        else:
+            _, (context, source_ids), (summary, history) = [await step() for step in steps]
+
+        # Unsummarized messages ending with this question, whether or not the history load saw
+        # its insert, trimmed oldest-first to the history token budget after the summary
+        question = {"role": "user", "content": user_message}
+        if history[-1:] == [question]:
+            history.pop()
+        conversation_history = self.context_builder.fit_history([*history, question], summary=summary)
 
         user_prompt = f"""Context from knowledge base: 
         {context} 
 
         User question: {user_message}"""
 
-        # 6. Call Azure OpenAI chat completion
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *conversation_history,
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
+        prompt = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *conversation_history,
+            {"role": "user", "content": user_prompt}
+        ]
+        return prompt, source_ids, len(history) + 2  # this question and its reply
 
-        assistant_message = response.choices[0].message.content
+    def _load_history(self, repo: ChatRepository, session_id: int) -> tuple[str | None, list[dict]]:
+        """The session's rolling summary and the newest messages after it, in OpenAI message format."""
+        session = repo.get_session(session_id)
+        # Enough messages for the prompt, and for the backlog count that triggers a summary refresh
+        window = max(self.context_builder.max_messages, self.recent_messages + 2 * self.summarize_every)
+        messages = repo.get_recent_messages(session_id, window, after_id=session.summary_through_id)
+        history = [{"role": m.role, "content": m.content} for m in messages if m.role in ("user", "assistant")]
+        return session.summary, history
 
-        # 7. Store assistant message with sources
-        message = self.repo.add_message(
-            session_id,
-            role="assistant",
-            content=assistant_message,
-            sources=json.dumps(source_ids)
-        )
+    def _retrieve(self, user_message: str, tags: list[str] | None, author_id: int | None) -> tuple[str, list[int]]:
+        """
+        Search for relevant passages (RAG retrieval) and build the context within its token
+        budget, falling back to whole articles while no chunks have been indexed yet.
+        Returns (context, ids of the articles the context quotes).
+        """
+        chunk_results = self.search_service.search_chunks(user_message, top_k=6, tags=tags, author_id=author_id)
+        if chunk_results:
+            return self.context_builder.build_chunk_context(user_message, chunk_results)
+        search_results = self.search_service.search_articles(user_message, top_k=3, tags=tags, author_id=author_id)
+        return self.context_builder.build_article_context(user_message, search_results)
 
-        # Convert to Pydantic model before returning
-        return ChatMessageRead.model_validate(message), source_ids
+    async def _store_reply(self, session_id: int, content: str, source_ids: list[int], unsummarized: int) -> ChatMessageRead:
+        refresh_summary = bool(self.summarize_every) and unsummarized - self.recent_messages >= 2 * self.summarize_every
 
-    def _build_context(self, search_results: list[tuple[Article, float]]) -> str:
-        """Build context string from search results."""
-        context_parts = []
-        for i, (article, score) in enumerate(search_results, 1):
-            context_parts.append(f"Article {i} (ID: {article.id}, Title: {article.title}):\n{article.content}\n")
-        return "\n".join(context_parts)
-    
-    def _build_conversation_history(self, messages: list[ChatMessage]) -> list[dict]:
-        """Convert ChatMessage list to OpenAI message format."""
-        return [{"role": msg.role, "content": msg.content} for msg in messages if msg.role in ["user", "assistant"]]
+        def store(repo: ChatRepository) -> ChatMessageRead:
+            message = repo.add_message(session_id, role="assistant", content=content, sources=json.dumps(source_ids))
+            if refresh_summary:
+                JobRepository(repo.db).enqueue(SUMMARIZE_CHAT_JOB, {"session_id": session_id}, key=summary_job_key(session_id))
+            return ChatMessageRead.model_validate(message)
+
+        return await self._in_session(store)
+
+    async def _in_session(self, work: Callable[[ChatRepository], T]) -> T:
+        """Run blocking repository work on a worker thread, in its own session when a factory is set."""
+        def run() -> T:
+            if self.session_factory is None:
+                return work(self.repo)
+            db = self.session_factory()
+            try:
+                return work(ChatRepository(db))
+            finally:
+                db.close()
+        return await anyio.to_thread.run_sync(run)
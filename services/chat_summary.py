@@ -0,0 +1,88 @@
+from ..repositories.chat import ChatRepository
+from .context_builder import TokenCounter
+from .openai_client import OpenAIClient
+
+SUMMARIZE_CHAT_JOB = "summarize_chat"
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a knowledge
+base assistant. Merge the new messages into the current summary. Keep facts, names, numbers,
+decisions, the user's goals and open questions, and the ids of articles that were cited.
+Drop pleasantries. Write at most {words} words of plain prose."""
+
+
+def summary_job_key(session_id: int) -> str:
+    return f"chat:{session_id}"
+
+
+class ChatSummaryService:
+    """
+    Folds the older messages of a chat session into its rolling summary, so
+    prompts carry the summary plus only the newest messages. The keep_recent
+    newest messages are never folded in; prompts still send them verbatim.
+    Runs as a background job (SUMMARIZE_CHAT_JOB) with the sync client.
+
+    One refresh folds at most max_messages messages, and no more than fit
+    input_tokens, so a long backlog is caught up over several refreshes
+    instead of in one request that outgrows the model's context.
+    """
+
+    def __init__(
+        self,
+        repo: ChatRepository,
+        client: OpenAIClient,
+        model: str = "gpt-4o",
+        keep_recent: int = 6,
+        max_tokens: int = 300,
+        max_messages: int = 40,
+        input_tokens: int = 6000,
+        counter: TokenCounter | None = None,
+    ):
+        self.repo = repo
+        self.client = client
+        self.model = model
+        self.keep_recent = keep_recent
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.input_tokens = input_tokens
+        self.counter = counter or TokenCounter()
+
+    def summarize(self, session_id: int) -> bool:
+        """Fold the next batch of messages older than the recent window into the summary; returns whether it changed."""
+        session = self.repo.get_session(session_id)
+        if session is None:
+            return False
+        messages = self.repo.get_messages_after(session_id, session.summary_through_id, limit=self.max_messages + self.keep_recent)
+        older = messages[:len(messages) - self.keep_recent] if self.keep_recent else messages
+        older = older[:self.max_messages]
+        if not older:
+            return False
+
+        lines, budget = [], self.input_tokens - self.counter.count(session.summary or "")
+        for message in older:
+            line = f"{message.role}: {message.content}"
+            cost = self.counter.count(line)
+            if lines and cost > budget:
+                break
+            lines.append(line if cost <= budget else self.counter.truncate(line, max(budget, 0)))
+            budget -= cost
+        older = older[:len(lines)]  # the summary covers only what was sent
+
+        transcript = "\n\n".join(lines)
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT.format(words=self.max_tokens * 2 // 3)},
+                {"role": "user", "content": f"Current summary:\n{session.summary or '(none yet)'}\n\nNew messages:\n{transcript}"},
+            ],
+            temperature=0.2,
+            max_tokens=self.max_tokens,
+        )
+        summary = response.choices[0].message.content
+        return self.repo.update_summary(session_id, summary, older[-1].id, session.summary_through_id)
+
+    def has_backlog(self, session_id: int) -> bool:
+        """Whether messages older than the recent window are still left out of the summary."""
+        session = self.repo.get_session(session_id)
+        if session is None:
+            return False
+        return len(self.repo.get_messages_after(session_id, session.summary_through_id, limit=self.keep_recent + 1)) > self.keep_recent
@@ -0,0 +1,74 @@
+import numpy as np
+
+from ..repositories.chunk import ChunkRepository
+from ..models.chunk import ArticleChunk
+from .chunking import TextChunker
+from .embedding import EmbeddingService, encode_embedding
+from .vector_store import VectorStore
+
+
+class ChunkService:
+    """Keeps article_chunks rows and the shared chunk index in step with article content."""
+
+    def __init__(
+        self,
+        repo: ChunkRepository,
+        embedding_service: EmbeddingService,
+        index: VectorStore,
+        chunker: TextChunker,
+    ):
+        self.repo = repo
+        self.embedding_service = embedding_service
+        self.index = index
+        self.chunker = chunker
+
+    def index_article(self, article_id: int, content: str, article_vector: list[float] | np.ndarray | None = None) -> None:
+        self.index_articles([(article_id, content, article_vector)])
+
+    def index_articles(self, articles: list[tuple[int, str, list[float] | np.ndarray | None]]) -> None:
+        """
+        Re-chunk and embed (article_id, content, article_vector) triples with one batched
+        embedding call. An article that fits in a single chunk reuses its article vector,
+        which must come from the same embedding model.
+        """
+        chunks_by_article: dict[int, list[ArticleChunk]] = {}
+        vectors: list = []
+        to_embed: list[int] = []
+        for article_id, content, article_vector in articles:
+            spans = self.chunker.split(content)
+            chunks_by_article[article_id] = []
+            for position, (start, end) in enumerate(spans):
+                chunks_by_article[article_id].append(ArticleChunk(
+                    article_id=article_id,
+                    chunk_index=position,
+                    start_offset=start,
+                    end_offset=end,
+                    content=content[start:end],
+                ))
+                if len(spans) == 1 and article_vector is not None:
+                    vectors.append(article_vector)
+                else:
+                    vectors.append(None)
+                    to_embed.append(len(vectors) - 1)
+
+        chunks = [chunk for article_chunks in chunks_by_article.values() for chunk in article_chunks]
+        if to_embed:
+            embedded = self.embedding_service.generate_embeddings([chunks[i].content for i in to_embed])
+            for i, vector in zip(to_embed, embedded):
+                vectors[i] = vector
+        for chunk, vector in zip(chunks, vectors):
+            chunk.embedding = encode_embedding(vector)
+            chunk.embedding_model = self.embedding_service.model_id
+
+        removed, new_ids = self.repo.replace_chunks(chunks_by_article)
+        for chunk_id in removed:
+            self.index.remove(chunk_id)
+        for chunk_id, vector in zip(new_ids, vectors):
+            self.index.upsert(chunk_id, np.asarray(vector, dtype=np.float32))
+
+    def chunk_ids_for(self, article_id: int) -> list[int]:
+        return self.repo.list_chunk_ids([article_id])
+
+    def remove_from_index(self, chunk_ids: list[int]) -> None:
+        for chunk_id in chunk_ids:
+            self.index.remove(chunk_id)
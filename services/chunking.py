@@ -0,0 +1,34 @@
+class TextChunker:
+    """
+    Split text into overlapping character windows of roughly `size` characters.
+    Cuts prefer paragraph, line, sentence and word boundaries in the back half
+    of each window, and every span is returned as (start, end) offsets.
+    """
+
+    BOUNDARIES = ("\n\n", "\n", ". ", " ")
+
+    def __init__(self, size: int = 1200, overlap: int = 200):
+        if size <= 0 or not 0 <= overlap < size:
+            raise ValueError("Chunk size must be positive and overlap smaller than size")
+        self.size = size
+        self.overlap = overlap
+
+    def split(self, text: str) -> list[tuple[int, int]]:
+        spans: list[tuple[int, int]] = []
+        start, length = 0, len(text)
+        while start < length:
+            end = min(start + self.size, length)
+            if end < length:
+                for boundary in self.BOUNDARIES:
+                    cut = text.rfind(boundary, start + self.size // 2, end)
+                    if cut != -1:
+                        end = cut + len(boundary)
+                        break
+            spans.append((start, end))
+            if end >= length:
+                break
+            next_start = max(end - self.overlap, start + 1)
+            # Start the overlap on a word boundary rather than mid-word
+            space = text.find(" ", next_start, end)
+            start = space + 1 if space != -1 else next_start
+        return spans
@@ -0,0 +1,190 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from ..models.article import Article
+from ..models.chunk import ArticleChunk
+from .chunking import TextChunker
+from .embedding import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the conservative character estimate
+    tiktoken = None
+
+# Tokenizer of the gpt-4o family, used when tiktoken is installed
+DEFAULT_ENCODING = "o200k_base"
+
+# Role and separator tokens the API adds around every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+WORD = re.compile(r"\w+")
+PASSAGE_SEPARATOR = "\n...\n"
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens with the model's tokenizer, or a conservative
+    estimate (about 3 characters per token) when tiktoken is not installed.
+    Counts for keyed texts, such as articles by content hash, are kept in a
+    bounded LRU so a popular article is only tokenized once.
+    """
+
+    def __init__(self, encoding: str = DEFAULT_ENCODING, cache_size: int = 4096):
+        self.encoding = tiktoken.get_encoding(encoding) if tiktoken is not None else None
+        self.cache_size = cache_size
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str, key: str | None = None) -> int:
+        if key is not None:
+            with self._lock:
+                if key in self._counts:
+                    self._counts.move_to_end(key)
+                    return self._counts[key]
+        tokens = len(self.encoding.encode(text, disallowed_special=())) if self.encoding else estimate_tokens(text)
+        if key is not None:
+            with self._lock:
+                self._counts[key] = tokens
+                while len(self._counts) > self.cache_size:
+                    self._counts.popitem(last=False)
+        return tokens
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of text within max_tokens (cut at a word boundary without a tokenizer)."""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        if estimate_tokens(text) <= max_tokens:
+            return text
+        cut = text[:(max_tokens - 1) * 3]
+        space = cut.rfind(" ")
+        return cut[:space] if space > 0 else cut
+
+
+class ContextBuilder:
+    """
+    Fits retrieved knowledge and conversation history into token budgets.
+
+    Passage hits are taken best-first until context_tokens is used. Whole
+    articles (the fallback before chunks are indexed) share the budget; one
+    that does not fit is cut down to its passages that best match the
+    query's terms, kept in document order. History keeps the session's
+    summary and the newest messages, up to max_messages, that fit
+    history_tokens.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter | None = None,
+        context_tokens: int = 3000,
+        history_tokens: int = 1500,
+        max_messages: int = 10,
+        chunker: TextChunker | None = None,
+    ):
+        self.counter = counter or TokenCounter()
+        self.context_tokens = context_tokens
+        self.history_tokens = history_tokens
+        self.max_messages = max_messages
+        self.chunker = chunker or TextChunker(600, 0)
+
+    def build_chunk_context(self, query: str, chunk_results: list[tuple[ArticleChunk, float]]) -> tuple[str, list[int]]:
+        """Context from the best passage hits that fit, grouped by article in document order; returns (context, article_ids)."""
+        budget = self.context_tokens
+        selected: dict[int, list[ArticleChunk]] = {}
+        for chunk, score in chunk_results:
+            cost = self.counter.count(chunk.content)
+            if chunk.article_id not in selected:
+                cost += self._header_tokens(chunk.article)
+            if cost > budget:
+                continue  # a smaller, lower-ranked passage may still fit
+            budget -= cost
+            selected.setdefault(chunk.article_id, []).append(chunk)
+
+        context_parts = []
+        for i, chunks in enumerate(selected.values(), 1):
+            article = chunks[0].article
+            passages, end = "", None
+            for chunk in sorted(chunks, key=lambda c: c.start_offset):
+                if end is not None and chunk.start_offset < end:
+                    # Neighbouring chunks overlap; only append the new text
+                    passages += chunk.content[end - chunk.start_offset:]
+                else:
+                    passages += (PASSAGE_SEPARATOR if passages else "") + chunk.content
+                end = max(end or 0, chunk.end_offset)
+            context_parts.append(self._format(i, article, passages))
+        return "\n".join(context_parts), list(selected)
+
+    def build_article_context(self, query: str, search_results: list[tuple[Article, float]]) -> tuple[str, list[int]]:
+        """Context from whole articles, or their most relevant passages, sharing the budget; returns (context, article_ids)."""
+        budget = self.context_tokens
+        context_parts, source_ids = [], []
+        for position, (article, score) in enumerate(search_results):
+            # An even share of what is left, so budget unused by short articles rolls forward
+            share = budget // (len(search_results) - position) - self._header_tokens(article)
+            if share <= 0:
+                continue
+            key = f"article:{article.content_hash}" if article.content_hash else None
+            if self.counter.count(article.content, key=key) <= share:
+                text = article.content
+            else:
+                text = self._relevant_passages(query, article.content, share)
+            if not text:
+                continue
+            part = self._format(len(source_ids) + 1, article, text)
+            budget -= self.counter.count(part)
+            context_parts.append(part)
+            source_ids.append(article.id)
+        return "\n".join(context_parts), source_ids
+
+    def fit_history(self, messages: list[dict], summary: str | None = None) -> list[dict]:
+        """
+        The newest messages that fit the history budget; the last one (the question) is always
+        kept. A rolling summary of earlier messages goes first and is paid for before them.
+        """
+        kept: list[dict] = []
+        budget = self.history_tokens
+        lead = []
+        if summary:
+            lead = [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}]
+            budget -= self.counter.count(lead[0]["content"]) + MESSAGE_OVERHEAD_TOKENS
+        for message in reversed(messages[-self.max_messages:]):
+            cost = self.counter.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if kept and cost > budget:
+                break
+            kept.append(message)
+            budget -= cost
+        return lead + kept[::-1]
+
+    def _relevant_passages(self, query: str, content: str, max_tokens: int) -> str:
+        """The passages of content that best match the query's terms, in document order, within max_tokens."""
+        spans = self.chunker.split(content)
+        passages = [content[start:end] for start, end in spans]
+        terms = {term for term in WORD.findall(query.casefold()) if len(term) > 2}
+        counts = [Counter(WORD.findall(passage.casefold())) for passage in passages]
+        # Rare query terms count for more, as in tf-idf
+        idf = {term: math.log(1 + len(passages) / (1 + sum(term in c for c in counts))) for term in terms}
+        scores = [sum(idf[term] * math.log1p(c[term]) for term in terms) for c in counts]
+
+        chosen, budget = [], max_tokens
+        separator = self.counter.count(PASSAGE_SEPARATOR)
+        for i in sorted(range(len(passages)), key=lambda i: (-scores[i], i)):
+            cost = self.counter.count(passages[i]) + (separator if chosen else 0)
+            if cost <= budget:
+                chosen.append(i)
+                budget -= cost
+        if not chosen:
+            # Not even one passage fits: take the best one, cut to size
+            best = max(range(len(passages)), key=lambda i: (scores[i], -i))
+            return self.counter.truncate(passages[best], max_tokens)
+        return PASSAGE_SEPARATOR.join(passages[i] for i in sorted(chosen))
+
+    def _header_tokens(self, article: Article) -> int:
+        return self.counter.count(self._format(0, article, ""))
+
+    @staticmethod
+    def _format(position: int, article: Article, text: str) -> str:
+        return f"Article {position} (ID: {article.id}, Title: {article.title}):\n{text}\n"
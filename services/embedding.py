@@ -1,26 +1,200 @@
 from openai import AzureOpenAI
 import json
+import numpy as np
+
+from ..repositories.embedding_cache import EmbeddingCacheRepository
+from .embedding_cache import EmbeddingCache, cache_key, normalize_query
+from .openai_client import DEFAULT_API_VERSION, OpenAIClient
+
+# Stored vectors are raw little-endian float32, independent of host byte order
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+# Provider limits per embeddings request, with headroom on the token budget
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 250_000
+MAX_TOKENS_PER_INPUT = 8191
+
+# The model every vector was built with before the model became configurable
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def embedding_model_id(model: str, dimensions: int | None = None) -> str:
+    """Name recorded with each stored vector; vectors are only compared with others of the same id."""
+    return f"{model}@{dimensions}" if dimensions else model
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate (about 3 characters per token) for request packing."""
+    return len(text) // 3 + 1
+
+
+def truncate_for_embedding(text: str, max_tokens: int = MAX_TOKENS_PER_INPUT) -> str:
+    """Cut text to what one embedding input may hold, by the same conservative estimate used for packing."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:(max_tokens - 1) * 3]
+
+
+def pack_batches(texts: list[str], max_inputs: int = MAX_INPUTS_PER_REQUEST, max_tokens: int = MAX_TOKENS_PER_REQUEST) -> list[list[int]]:
+    """Group text positions into provider requests that respect input-count and token limits."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = min(estimate_tokens(text), MAX_TOKENS_PER_INPUT)
+        if current and (len(current) == max_inputs or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def encode_embedding(embedding: list[float] | np.ndarray) -> bytes:
+    """Pack an embedding into the binary form stored in Article.embedding_vector."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def decode_embedding(value: bytes | memoryview | str | None) -> np.ndarray | None:
+    """
+    Decode a stored embedding without copying when it is binary.
+    Legacy JSON text is still accepted while old rows are being migrated.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.frombuffer(value, dtype=EMBEDDING_DTYPE)
+
+
+def decode_embedding_block(values: list[bytes | memoryview | str]) -> np.ndarray:
+    """Decode same-dimension stored embeddings into one float32 matrix, joining binary rows in one copy."""
+    if all(not isinstance(value, str) for value in values):
+        return np.frombuffer(b"".join(values), dtype=EMBEDDING_DTYPE).reshape(len(values), -1)
+    return np.vstack([decode_embedding(value) for value in values])
+
 
 class EmbeddingService:
-    def __init__(self, api_key: str, azure_endpoint: str, api_version: str = "2025-04-01-preview"):
-        self.client = AzureOpenAI(
+    def __init__(
+        self,
+        api_key: str,
+        azure_endpoint: str,
+        api_version: str = DEFAULT_API_VERSION,
+        cache: EmbeddingCache | None = None,
+        cache_repo: EmbeddingCacheRepository | None = None,
+        model: str = DEFAULT_EMBEDDING_MODEL,
+        dimensions: int | None = None,
+        client: OpenAIClient | None = None,
+    ):
+        # A shared client (see core.deps.get_openai_client) keeps its connections open across requests
+        self.client = client or AzureOpenAI(
             api_key=api_key,
             azure_endpoint=azure_endpoint,
             api_version=api_version
         )
-    
-    def generate_embedding(self, text: str, model: str = "text-embedding-ada-002") -> list[float]:
+        self.cache = cache
+        self.cache_repo = cache_repo
+        self.model = model
+        self.dimensions = dimensions  # reduced output size, for models that support it
+
+    @property
+    def model_id(self) -> str:
+        """Recorded as embedding_model on every vector this service produces."""
+        return embedding_model_id(self.model, self.dimensions)
+
+    def _create(self, input: str | list[str], model: str | None):
+        options = {"dimensions": self.dimensions} if self.dimensions else {}
+        # Over-long inputs are rejected by the provider, failing the whole request; embed their beginning
+        input = truncate_for_embedding(input) if isinstance(input, str) else [truncate_for_embedding(text) for text in input]
+        return self.client.embeddings.create(input=input, model=model or self.model, **options)
+
+    def generate_embedding(self, text: str, model: str | None = None) -> list[float]:
         """Generate embedding for give text."""
-        response = self.client.embeddings.create(
-            input=text,
-            model=model
-        )
+        response = self._create(text, model)
         return response.data[0].embedding
-    
+
+    def generate_embeddings(self, texts: list[str], model: str | None = None) -> list[list[float]]:
+        """Embed many texts, packing as many inputs into each provider request as the limits allow."""
+        embeddings: list[list[float] | None] = [None] * len(texts)
+        for batch in pack_batches(texts):
+            response = self._create([texts[i] for i in batch], model)
+            for item in response.data:
+                embeddings[batch[item.index]] = item.embedding
+        return embeddings
+
+    def embed_query(self, text: str, model: str | None = None) -> np.ndarray:
+        """
+        Embed a search query, checking the in-process LRU and then the
+        persistent embedding_cache table before calling the provider.
+        """
+        model_id = embedding_model_id(model or self.model, self.dimensions)
+        normalized = normalize_query(text)
+        key = cache_key(normalized, model_id)
+        embedding = self._cached_query(key)
+        if embedding is None:
+            embedding = self._store_query(key, model_id, self.generate_embedding(normalized, model=model))
+        return embedding
+
+    def embed_queries(self, texts: list[str], model: str | None = None) -> np.ndarray:
+        """
+        Embed several search queries as rows of one matrix. Cached queries are
+        answered from the caches and all others share a single provider request.
+        """
+        model_id = embedding_model_id(model or self.model, self.dimensions)
+        normalized = [normalize_query(text) for text in texts]
+        keys = [cache_key(query, model_id) for query in normalized]
+        text_for = dict(zip(keys, normalized))
+        found: dict[str, np.ndarray] = {}
+        for key in text_for:
+            embedding = self._cached_query(key)
+            if embedding is not None:
+                found[key] = embedding
+        missing = [key for key in text_for if key not in found]
+        if missing:
+            embeddings = self.generate_embeddings([text_for[key] for key in missing], model=model)
+            for key, embedding in zip(missing, embeddings):
+                found[key] = self._store_query(key, model_id, embedding)
+        return np.vstack([found[key] for key in keys])
+
+    def _cached_query(self, key: str) -> np.ndarray | None:
+        if self.cache is not None:
+            embedding = self.cache.get(key)
+            if embedding is not None:
+                return embedding
+
+        if self.cache_repo is not None:
+            stored = self.cache_repo.get(key)
+            if self.cache is not None:
+                self.cache.record_persistent_lookup(stored is not None)
+            if stored is not None:
+                embedding = decode_embedding(stored)
+                if self.cache is not None:
+                    self.cache.put(key, embedding)
+                return embedding
+        return None
+
+    def _store_query(self, key: str, model: str, embedding: list[float]) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.cache_repo is not None:
+            self.cache_repo.put(key, model, encode_embedding(embedding))
+        if self.cache is not None:
+            self.cache.put(key, embedding)
+        return embedding
+
+    def embedding_to_bytes(self, embedding: list[float]) -> bytes:
+        """Convert embedding list to packed float32 bytes for storage."""
+        return encode_embedding(embedding)
+
+    def bytes_to_embedding(self, value: bytes | str) -> np.ndarray:
+        """Convert stored bytes (or legacy JSON) back to an embedding array."""
+        return decode_embedding(value)
+
     def embedding_to_json(self, embedding: list[float]) -> str:
         """Convert embedding list to JSON string for storage."""
         return json.dumps(embedding)
 
     def json_to_embedding(self, json_str: str) -> list[float]:
         """Convert JSON string back to embedding list."""
-        return json.loads(json_str)
\ No newline at end of file
+        return json.loads(json_str)
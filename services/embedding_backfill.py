@@ -0,0 +1,85 @@
+import threading
+import time
+
+from ..repositories.chunk import ChunkRepository
+from ..repositories.embedding_backfill import EmbeddingBackfillRepository
+from .embedding import EmbeddingService, encode_embedding, pack_batches
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than `per_minute` happen in any minute; 0 disables it."""
+
+    def __init__(self, per_minute: float = 0):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class EmbeddingBackfillService:
+    """
+    Re-embeds the corpus with a new model without taking search down.
+
+    `stage_batch` embeds articles (and their chunks) whose live vectors were
+    built with another model and parks the results in staged_embeddings, so
+    search keeps serving the old vectors. It skips anything already staged
+    for the same content, which makes an interrupted run safe to resume.
+    `cutover` then swaps the staged vectors in; the application is switched
+    to the new model (AZURE_OPENAI_EMBEDDING_DEPLOYMENT / EMBEDDING_DIMENSIONS) right after.
+    """
+
+    def __init__(
+        self,
+        repo: EmbeddingBackfillRepository,
+        chunk_repo: ChunkRepository,
+        embedding_service: EmbeddingService,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.repo = repo
+        self.chunk_repo = chunk_repo
+        self.embedding_service = embedding_service
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+    @property
+    def model_id(self) -> str:
+        return self.embedding_service.model_id
+
+    def stage_batch(self, after_id: int = 0, limit: int = 100) -> list[int]:
+        """Embed and stage the next batch of articles after after_id; returns their ids (empty when done)."""
+        articles = self.repo.list_articles_to_stage(self.model_id, after_id=after_id, limit=limit)
+        if not articles:
+            return []
+        article_ids = [article_id for article_id, _, _ in articles]
+        chunks = self.chunk_repo.list_for_articles(article_ids)
+        vectors = self._embed([content for _, content, _ in articles] + [content for _, content in chunks])
+        self.repo.stage("articles", self.model_id, [
+            (article_id, encode_embedding(vectors[content]), content_hash)
+            for article_id, content, content_hash in articles
+        ])
+        self.repo.stage("chunks", self.model_id, [
+            (chunk_id, encode_embedding(vectors[content]), None) for chunk_id, content in chunks
+        ])
+        return article_ids
+
+    def _embed(self, texts: list[str]) -> dict[str, list[float]]:
+        """One vector per distinct text, one rate-limited provider request per packed batch."""
+        unique = list(dict.fromkeys(texts))
+        vectors: dict[str, list[float]] = {}
+        for batch in pack_batches(unique):
+            self.rate_limiter.wait()
+            embedded = self.embedding_service.generate_embeddings([unique[i] for i in batch])
+            vectors.update(zip((unique[i] for i in batch), embedded))
+        return vectors
+
+    def cutover(self) -> tuple[int, int]:
+        """Make the staged vectors live; returns the number of (articles, chunks) switched."""
+        return self.repo.cutover(self.model_id)
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a cache entry."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(normalized_text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalized_text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded in-process LRU of query embeddings with a time-to-live.
+    Also keeps the counters for the persistent tier so both can be reported together.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, embedding = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_persistent_lookup(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.persistent_hits += 1
+            else:
+                self.persistent_misses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "persistent_hits": self.persistent_hits,
+                "persistent_misses": self.persistent_misses,
+            }
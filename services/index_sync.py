@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..repositories.vector_change import VectorChangeRepository
+from .vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Loads the stored vectors of the given ids (missing ones are left out)
+VectorLoader = Callable[[list[int]], dict[int, np.ndarray]]
+
+
+class IndexSync:
+    """
+    Keeps a process-local vector index in step with the database when other
+    processes write embeddings: a `cli run-jobs` worker, or the job workers of
+    a sibling web process. Every write of a stored vector also logs a row in
+    vector_changes; every interval this reads the rows past the last one seen
+    and reloads just the items of its namespace, upserting the ones still
+    stored and removing the rest. The full comparison with the database is the
+    index build at startup.
+
+    Change ids are allocated before their transaction commits, so a gap below
+    the newest id seen may still fill in; gaps are re-read for gap_timeout
+    seconds. Changes older than retention seconds are pruned; a process that
+    has not synced for that long must be restarted to rebuild its index.
+
+    File-backed and database-backed stores (mmap, sql) are already shared and
+    need no sync.
+    """
+
+    def __init__(
+        self,
+        index: VectorStore,
+        namespace: str,
+        session_factory: Callable[[], Session],
+        load_vectors: VectorLoader,
+        interval: float = 5.0,
+        batch_size: int = 500,
+        gap_timeout: float = 60.0,
+        retention: float = 86400.0,
+    ):
+        self.index = index
+        self.namespace = namespace
+        self.session_factory = session_factory
+        self.load_vectors = load_vectors
+        self.interval = interval
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self.retention = retention
+        self._cursor = 0
+        self._gaps: dict[int, float] = {}  # change id -> when first missed
+        self._synced_at = time.monotonic()
+        self._pruned_at = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def reset(self) -> None:
+        """Skip the changes logged so far; call just before building the index from the database."""
+        db = self.session_factory()
+        try:
+            self._cursor = VectorChangeRepository(db).latest_id()
+        finally:
+            db.close()
+        self._gaps = {}
+        self._synced_at = time.monotonic()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"index-sync-{self.namespace}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if time.monotonic() - self._synced_at > self.retention:
+                    logger.warning("Vector index %s missed changes that were pruned; restart to rebuild it", self.namespace)
+                self.sync_once()
+                if time.monotonic() - self._pruned_at > self.retention / 24:
+                    self.prune()
+            except Exception:
+                logger.exception("Vector index sync failed")
+
+    def sync_once(self) -> int:
+        """Apply the changes logged since the last sync; returns the number of ids upserted or removed."""
+        db = self.session_factory()
+        try:
+            repo, applied = VectorChangeRepository(db), 0
+            while True:
+                changes = repo.list_after(self._cursor, self.batch_size, also_ids=list(self._gaps))
+                for change_id, _, _ in changes:
+                    self._gaps.pop(change_id, None)
+                newer = [change_id for change_id, _, _ in changes if change_id > self._cursor]
+                if newer:
+                    now = time.monotonic()
+                    for change_id in set(range(self._cursor + 1, newer[-1])) - set(newer):
+                        self._gaps[change_id] = now
+                    self._cursor = newer[-1]
+                item_ids = list(dict.fromkeys(item_id for _, namespace, item_id in changes if namespace == self.namespace))
+                vectors = self.load_vectors(item_ids) if item_ids else {}
+                for item_id in item_ids:
+                    if item_id in vectors:
+                        self.index.upsert(item_id, vectors[item_id])
+                    else:
+                        self.index.remove(item_id)
+                applied += len(item_ids)
+                if len(changes) < self.batch_size:
+                    break
+        finally:
+            db.close()
+        now = time.monotonic()
+        self._gaps = {change_id: seen for change_id, seen in self._gaps.items() if now - seen < self.gap_timeout}
+        self._synced_at = now
+        return applied
+
+    def prune(self) -> int:
+        """Drop changes older than the retention from the log; returns how many."""
+        db = self.session_factory()
+        try:
+            pruned = VectorChangeRepository(db).prune(datetime.now(timezone.utc) - timedelta(seconds=self.retention))
+        finally:
+            db.close()
+        self._pruned_at = time.monotonic()
+        return pruned
@@ -0,0 +1,290 @@
+import logging
+import threading
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from .vector_index import VectorIndex, top_k_hits
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Approximate inverted-file index over article embeddings.
+
+    Vectors are bucketed under the nearest of `nlist` spherical k-means
+    centroids and a query only scans the `nprobe` closest buckets. Until
+    `min_train_size` vectors exist everything lives in one bucket and search
+    is exact. Raising `nprobe` trades latency for recall.
+
+    Training triggered by upserts (the first one, and a retrain once the
+    corpus grew `retrain_growth` times) runs on a background thread over a
+    snapshot; searches keep using the current buckets until the new ones
+    are swapped in, with the writes made meanwhile replayed onto them.
+    """
+
+    def __init__(
+        self,
+        nlist: int = 1024,
+        nprobe: int = 32,
+        min_train_size: int | None = None,
+        train_sample_size: int | None = None,
+        kmeans_iterations: int = 10,
+        retrain_growth: float = 4.0,
+        seed: int = 0,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        # Below ~39 points per centroid k-means has too little data to be useful
+        self.min_train_size = min_train_size or nlist * 39
+        self.train_sample_size = train_sample_size or nlist * 64
+        self.kmeans_iterations = kmeans_iterations
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+        self._lock = threading.RLock()
+        self._epoch = 0
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.centroids: np.ndarray | None = None
+            self._trained_size = 0
+            self._lists = [VectorIndex(initial_capacity=64)]
+            self._assignment: dict[int, int] = {}
+            self.built = False
+            self._discard_training()
+
+    def _discard_training(self) -> None:
+        # A background training still running finds the epoch changed and drops its result
+        self._epoch += 1
+        self._training: threading.Thread | None = None
+        self._training_log: dict[int, np.ndarray | None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._assignment)
+
+    def __contains__(self, article_id: int) -> bool:
+        return article_id in self._assignment
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def dim(self) -> int:
+        if self.centroids is not None:
+            return self.centroids.shape[1]
+        return self._lists[0].dim
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole index with the given (article_id, embedding) pairs."""
+        ids, vectors = [], []
+        for article_id, embedding in items:
+            ids.append(article_id)
+            vectors.append(np.asarray(embedding, dtype=np.float32).ravel())
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        self.build_arrays(np.asarray(ids, dtype=np.int64), matrix)
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Replace the whole index from an id array and a matching row matrix."""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = VectorIndex.normalize_rows(matrix) if len(ids) else np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self._load(ids, rows)
+            self.built = True
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of the stored (ids, unit-length rows), gathered from every bucket."""
+        with self._lock:
+            ids = np.concatenate([lst.ids for lst in self._lists])
+            if not len(ids):
+                return ids, np.empty((0, self.dim), dtype=np.float32)
+            return ids, np.concatenate([lst.matrix for lst in self._lists if len(lst)])
+
+    def train(self) -> None:
+        """Re-cluster the current contents, e.g. after the corpus has grown a lot."""
+        with self._lock:
+            ids, rows = self.snapshot()
+            if len(ids):
+                self._load(ids, rows)
+
+    def _load(self, ids: np.ndarray, rows: np.ndarray) -> None:
+        self._discard_training()
+        if len(ids) < self.min_train_size:
+            self.centroids = None
+            self._trained_size = 0
+            exact = VectorIndex(initial_capacity=64)
+            exact.build_arrays(ids, rows)
+            self._lists = [exact]
+            self._assignment = dict.fromkeys(ids.tolist(), 0)
+            return
+
+        self.centroids = self._kmeans(rows)
+        self._trained_size = len(ids)
+        self._lists, self._assignment = self._bucket(ids, rows, self.centroids)
+
+    def _bucket(self, ids: np.ndarray, rows: np.ndarray, centroids: np.ndarray) -> tuple[list[VectorIndex], dict[int, int]]:
+        """One bucket per centroid holding the rows nearest to it, and each id's bucket number."""
+        assignment = self._nearest(rows, centroids)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+        lists = []
+        for list_no in range(len(centroids)):
+            members = order[bounds[list_no]: bounds[list_no + 1]]
+            lst = VectorIndex(initial_capacity=16)
+            if len(members):
+                lst.build_arrays(ids[members], rows[members])
+            lists.append(lst)
+        return lists, dict(zip(ids.tolist(), assignment.tolist()))
+
+    def _start_training(self) -> None:
+        """Cluster a snapshot of the contents on a background thread; called with the lock held."""
+        ids, rows = self.snapshot()
+        self._training_log = {}
+        self._training = threading.Thread(
+            target=self._train_snapshot, args=(ids, rows, self._epoch), name="ivf-train", daemon=True
+        )
+        self._training.start()
+
+    def _train_snapshot(self, ids: np.ndarray, rows: np.ndarray, epoch: int) -> None:
+        try:
+            # The expensive part runs without the lock, so searches and writes go on meanwhile
+            centroids = self._kmeans(rows)
+            lists, assignment = self._bucket(ids, rows, centroids)
+            with self._lock:
+                if epoch != self._epoch:
+                    return
+                for article_id, vec in self._training_log.items():
+                    previous = assignment.pop(article_id, None)
+                    if previous is not None:
+                        lists[previous].remove(article_id)
+                    if vec is not None:
+                        list_no = int(np.argmax(centroids @ vec))
+                        lists[list_no].upsert(article_id, vec)
+                        assignment[article_id] = list_no
+                self.centroids, self._lists, self._assignment = centroids, lists, assignment
+                self._trained_size = len(ids)
+        except Exception:
+            logger.exception("IVF training failed; search keeps the previous buckets")
+        finally:
+            with self._lock:
+                if self._training is threading.current_thread():
+                    self._training = None
+                    self._training_log = None
+
+    def wait_for_training(self, timeout: float | None = None) -> None:
+        """Block until a background training in progress has been swapped in (e.g. in tests and benchmarks)."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def _kmeans(self, rows: np.ndarray) -> np.ndarray:
+        """Spherical k-means on a random sample of the (unit-length) rows."""
+        rng = np.random.default_rng(self.seed)
+        if rows.shape[0] > self.train_sample_size:
+            rows = rows[rng.choice(rows.shape[0], self.train_sample_size, replace=False)]
+        k = min(self.nlist, rows.shape[0])
+        centroids = rows[rng.choice(rows.shape[0], k, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignment = self._nearest(rows, centroids)
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=k)
+            filled = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.zeros_like(centroids)
+            sums[filled] = np.add.reduceat(rows[order], starts, axis=0)
+            # Re-seed empty clusters from random points so no bucket is wasted
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = rows[rng.choice(rows.shape[0], int(empty.sum()), replace=False)]
+            centroids = VectorIndex.normalize_rows(sums)
+        return centroids
+
+    @staticmethod
+    def _nearest(rows: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+        """Index of the most similar centroid for every row, computed in bounded chunks."""
+        assignment = np.empty(rows.shape[0], dtype=np.int64)
+        for start in range(0, rows.shape[0], chunk_size):
+            block = rows[start: start + chunk_size] @ centroids.T
+            assignment[start: start + chunk_size] = np.argmax(block, axis=1)
+        return assignment
+
+    def upsert(self, article_id: int, embedding: Sequence[float] | np.ndarray) -> None:
+        """Insert or replace a vector, moving it to a new bucket if its centroid changed."""
+        vec = VectorIndex.normalize(embedding)
+        with self._lock:
+            list_no = 0 if self.centroids is None else int(np.argmax(self.centroids @ vec))
+            previous = self._assignment.get(article_id)
+            if previous is not None and previous != list_no:
+                self._lists[previous].remove(article_id)
+            self._lists[list_no].upsert(article_id, vec)
+            self._assignment[article_id] = list_no
+            if self._training_log is not None:
+                self._training_log[article_id] = vec
+            elif self.centroids is None:
+                if len(self) >= self.min_train_size:
+                    self._start_training()
+            elif len(self) > self.retrain_growth * self._trained_size:
+                self._start_training()
+
+    def remove(self, article_id: int) -> bool:
+        with self._lock:
+            list_no = self._assignment.pop(article_id, None)
+            if list_no is None:
+                return False
+            if self._training_log is not None:
+                self._training_log[article_id] = None
+            return self._lists[list_no].remove(article_id)
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """
+        Return up to top_k (article_id, cosine_similarity) pairs from the probed buckets.
+        With allowed_ids only matching vectors are scored; a filter selective enough to
+        be cheaper than probing, or one that leaves the probed buckets short of top_k
+        results, is answered exactly from the buckets that hold its members.
+        """
+        if top_k <= 0:
+            return []
+        q = VectorIndex.normalize(query)
+        with self._lock:
+            if self.centroids is None:
+                return self._lists[0].search(q, top_k=top_k, allowed_ids=allowed_ids)
+            if q.shape[0] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[0]}, index expects {self.dim}")
+            nprobe = min(self.nprobe, len(self._lists))
+            if allowed_ids is not None:
+                allowed_ids = np.asarray(allowed_ids, dtype=np.int64)
+                if len(allowed_ids) <= len(self) * nprobe / len(self._lists):
+                    return self._scan(self._lists_holding(allowed_ids), q, top_k, allowed_ids)
+            centroid_scores = self.centroids @ q
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            hits = self._scan(probe, q, top_k, allowed_ids)
+            if allowed_ids is not None and len(hits) < top_k:
+                hits = self._scan(self._lists_holding(allowed_ids), q, top_k, allowed_ids)
+            return hits
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """One hit list per query; each query probes its own buckets."""
+        return [self.search(query, top_k=top_k, allowed_ids=allowed_ids) for query in np.asarray(queries)]
+
+    def _lists_holding(self, allowed_ids: np.ndarray) -> list[int]:
+        return sorted({self._assignment[i] for i in allowed_ids.tolist() if i in self._assignment})
+
+    def _scan(self, list_nos, q: np.ndarray, top_k: int, allowed_ids: np.ndarray | None) -> list[tuple[int, float]]:
+        scored = [self._lists[list_no].score(q, allowed_ids) for list_no in list_nos if len(self._lists[list_no])]
+        if not scored:
+            return []
+        ids = np.concatenate([list_ids for list_ids, _ in scored])
+        scores = np.concatenate([list_scores for _, list_scores in scored])
+        return top_k_hits(ids, scores, top_k)
@@ -0,0 +1,125 @@
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from ..models.job import Job
+from ..repositories.job import JobRepository
+
+logger = logging.getLogger(__name__)
+
+# Runs one claimed batch: (session, payloads). Raising reruns the batch one job at a time.
+JobHandler = Callable[[Session, list[dict]], None]
+
+
+def retry_delay(attempts: int, base: float = 5.0, cap: float = 600.0) -> float:
+    """Exponential backoff before the next attempt: base, 2*base, 4*base, ... up to cap seconds."""
+    return min(cap, base * 2 ** max(attempts - 1, 0))
+
+
+class JobWorkerPool:
+    """
+    Worker threads draining the jobs table, so slow calls (the embedding
+    provider above all) run outside the request that caused them.
+
+    Each worker claims up to batch_size due jobs of one kind and passes their
+    payloads to the kind's handler, so batched provider requests still
+    happen. A claim hides the jobs from other workers and processes for
+    visibility_timeout seconds; a worker that dies mid-batch simply lets
+    them reappear. A batch that fails is rerun one job at a time, so only
+    the jobs that fail alone are retried with exponential backoff and,
+    after max_attempts, parked in the "dead" state and passed to on_dead.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        handlers: dict[str, JobHandler],
+        on_dead: dict[str, JobHandler] | None = None,
+        workers: int = 2,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        visibility_timeout: float = 300.0,
+        backoff: Callable[[int], float] = retry_delay,
+    ):
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.on_dead = on_dead or {}
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.backoff = backoff
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Ask workers to exit after their current batch; unfinished jobs are reclaimed later."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                processed = 0
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self) -> int:
+        """Claim and run at most one batch per job kind; returns the number of jobs handled."""
+        processed = 0
+        db = self.session_factory()
+        try:
+            repo = JobRepository(db)
+            for kind, handler in self.handlers.items():
+                jobs = repo.claim(kind, self.batch_size, self.visibility_timeout)
+                if not jobs:
+                    continue
+                processed += len(jobs)
+                self._run(db, repo, kind, handler, jobs)
+        finally:
+            db.close()
+        return processed
+
+    def _run(self, db: Session, repo: JobRepository, kind: str, handler: JobHandler, jobs: list[Job]) -> None:
+        """Run a batch and complete it; if it fails, run each job alone and fail only those that still raise."""
+        try:
+            handler(db, repo.payloads(jobs))
+        except Exception as exc:
+            db.rollback()
+            if len(jobs) > 1:
+                logger.warning("Batch of %d %s jobs failed; retrying them one by one", len(jobs), kind)
+                for job in jobs:
+                    self._run(db, repo, kind, handler, [job])
+                return
+            logger.exception("%s job %d failed", kind, jobs[0].id)
+            dead = repo.fail(jobs, f"{type(exc).__name__}: {exc}", self.backoff)
+            if dead and kind in self.on_dead:
+                self.on_dead[kind](db, repo.payloads(dead))
+        else:
+            repo.complete(jobs)
+
+    def drain(self, max_batches: int = 1000) -> int:
+        """Run due jobs in the calling thread until none are left, e.g. from a CLI; returns jobs handled."""
+        total = 0
+        for _ in range(max_batches):
+            processed = self.run_once()
+            if not processed:
+                break
+            total += processed
+        return total
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from typing import AsyncIterator, Iterator
+
+import numpy as np
+from openai.types import CreateEmbeddingResponse
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+LOCAL_EMBEDDING_MODEL = "local-hash"
+
+
+def hash_embedding(text: str, dimensions: int) -> list[float]:
+    """Unit vector seeded by the text's hash: the same text always gets the same vector, on any host."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+class LocalEmbeddings:
+    def __init__(self, dimensions: int, latency: float):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def create(self, input: str | list[str], model: str, dimensions: int | None = None, **kwargs) -> CreateEmbeddingResponse:
+        texts = [input] if isinstance(input, str) else input
+        if self.latency:
+            time.sleep(self.latency)
+        size = dimensions or self.dimensions
+        tokens = sum(_count_tokens(text) for text in texts)
+        return CreateEmbeddingResponse.model_validate({
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hash_embedding(text, size)}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+class LocalChatCompletions:
+    def __init__(self, response: str | None, latency: float):
+        self.response = response
+        self.latency = latency
+
+    def create(
+        self, model: str, messages: list[dict], max_tokens: int | None = None, stream: bool = False, **kwargs
+    ) -> ChatCompletion | Iterator[ChatCompletionChunk]:
+        if self.latency:
+            time.sleep(self.latency)  # time to first token when streaming
+        content = self.reply(messages, max_tokens)
+        return self._chunks(model, content) if stream else self._completion(model, messages, content)
+
+    def _completion(self, model: str, messages: list[dict], content: str) -> ChatCompletion:
+        prompt_tokens = sum(_count_tokens(message["content"] or "") for message in messages)
+        completion_tokens = _count_tokens(content)
+        return ChatCompletion.model_validate({
+            "id": f"local-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _chunks(self, model: str, content: str) -> Iterator[ChatCompletionChunk]:
+        """One chunk per word, like the provider's token deltas."""
+        completion_id, created = f"local-{uuid.uuid4().hex}", int(time.time())
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            yield ChatCompletionChunk.model_validate({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": "stop" if i == len(words) - 1 else None,
+                }],
+            })
+
+    def reply(self, messages: list[dict], max_tokens: int | None = None) -> str:
+        """The canned response if one is configured, otherwise the last user message echoed back."""
+        if self.response is not None:
+            return self.response
+        last = next((message["content"] for message in reversed(messages) if message["role"] == "user"), "")
+        words = last.split()
+        if max_tokens is not None:
+            words = words[:max_tokens]
+        return " ".join(words)
+
+
+class AsyncLocalChatCompletions(LocalChatCompletions):
+    async def create(
+        self, model: str, messages: list[dict], max_tokens: int | None = None, stream: bool = False, **kwargs
+    ) -> "ChatCompletion | AsyncLocalStream":
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = self.reply(messages, max_tokens)
+        return AsyncLocalStream(self._chunks(model, content)) if stream else self._completion(model, messages, content)
+
+
+class AsyncLocalStream:
+    """Async iterator over completion chunks with the SDK stream's close()."""
+
+    def __init__(self, chunks: Iterator[ChatCompletionChunk]):
+        self.chunks = chunks
+
+    def __aiter__(self) -> AsyncIterator[ChatCompletionChunk]:
+        return self
+
+    async def __anext__(self) -> ChatCompletionChunk:
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def close(self) -> None:
+        self.chunks.close()
+
+
+class LocalChat:
+    def __init__(self, completions: LocalChatCompletions):
+        self.completions = completions
+
+
+class LocalOpenAIClient:
+    """
+    Offline stand-in for the Azure OpenAI client, covering the calls this app
+    makes (embeddings.create and chat.completions.create, streamed or not)
+    and returning the SDK's own response types. Embeddings are deterministic
+    hash-seeded unit vectors; chat replies are canned or echo the question.
+    An artificial latency per call stands in for the network, so search and
+    chat can be benchmarked and load-tested without network access or cost.
+    """
+
+    def __init__(
+        self,
+        embedding_dimensions: int = 1536,
+        chat_response: str | None = None,
+        embedding_latency: float = 0.0,
+        chat_latency: float = 0.0,
+    ):
+        self.embeddings = LocalEmbeddings(embedding_dimensions, embedding_latency)
+        self.chat = LocalChat(LocalChatCompletions(chat_response, chat_latency))
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncLocalOpenAIClient:
+    """Async counterpart of LocalOpenAIClient for the chat pipeline, mirroring AsyncAzureOpenAI."""
+
+    def __init__(self, chat_response: str | None = None, chat_latency: float = 0.0):
+        self.chat = LocalChat(AsyncLocalChatCompletions(chat_response, chat_latency))
+
+    async def close(self) -> None:
+        pass
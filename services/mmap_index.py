@@ -0,0 +1,355 @@
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from .vector_index import VectorIndex, top_k_hits, top_k_hits_many
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single worker only
+    fcntl = None
+
+MAGIC = b"KBVECIX1"
+HEADER = struct.Struct("<8sQQQ")  # magic, generation, count, dim
+HEADER_SIZE = 64  # keeps the id and vector arrays 8-byte aligned
+
+
+class MappedVectorIndex:
+    """
+    Vector index stored in one file that every worker maps read-only.
+
+    The file holds a header, the article ids in ascending order and the
+    matching L2-normalised float32 rows, so pages live once in the OS page
+    cache however many workers are running. Writes are kept in a small
+    per-process overlay and flushed as a new generation: written to a
+    temporary file, then renamed over the old one under a file lock. Every
+    worker notices the rename on its next call and remaps.
+    """
+
+    def __init__(self, path: str, flush_delay: float = 2.0, max_pending: int = 256):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.max_pending = max_pending
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: dict[int, np.ndarray | None] = {}  # None marks a removal
+        self._timer: threading.Timer | None = None
+        self._stat_key = None
+        self._unmap()
+        self._refresh()
+
+    def _unmap(self) -> None:
+        self.generation = 0
+        self._built = False
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    def _refresh(self) -> None:
+        """Remap the file if another process (or this one) has renamed a new generation into place."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._stat_key:
+            return
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            magic, generation, count, dim = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a vector index file")
+            data = np.memmap(f, dtype=np.uint8, mode="r")
+        ids_end = HEADER_SIZE + 8 * count
+        self._ids = data[HEADER_SIZE:ids_end].view(np.int64)
+        self._matrix = data[ids_end: ids_end + 4 * count * dim].view(np.float32).reshape(count, dim)
+        self._stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.generation = generation
+        self._built = True
+
+    @property
+    def built(self) -> bool:
+        """True once any worker has written a generation (and it has not been cleared here)."""
+        with self._lock:
+            self._refresh()
+            return self._built
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            pending_ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            upserts = sum(1 for vec in self._pending.values() if vec is not None)
+            return len(self._ids) - len(self._rows_for(pending_ids)) + upserts
+
+    def __contains__(self, article_id: int) -> bool:
+        with self._lock:
+            if article_id in self._pending:
+                return self._pending[article_id] is not None
+            self._refresh()
+            return len(self._rows_for(np.array([article_id], dtype=np.int64))) == 1
+
+    @property
+    def dim(self) -> int:
+        if self._matrix.shape[0]:
+            return self._matrix.shape[1]
+        return next((vec.shape[0] for vec in self._pending.values() if vec is not None), 0)
+
+    def _rows_for(self, article_ids: np.ndarray) -> np.ndarray:
+        """Row numbers of the given ids in the mapped generation; ids not stored there are skipped."""
+        if not len(self._ids) or not len(article_ids):
+            return np.empty(0, dtype=np.int64)
+        rows = np.searchsorted(self._ids, article_ids)
+        found = rows < len(self._ids)
+        rows, article_ids = rows[found], article_ids[found]
+        return np.unique(rows[self._ids[rows] == article_ids])
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialise writers across processes; readers never take this lock."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole index with the given (article_id, embedding) pairs."""
+        ids, vectors = [], []
+        for article_id, embedding in items:
+            ids.append(article_id)
+            vectors.append(np.asarray(embedding, dtype=np.float32).ravel())
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        self.build_arrays(np.asarray(ids, dtype=np.int64), matrix)
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Write a new generation holding exactly the given ids and rows."""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = VectorIndex.normalize_rows(matrix) if len(ids) else np.empty((0, 0), dtype=np.float32)
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("Duplicate article ids")
+        order = np.argsort(ids, kind="stable")
+        with self._flush_lock, self._file_lock():
+            with self._lock:
+                self._refresh()
+                self._pending.clear()
+            self._write(self.generation + 1, ids[order], rows.shape[1] if len(ids) else 0, lambda sel: rows[order[sel]])
+            with self._lock:
+                self._refresh()
+
+    def clear(self) -> None:
+        """Forget this process's view so the next search rebuilds the file from the database."""
+        with self._lock:
+            self._pending.clear()
+            self._built = False
+
+    def upsert(self, article_id: int, embedding: Sequence[float] | np.ndarray) -> None:
+        """Insert or replace a vector; other workers see it once the overlay is flushed."""
+        vec = VectorIndex.normalize(embedding)
+        with self._lock:
+            self._refresh()
+            if self.dim and vec.shape[0] != self.dim:
+                raise ValueError(f"Embedding has dimension {vec.shape[0]}, index expects {self.dim}")
+            self._pending[article_id] = vec
+            self._schedule_flush()
+
+    def remove(self, article_id: int) -> bool:
+        with self._lock:
+            if article_id not in self:
+                return False
+            self._pending[article_id] = None
+            self._schedule_flush()
+            return True
+
+    def reconcile(self, blocks: Iterable[tuple[np.ndarray, np.ndarray]], atol: float = 1e-5) -> int:
+        """
+        Bring a reused file in line with the authoritative vectors, streamed as (ids, rows)
+        blocks from the database. Writes still in the overlay of a process that crashed
+        never reached the file; they are found here and flushed. Returns the ids changed.
+        """
+        seen, changed = [], 0
+        for ids, matrix in blocks:
+            ids = np.asarray(ids, dtype=np.int64)
+            rows = VectorIndex.normalize_rows(matrix)
+            with self._lock:
+                self._refresh()
+                positions = np.searchsorted(self._ids, ids) if len(self._ids) else np.zeros(len(ids), dtype=np.int64)
+                found = positions < len(self._ids)
+                found[found] = self._ids[positions[found]] == ids[found]
+                current = np.zeros(len(ids), dtype=bool)
+                if found.any():
+                    stored = self._matrix[positions[found]]
+                    current[found] = np.abs(stored - rows[found]).max(axis=1) <= atol
+            for i in np.flatnonzero(~current):
+                self.upsert(int(ids[i]), rows[i])
+            changed += int((~current).sum())
+            seen.append(ids)
+        with self._lock:
+            self._refresh()
+            extra = np.setdiff1d(self._ids, np.concatenate(seen) if seen else np.empty(0, dtype=np.int64))
+        for article_id in extra:
+            self.remove(int(article_id))
+        self.flush()
+        return changed + len(extra)
+
+    def _schedule_flush(self) -> None:
+        if len(self._pending) >= self.max_pending:
+            threading.Thread(target=self.flush, daemon=True).start()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Merge this process's pending writes into a new on-disk generation."""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending = dict(self._pending)
+            if not pending:
+                return
+            with self._file_lock():
+                # Merge onto whatever generation is current now, which may come from another worker
+                with self._lock:
+                    self._refresh()
+                    base_ids, base_matrix, generation, dim = self._ids, self._matrix, self.generation, self.dim
+                pending_ids = np.fromiter(pending, dtype=np.int64, count=len(pending))
+                keep = np.ones(len(base_ids), dtype=bool)
+                keep[self._rows_for(pending_ids)] = False
+                keep = np.flatnonzero(keep)
+                new_ids = np.array([i for i, vec in pending.items() if vec is not None], dtype=np.int64)
+                new_rows = [vec for vec in pending.values() if vec is not None]
+                new_matrix = np.vstack(new_rows) if new_rows else np.empty((0, dim), dtype=np.float32)
+                ids = np.concatenate([base_ids[keep], new_ids])
+                order = np.argsort(ids, kind="stable")
+
+                def gather(sel: np.ndarray) -> np.ndarray:
+                    picked = order[sel]
+                    from_base = picked < len(keep)
+                    block = np.empty((len(picked), dim), dtype=np.float32)
+                    if from_base.any():
+                        block[from_base] = base_matrix[keep[picked[from_base]]]
+                    if not from_base.all():
+                        block[~from_base] = new_matrix[picked[~from_base] - len(keep)]
+                    return block
+
+                self._write(generation + 1, ids[order], dim or new_matrix.shape[1], gather)
+                with self._lock:
+                    self._refresh()
+                    # Drop flushed entries unless they were overwritten while the file was written
+                    for article_id, vec in pending.items():
+                        if self._pending.get(article_id, 0) is vec:
+                            del self._pending[article_id]
+
+    def _write(self, generation: int, ids: np.ndarray, dim: int, rows_for, block_rows: int = 65536) -> None:
+        """Write a generation to a temporary file in bounded blocks and rename it into place."""
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, generation, len(ids), dim).ljust(HEADER_SIZE, b"\0"))
+                f.write(np.ascontiguousarray(ids, dtype="<i8").tobytes())
+                for start in range(0, len(ids), block_rows):
+                    sel = np.arange(start, min(start + block_rows, len(ids)))
+                    f.write(np.ascontiguousarray(rows_for(sel), dtype="<f4").tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of the stored (ids, unit-length rows): the mapped generation with pending writes applied."""
+        with self._lock:
+            self._refresh()
+            pending_ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[self._rows_for(pending_ids)] = False
+            ids, matrix = np.array(self._ids[keep]), np.array(self._matrix[keep])
+            overlay = [(article_id, vec) for article_id, vec in self._pending.items() if vec is not None]
+        if overlay:
+            ids = np.concatenate([ids, np.array([article_id for article_id, _ in overlay], dtype=np.int64)])
+            vecs = np.vstack([vec for _, vec in overlay])
+            matrix = np.concatenate([matrix, vecs]) if len(matrix) else vecs
+        return ids, matrix
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to top_k (article_id, cosine_similarity) pairs from the mapped rows plus pending writes."""
+        if top_k <= 0:
+            return []
+        q = VectorIndex.normalize(query)
+        with self._lock:
+            self._refresh()
+            if self.dim and q.shape[0] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[0]}, index expects {self.dim}")
+            pending_ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            stale = self._rows_for(pending_ids)
+            if allowed_ids is None:
+                ids, scores = self._ids, self._matrix @ q if len(self._ids) else np.empty(0, dtype=np.float32)
+                if len(stale):
+                    keep = np.ones(len(ids), dtype=bool)
+                    keep[stale] = False
+                    ids, scores = ids[keep], scores[keep]
+            else:
+                allowed_ids = np.asarray(allowed_ids, dtype=np.int64)
+                rows = self._rows_for(allowed_ids)
+                rows = rows[~np.isin(rows, stale)]
+                ids, scores = self._ids[rows], self._matrix[rows] @ q if len(rows) else np.empty(0, dtype=np.float32)
+            overlay = [
+                (article_id, vec) for article_id, vec in self._pending.items()
+                if vec is not None and (allowed_ids is None or np.isin(article_id, allowed_ids))
+            ]
+            if overlay:
+                ids = np.concatenate([ids, np.array([article_id for article_id, _ in overlay], dtype=np.int64)])
+                scores = np.concatenate([scores, np.vstack([vec for _, vec in overlay]) @ q])
+            return top_k_hits(ids, scores, top_k)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """Score several queries with one pass over the mapped rows; one hit list per query."""
+        q = VectorIndex.normalize_rows(queries)
+        if top_k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        with self._lock:
+            self._refresh()
+            if self.dim and q.shape[1] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[1]}, index expects {self.dim}")
+            pending = dict(self._pending)
+            if allowed_ids is None:
+                ids, matrix = self._ids, self._matrix
+            else:
+                allowed_ids = np.asarray(allowed_ids, dtype=np.int64)
+                rows = self._rows_for(allowed_ids)
+                ids, matrix = self._ids[rows], self._matrix[rows]
+            # Rows superseded by pending writes are dropped afterwards, so look that much deeper
+            base = top_k_hits_many(ids, matrix, q, top_k + len(pending)) if len(ids) else [[] for _ in range(q.shape[0])]
+            overlay = [
+                (article_id, vec) for article_id, vec in pending.items()
+                if vec is not None and (allowed_ids is None or np.isin(article_id, allowed_ids))
+            ]
+            overlay_scores = np.vstack([vec for _, vec in overlay]) @ q.T if overlay else None
+        results = []
+        for j, hits in enumerate(base):
+            hits = [(article_id, score) for article_id, score in hits if article_id not in pending]
+            if overlay:
+                hits += [(article_id, float(overlay_scores[i, j])) for i, (article_id, _) in enumerate(overlay)]
+                hits.sort(key=lambda hit: hit[1], reverse=True)
+            results.append(hits[:top_k])
+        return results
@@ -0,0 +1,79 @@
+import httpx
+from openai import AsyncAzureOpenAI, AzureOpenAI
+
+from .local_provider import AsyncLocalOpenAIClient, LocalOpenAIClient
+
+DEFAULT_API_VERSION = "2025-04-01-preview"
+
+# What EmbeddingService (sync) and ChatService (async) call: the Azure SDK client or its offline stand-in
+OpenAIClient = AzureOpenAI | LocalOpenAIClient
+AsyncOpenAIClient = AsyncAzureOpenAI | AsyncLocalOpenAIClient
+
+
+def create_openai_client(
+    api_key: str,
+    azure_endpoint: str,
+    api_version: str = DEFAULT_API_VERSION,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    timeout: float = 60.0,
+    connect_timeout: float = 5.0,
+    max_retries: int = 2,
+) -> AzureOpenAI:
+    """
+    Azure OpenAI client over a bounded keep-alive connection pool. Meant to be
+    created once per process and shared, so requests reuse open TLS connections
+    instead of paying a handshake each; close() releases the pool.
+    """
+    request_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=request_timeout,
+    )
+    return AzureOpenAI(
+        api_key=api_key,
+        azure_endpoint=azure_endpoint,
+        api_version=api_version,
+        timeout=request_timeout,
+        max_retries=max_retries,
+        http_client=http_client,
+    )
+
+
+def create_async_openai_client(
+    api_key: str,
+    azure_endpoint: str,
+    api_version: str = DEFAULT_API_VERSION,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    timeout: float = 60.0,
+    connect_timeout: float = 5.0,
+    max_retries: int = 2,
+) -> AsyncAzureOpenAI:
+    """
+    Async twin of create_openai_client, for calls awaited on the event loop (chat
+    completions) so a slow model response does not hold a threadpool worker.
+    """
+    request_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=request_timeout,
+    )
+    return AsyncAzureOpenAI(
+        api_key=api_key,
+        azure_endpoint=azure_endpoint,
+        api_version=api_version,
+        timeout=request_timeout,
+        max_retries=max_retries,
+        http_client=http_client,
+    )
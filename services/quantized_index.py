@@ -0,0 +1,237 @@
+import threading
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+
+from .vector_index import VectorIndex, top_k_hits
+
+# Loads full-precision vectors for rescoring, e.g. from the embedding columns
+VectorLoader = Callable[[list[int]], dict[int, np.ndarray]]
+
+
+class QuantizedIndex:
+    """
+    Compressed in-memory index with full-precision rescoring.
+
+    "int8" keeps each dimension as a signed byte scaled by that dimension's
+    largest magnitude (4x smaller than float32); "binary" keeps only the sign
+    bits and ranks by Hamming distance (32x smaller). A query takes the
+    top_k * rescore_factor coarse candidates and reorders them by exact cosine
+    similarity using vectors from `full_vectors`, so the float32 matrix never
+    has to be resident. Without a loader the coarse scores are returned.
+    """
+
+    MODES = ("int8", "binary")
+    # Sign bits discard far more than int8, so binary needs a much deeper candidate list
+    DEFAULT_RESCORE_FACTORS = {"int8": 4, "binary": 32}
+
+    def __init__(
+        self,
+        mode: str = "int8",
+        full_vectors: VectorLoader | None = None,
+        rescore_factor: int | None = None,
+        initial_capacity: int = 1024,
+        block_rows: int = 2048,  # small enough for the float32 copy of a block to stay in cache
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {self.MODES}")
+        self.mode = mode
+        self.full_vectors = full_vectors
+        self.rescore_factor = rescore_factor or self.DEFAULT_RESCORE_FACTORS[mode]
+        self.block_rows = block_rows
+        self._initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+        self._reset(dim=0)
+        self.built = False
+
+    def _reset(self, dim: int, capacity: int = 0, scale: np.ndarray | None = None, center: np.ndarray | None = None) -> None:
+        self.dim = dim
+        self._size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        width = (dim + 7) // 8 if self.mode == "binary" else dim
+        self._codes = np.empty((capacity, width), dtype=np.uint8 if self.mode == "binary" else np.int8)
+        self._positions: dict[int, int] = {}
+        # Components of unit vectors never exceed 1, so 1/127 is always a safe scale
+        self._scale = scale if scale is not None else np.full(dim, 1.0 / 127, dtype=np.float32)
+        # Embeddings are not centred on the origin; sign bits are taken relative to the mean
+        self._center = center if center is not None else np.zeros(dim, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, article_id: int) -> bool:
+        return article_id in self._positions
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the codes and ids of the stored vectors."""
+        return self._size * (self._codes.shape[1] * self._codes.itemsize + self._ids.itemsize)
+
+    def _encode(self, rows: np.ndarray) -> np.ndarray:
+        if self.mode == "binary":
+            return np.packbits(rows > self._center, axis=1)
+        return np.clip(np.rint(rows / self._scale), -127, 127).astype(np.int8)
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole index with the given (article_id, embedding) pairs."""
+        ids, vectors = [], []
+        for article_id, embedding in items:
+            ids.append(article_id)
+            vectors.append(np.asarray(embedding, dtype=np.float32).ravel())
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+        self.build_arrays(np.asarray(ids, dtype=np.int64), matrix)
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Replace the whole index, fitting the int8 scales or binary centre to this data."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = dict(zip(ids.tolist(), range(len(ids))))
+        if len(positions) != len(ids):
+            raise ValueError("Duplicate article ids")
+        with self._lock:
+            if not len(ids):
+                self._reset(dim=0)
+                self.built = True
+                return
+            matrix = np.asarray(matrix)
+            dim, scale, center = matrix.shape[1], None, None
+            peak = np.zeros(dim, dtype=np.float32)
+            total = np.zeros(dim, dtype=np.float64)
+            for start in range(0, len(ids), self.block_rows):
+                rows = VectorIndex.normalize_rows(matrix[start: start + self.block_rows])
+                np.maximum(peak, np.abs(rows).max(axis=0), out=peak)
+                total += rows.sum(axis=0)
+            if self.mode == "int8":
+                peak[peak == 0] = 1.0
+                scale = peak / 127
+            else:
+                center = (total / len(ids)).astype(np.float32)
+            self._reset(dim=dim, scale=scale, center=center)
+            codes = np.concatenate([
+                self._encode(VectorIndex.normalize_rows(matrix[start: start + self.block_rows]))
+                for start in range(0, len(ids), self.block_rows)
+            ])
+            self._ids, self._codes = ids.copy(), codes
+            self._size = len(ids)
+            self._positions = positions
+            self.built = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(dim=0)
+            self.built = False
+
+    def upsert(self, article_id: int, embedding: Sequence[float] | np.ndarray) -> None:
+        """Insert or replace the codes for an article; values beyond the fitted int8 range are clipped."""
+        vec = VectorIndex.normalize(embedding)
+        with self._lock:
+            if self.dim == 0:
+                self._reset(dim=vec.shape[0], capacity=self._initial_capacity)
+            if vec.shape[0] != self.dim:
+                raise ValueError(f"Embedding has dimension {vec.shape[0]}, index expects {self.dim}")
+            pos = self._positions.get(article_id)
+            if pos is None:
+                if self._size == self._ids.shape[0]:
+                    self._grow()
+                pos = self._size
+                self._size += 1
+                self._ids[pos] = article_id
+                self._positions[article_id] = pos
+            self._codes[pos] = self._encode(vec[np.newaxis])[0]
+
+    def remove(self, article_id: int) -> bool:
+        """Drop an article's codes by moving the last row into its slot."""
+        with self._lock:
+            pos = self._positions.pop(article_id, None)
+            if pos is None:
+                return False
+            last = self._size - 1
+            if pos != last:
+                moved_id = int(self._ids[last])
+                self._ids[pos] = moved_id
+                self._codes[pos] = self._codes[last]
+                self._positions[moved_id] = pos
+            self._size = last
+            return True
+
+    def _grow(self) -> None:
+        capacity = max(self._initial_capacity, 2 * self._ids.shape[0])
+        ids = np.empty(capacity, dtype=np.int64)
+        codes = np.empty((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+        ids[: self._size] = self._ids[: self._size]
+        codes[: self._size] = self._codes[: self._size]
+        self._ids, self._codes = ids, codes
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Copy of the stored (ids, unit-length rows). Rows come from `full_vectors`
+        when it is set; otherwise they are reconstructed from the codes, which
+        is lossy (and for binary codes only a rough direction).
+        """
+        with self._lock:
+            ids = self._ids[: self._size].copy()
+            codes = self._codes[: self._size]
+            if self.mode == "binary":
+                signs = np.unpackbits(codes, axis=1, count=self.dim).astype(np.float32) * 2 - 1
+                approx = self._center + signs * (np.abs(self._center).mean() or 1.0)
+            else:
+                approx = codes.astype(np.float32) * self._scale
+        if self.full_vectors is not None and len(ids):
+            vectors = self.full_vectors(ids.tolist())
+            for row, item_id in enumerate(ids.tolist()):
+                if vectors.get(item_id) is not None:
+                    approx[row] = np.asarray(vectors[item_id], dtype=np.float32).ravel()
+        return ids, VectorIndex.normalize_rows(approx) if len(ids) else np.empty((0, self.dim), dtype=np.float32)
+
+    def _coarse_scores(self, q: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        """Approximate similarity of every (or every selected) row, computed in bounded blocks."""
+        codes = self._codes[: self._size] if rows is None else self._codes[rows]
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        if self.mode == "binary":
+            q_bits = np.packbits(q > self._center)
+            for start in range(0, codes.shape[0], self.block_rows):
+                block = codes[start: start + self.block_rows]
+                hamming = np.bitwise_count(block ^ q_bits).sum(axis=1, dtype=np.int32)
+                scores[start: start + self.block_rows] = 1.0 - 2.0 * hamming / self.dim
+        else:
+            q_scaled = q * self._scale
+            for start in range(0, codes.shape[0], self.block_rows):
+                scores[start: start + self.block_rows] = codes[start: start + self.block_rows].astype(np.float32) @ q_scaled
+        return scores
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to top_k (article_id, score) pairs, rescored with full-precision cosine similarity."""
+        if top_k <= 0:
+            return []
+        q = VectorIndex.normalize(query)
+        with self._lock:
+            if self._size == 0:
+                return []
+            if q.shape[0] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[0]}, index expects {self.dim}")
+            rows = None if allowed_ids is None else np.flatnonzero(np.isin(self._ids[: self._size], allowed_ids))
+            ids = self._ids[: self._size] if rows is None else self._ids[rows]
+            coarse = top_k_hits(ids, self._coarse_scores(q, rows), top_k * self.rescore_factor)
+        if self.full_vectors is None:
+            return coarse[:top_k]
+
+        candidate_ids = [article_id for article_id, _ in coarse]
+        vectors = self.full_vectors(candidate_ids)
+        found = [article_id for article_id in candidate_ids if vectors.get(article_id) is not None]
+        if not found:
+            return []
+        exact = VectorIndex.normalize_rows(np.vstack([vectors[article_id] for article_id in found])) @ q
+        return top_k_hits(np.asarray(found, dtype=np.int64), exact, top_k)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """One hit list per query; candidates are rescored per query."""
+        return [self.search(query, top_k=top_k, allowed_ids=allowed_ids) for query in np.asarray(queries)]
@@ -0,0 +1,87 @@
+import numpy as np
+
+from ..models.article import Article
+from ..repositories.article import ArticleRepository
+from ..repositories.neighbor import NeighborRepository
+from .embedding import decode_embedding
+from .vector_store import VectorStore
+
+# Neighbours stored per article
+RELATED_ARTICLES_K = 10
+
+
+class RelatedArticlesService:
+    """
+    Maintains the article_neighbors k-NN graph so a "related articles" lookup
+    is one indexed query instead of a similarity scan per page view.
+    """
+
+    def __init__(
+        self,
+        repo: NeighborRepository,
+        article_repo: ArticleRepository,
+        index: VectorStore,
+        k: int = RELATED_ARTICLES_K,
+        embedding_model: str | None = None,
+    ):
+        self.repo = repo
+        self.article_repo = article_repo
+        self.index = index
+        self.k = k
+        self.embedding_model = embedding_model  # vectors of other models are not comparable with the index
+
+    def get_related(self, article_id: int, limit: int = RELATED_ARTICLES_K) -> list[tuple[Article, float]]:
+        """Stored neighbours of an article; computed on first request if the graph has none yet."""
+        related = self.repo.list_related(article_id, limit)
+        if not related and self._vectors([article_id]):
+            self._recompute([article_id])
+            related = self.repo.list_related(article_id, limit)
+        return related
+
+    def refresh(self, article_id: int) -> None:
+        """
+        Bring the graph up to date after an article's embedding was created or changed:
+        recompute its own neighbours, offer it to the new ones, and recompute every
+        article that listed it before, since its old score there is stale.
+        """
+        vectors = self._vectors([article_id])
+        if article_id not in vectors:
+            self.remove(article_id)
+            return
+        stale_sources = set(self.repo.list_sources(article_id))
+        neighbors = self._nearest(article_id, vectors[article_id])
+        self.repo.replace_neighbors(article_id, neighbors)
+        for neighbor_id, score in neighbors:
+            if neighbor_id not in stale_sources:
+                # Cosine similarity is symmetric, so the reverse edge has the same score
+                self.repo.offer_neighbor(neighbor_id, article_id, score, self.k)
+        # A lower score may let a better candidate into the list, which rescoring the edge would miss
+        self._recompute(sorted(stale_sources - {article_id}))
+
+    def remove(self, article_id: int) -> None:
+        """Drop a deleted article from the graph and refill the lists it was part of."""
+        sources = self.repo.list_sources(article_id)
+        self.repo.delete_article(article_id)
+        self._recompute([source_id for source_id in sources if source_id != article_id])
+
+    def rebuild(self, article_ids: list[int]) -> None:
+        """Recompute the neighbour lists of the given articles from scratch."""
+        self._recompute(article_ids)
+
+    def _recompute(self, article_ids: list[int]) -> None:
+        vectors = self._vectors(article_ids)
+        for article_id in article_ids:
+            if article_id in vectors:
+                self.repo.replace_neighbors(article_id, self._nearest(article_id, vectors[article_id]))
+
+    def _nearest(self, article_id: int, vector: np.ndarray) -> list[tuple[int, float]]:
+        hits = self.index.search(vector, top_k=self.k + 1)
+        return [(neighbor_id, score) for neighbor_id, score in hits if neighbor_id != article_id][: self.k]
+
+    def _vectors(self, article_ids: list[int]) -> dict[int, np.ndarray]:
+        rows = self.article_repo.list_embeddings_for(article_ids, model=self.embedding_model)
+        return {
+            article_id: decode_embedding(vector if vector is not None else legacy_json)
+            for article_id, vector, legacy_json in rows
+            if vector is not None or legacy_json is not None
+        }
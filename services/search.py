@@ -1,14 +1,44 @@
 import json
+import logging
 import numpy as np
 
 from ..repositories.article import ArticleRepository
+from ..repositories.chunk import ChunkRepository
 from .embedding import EmbeddingService
+from .vector_scan import decode_blocks
+from .vector_store import VectorStore
 from ..models.article import Article
+from ..models.chunk import ArticleChunk
+from ..schemas.article import SearchMode
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = RRF_K) -> list[tuple[int, float]]:
+    """Fuse several best-first id rankings into one, scoring each id by sum(1 / (k + rank))."""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
 
 class SearchService:
-    def __init__(self, article_repo: ArticleRepository, embedding_service: EmbeddingService):
+    def __init__(
+        self,
+        article_repo: ArticleRepository,
+        embedding_service: EmbeddingService,
+        index: VectorStore,
+        chunk_repo: ChunkRepository | None = None,
+        chunk_index: VectorStore | None = None,
+    ):
         self.article_repo = article_repo
         self.embedding_service = embedding_service
+        self.index = index
+        self.chunk_repo = chunk_repo
+        self.chunk_index = chunk_index
 
     def cosine_similarity(self, vec1: list[float], vec2: list[float]) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -17,26 +47,155 @@ class SearchService:
         if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
             return 0.0
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-    
-    def search_articles(self, query: str, top_k: int = 5) -> list[tuple[Article, float]]:
+
+    @property
+    def embedding_model(self) -> str | None:
+        """Only vectors from the model queries are embedded with are indexed; None indexes all."""
+        return self.embedding_service.model_id if self.embedding_service is not None else None
+
+    def build_index(self) -> None:
+        """Stream every stored article embedding of the current model into the shared vector index."""
+        self.index.build_arrays(*self._collect(self.article_repo.iter_embedding_blocks(model=self.embedding_model)))
+
+    def build_chunk_index(self) -> None:
+        """Stream every stored chunk embedding of the current model into the shared chunk index."""
+        self.chunk_index.build_arrays(*self._collect(self.chunk_repo.iter_embedding_blocks(model=self.embedding_model)))
+
+    def reconcile_index(self) -> int:
+        """Repair a reused file-backed article index from the stored embeddings; returns the ids changed."""
+        return self.index.reconcile(decode_blocks(self.article_repo.iter_embedding_blocks(model=self.embedding_model)))
+
+    def reconcile_chunk_index(self) -> int:
+        """Repair a reused file-backed chunk index from the stored embeddings; returns the ids changed."""
+        return self.chunk_index.reconcile(decode_blocks(self.chunk_repo.iter_embedding_blocks(model=self.embedding_model)))
+
+    @staticmethod
+    def _collect(row_blocks) -> tuple[np.ndarray, np.ndarray]:
+        # Only ids and packed vectors are read, decoded a block at a time
+        blocks = list(decode_blocks(row_blocks))
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate([ids for ids, _ in blocks]), np.concatenate([matrix for _, matrix in blocks])
+
+    def search_chunks(
+        self,
+        query: str,
+        top_k: int = 5,
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> list[tuple[ArticleChunk, float]]:
+        """
+        Search for the article passages most relevant to the query.
+        Returns list of tuples (ArticleChunk, similarity_score); empty if chunking is not configured.
+        With tags or author_id only passages of matching articles are scored.
+        """
+        if self.chunk_index is None or self.chunk_repo is None:
+            return []
+        allowed_ids = None
+        if tags or author_id is not None:
+            allowed_ids = self.chunk_repo.list_ids_for_articles(self.article_repo.filtered_ids_select(tags, author_id))
+            if not len(allowed_ids):
+                return []
+        if not self.chunk_index.built:
+            self.build_chunk_index()
+
+        query_embedding = self.embedding_service.embed_query(query)
+        hits = self.chunk_index.search(query_embedding, top_k=top_k, allowed_ids=allowed_ids)
+        chunks = self.chunk_repo.get_many([chunk_id for chunk_id, score in hits])
+        scores = dict(hits)
+        return [(chunk, scores[chunk.id]) for chunk in chunks]
+
+    def search_articles(
+        self,
+        query: str,
+        top_k: int = 5,
+        mode: SearchMode = SearchMode.VECTOR,
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> list[tuple[Article, float]]:
         """
         Search for articles most relevant to the query.
-        Returns list of tuples (Article, similarity_score).
+        Returns list of tuples (Article, score). The score is cosine similarity
+        for vector mode, full-text rank for lexical mode and the fused RRF score
+        for hybrid mode. Articles must carry one of tags and/or be written by
+        author_id; the filter is applied before scoring, not to the top-k.
+        """
+        allowed_ids = None
+        if tags or author_id is not None:
+            allowed_ids = self.article_repo.list_ids(tags, author_id)
+            if not len(allowed_ids):
+                return []
+
+        if mode == SearchMode.LEXICAL:
+            hits = self.article_repo.search_lexical(query, limit=top_k, tags=tags, author_id=author_id)
+        elif mode == SearchMode.HYBRID:
+            hits = self._hybrid_hits(query, top_k, tags, author_id, allowed_ids)
+        else:
+            hits = self._vector_hits(query, top_k, allowed_ids)
+
+        # Load only the winning articles
+        articles = self.article_repo.get_many([article_id for article_id, score in hits])
+        scores = dict(hits)
+        return [(article, scores[article.id]) for article in articles]
+
+    def search_articles_batch(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+    ) -> list[list[tuple[Article, float]]]:
         """
+        Vector search for several queries at once: one embedding request for the
+        uncached queries, one scoring pass over the index, one article fetch.
+        Returns a (Article, cosine_similarity) list per query, in query order.
+        """
+        allowed_ids = None
+        if tags or author_id is not None:
+            allowed_ids = self.article_repo.list_ids(tags, author_id)
+            if not len(allowed_ids):
+                return [[] for _ in queries]
+        if not self.index.built:
+            self.build_index()
+
+        query_embeddings = self.embedding_service.embed_queries(queries)
+        hits_per_query = self.index.search_many(query_embeddings, top_k=top_k, allowed_ids=allowed_ids)
+        winners = list(dict.fromkeys(article_id for hits in hits_per_query for article_id, _ in hits))
+        articles = {article.id: article for article in self.article_repo.get_many(winners)}
+        return [
+            [(articles[article_id], score) for article_id, score in hits if article_id in articles]
+            for hits in hits_per_query
+        ]
+
+    def _vector_hits(self, query: str, top_k: int, allowed_ids: np.ndarray | None = None) -> list[tuple[int, float]]:
+        if not self.index.built:
+            self.build_index()
+
         # Generate embedding for the query
-        query_embedding = self.embedding_service.generate_embedding(query)
-
-        # Get all articles with embeddings
-        articles = self.article_repo.list_articles(skip=0, limit=1000)
-
-        # Calculate similarity scores
-        results = []
-        for article in articles:
-            if article.embedding:
-                article_embedding = self.embedding_service.json_to_embedding(article.embedding)
-                similarity = self.cosine_similarity(query_embedding, article_embedding)
-                results.append((article, similarity))
-        
-        # Sort results by similarity score
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
\ No newline at end of file
+        query_embedding = self.embedding_service.embed_query(query)
+
+        # Score against the in-memory index, only over allowed rows when filtered
+        return self.index.search(query_embedding, top_k=top_k, allowed_ids=allowed_ids)
+
+    def _hybrid_hits(
+        self,
+        query: str,
+        top_k: int,
+        tags: list[str] | None = None,
+        author_id: int | None = None,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        # Fuse deeper candidate lists than requested so either side can promote a result
+        depth = max(top_k * 4, 20)
+        lexical = self.article_repo.search_lexical(query, limit=depth, tags=tags, author_id=author_id)
+        try:
+            vector = self._vector_hits(query, depth, allowed_ids)
+        except Exception:
+            # Embedding provider unavailable: keyword results still answer the query
+            logger.exception("Vector search failed, serving lexical results only")
+            vector = []
+        fused = reciprocal_rank_fusion([
+            [article_id for article_id, _ in vector],
+            [article_id for article_id, _ in lexical],
+        ])
+        return fused[:top_k]
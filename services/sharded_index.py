@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+import numpy as np
+
+from .vector_index import VectorIndex, top_k_hits, top_k_hits_many
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def shard_executor() -> ThreadPoolExecutor:
+    """Process-wide pool shared by every sharded index, one thread per core."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="search-shard")
+    return _executor
+
+
+def merge_hits(parts: list[list[tuple[int, float]]], top_k: int) -> list[tuple[int, float]]:
+    """Merge per-shard top-k lists into one."""
+    hits = [hit for part in parts for hit in part]
+    return top_k_hits(
+        np.array([article_id for article_id, _ in hits], dtype=np.int64),
+        np.array([score for _, score in hits], dtype=np.float32),
+        top_k,
+    )
+
+
+class ShardedVectorIndex(VectorIndex):
+    """
+    Exact index that splits the row matrix into `shards` contiguous blocks
+    and scores them concurrently. NumPy releases the GIL inside the
+    matrix products, so the blocks run on separate cores; each shard
+    returns its own top-k and the results are merged. Indexes with fewer
+    than `min_shard_rows` rows per shard use fewer shards.
+    """
+
+    def __init__(
+        self,
+        shards: int | None = None,
+        min_shard_rows: int = 16384,
+        initial_capacity: int = 1024,
+        executor: ThreadPoolExecutor | None = None,
+    ):
+        super().__init__(initial_capacity=initial_capacity)
+        self.shards = shards or os.cpu_count() or 1
+        self.min_shard_rows = min_shard_rows
+        self._executor = executor
+
+    def _shards(self, allowed_ids: np.ndarray | None) -> list[tuple[np.ndarray, np.ndarray]]:
+        """(ids, rows) views of each shard, restricted to allowed_ids when given."""
+        if allowed_ids is None:
+            ids, matrix = self.ids, self.matrix
+        else:
+            rows = np.flatnonzero(np.isin(self.ids, allowed_ids))
+            ids, matrix = self._ids[rows], self._matrix[rows]
+        count = max(1, min(self.shards, len(ids) // self.min_shard_rows))
+        edges = np.linspace(0, len(ids), count + 1).astype(int)
+        return [(ids[start:stop], matrix[start:stop]) for start, stop in zip(edges[:-1], edges[1:])]
+
+    def _map(self, fn, shards: list) -> list:
+        if len(shards) == 1:
+            return [fn(*shards[0])]
+        return list((self._executor or shard_executor()).map(lambda shard: fn(*shard), shards))
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to top_k (article_id, cosine_similarity) pairs, scoring shards in parallel."""
+        if top_k <= 0:
+            return []
+        q = self.normalize(query)
+        with self._lock:
+            if self._size == 0:
+                return []
+            if q.shape[0] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[0]}, index expects {self.dim}")
+            parts = self._map(lambda ids, matrix: top_k_hits(ids, matrix @ q, top_k), self._shards(allowed_ids))
+        return merge_hits(parts, top_k)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """Score several queries, each shard running its matrix-matrix product in parallel."""
+        q = self.normalize_rows(queries)
+        if top_k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in range(q.shape[0])]
+            if q.shape[1] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[1]}, index expects {self.dim}")
+            parts = self._map(lambda ids, matrix: top_k_hits_many(ids, matrix, q, top_k), self._shards(allowed_ids))
+        return [merge_hits([part[j] for part in parts], top_k) for j in range(q.shape[0])]
@@ -0,0 +1,221 @@
+import threading
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+class VectorIndex:
+    """
+    In-memory matrix of L2-normalised article embeddings.
+
+    Rows live in a contiguous float32 buffer that grows by doubling, with a
+    parallel id array, so a query is one matrix-vector product followed by
+    argpartition for the top-k. Shared by every request in the process.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._initial_capacity = initial_capacity
+        self._reset(dim=0)
+        self.built = False
+
+    def _reset(self, dim: int, capacity: int = 0) -> None:
+        self.dim = dim
+        self._size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, article_id: int) -> bool:
+        return article_id in self._positions
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[: self._size]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[: self._size]
+
+    @staticmethod
+    def normalize(vector: Sequence[float] | np.ndarray) -> np.ndarray:
+        """Return a float32 unit vector; zero vectors stay zero (score 0.0)."""
+        vec = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return vec
+        return vec / norm
+
+    @staticmethod
+    def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Return a float32 copy of matrix with every non-zero row scaled to unit length."""
+        rows = np.array(matrix, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        rows /= norms
+        return rows
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Replace the whole index from an id array and a matching row matrix in one copy."""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = self.normalize_rows(matrix) if len(ids) else np.empty((0, 0), dtype=np.float32)
+        positions = dict(zip(ids.tolist(), range(len(ids))))
+        if len(positions) != len(ids):
+            raise ValueError("Duplicate article ids")
+        with self._lock:
+            self._reset(dim=rows.shape[1])
+            self._ids, self._matrix = ids.copy(), rows
+            self._size = len(ids)
+            self._positions = positions
+            self.built = True
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole index with the given (article_id, embedding) pairs."""
+        with self._lock:
+            self._reset(dim=0)
+            for article_id, embedding in items:
+                self.upsert(article_id, embedding)
+            self.built = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(dim=0)
+            self.built = False
+
+    def upsert(self, article_id: int, embedding: Sequence[float] | np.ndarray) -> None:
+        """Insert or replace the vector for an article."""
+        vec = self.normalize(embedding)
+        with self._lock:
+            if self.dim == 0:
+                self._reset(dim=vec.shape[0], capacity=self._initial_capacity)
+            if vec.shape[0] != self.dim:
+                raise ValueError(f"Embedding has dimension {vec.shape[0]}, index expects {self.dim}")
+            pos = self._positions.get(article_id)
+            if pos is None:
+                if self._size == self._ids.shape[0]:
+                    self._grow()
+                pos = self._size
+                self._size += 1
+                self._ids[pos] = article_id
+                self._positions[article_id] = pos
+            self._matrix[pos] = vec
+
+    def remove(self, article_id: int) -> bool:
+        """Drop an article's vector by moving the last row into its slot."""
+        with self._lock:
+            pos = self._positions.pop(article_id, None)
+            if pos is None:
+                return False
+            last = self._size - 1
+            if pos != last:
+                moved_id = int(self._ids[last])
+                self._ids[pos] = moved_id
+                self._matrix[pos] = self._matrix[last]
+                self._positions[moved_id] = pos
+            self._size = last
+            return True
+
+    def _grow(self) -> None:
+        capacity = max(self._initial_capacity, 2 * self._ids.shape[0])
+        ids = np.empty(capacity, dtype=np.int64)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        ids[: self._size] = self._ids[: self._size]
+        matrix[: self._size] = self._matrix[: self._size]
+        self._ids, self._matrix = ids, matrix
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of the stored (ids, unit-length rows)."""
+        with self._lock:
+            return self.ids.copy(), self.matrix.copy()
+
+    def score(self, q: np.ndarray, allowed_ids: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score a unit query against the stored rows and return (ids, scores).
+        With allowed_ids only the matching rows are gathered and multiplied.
+        """
+        with self._lock:
+            if allowed_ids is None:
+                return self.ids.copy(), self.matrix @ q
+            rows = np.flatnonzero(np.isin(self.ids, allowed_ids))
+            return self._ids[rows], self._matrix[rows] @ q
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to top_k (article_id, cosine_similarity) pairs, best first, optionally restricted to allowed_ids."""
+        if top_k <= 0:
+            return []
+        q = self.normalize(query)
+        with self._lock:
+            if self._size == 0:
+                return []
+            if q.shape[0] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[0]}, index expects {self.dim}")
+            ids, scores = self.score(q, allowed_ids)
+            return top_k_hits(ids, scores, top_k)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """Score several queries with one matrix-matrix product per block of rows; one hit list per query."""
+        q = self.normalize_rows(queries)
+        if top_k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in range(q.shape[0])]
+            if q.shape[1] != self.dim:
+                raise ValueError(f"Query has dimension {q.shape[1]}, index expects {self.dim}")
+            if allowed_ids is None:
+                return top_k_hits_many(self.ids, self.matrix, q, top_k)
+            rows = np.flatnonzero(np.isin(self.ids, allowed_ids))
+            return top_k_hits_many(self._ids[rows], self._matrix[rows], q, top_k)
+
+
+def top_k_hits_many(
+    ids: np.ndarray,
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+    block_rows: int = 65536,
+) -> list[list[tuple[int, float]]]:
+    """
+    Top_k (id, score) pairs of matrix rows for each unit query row. Rows are
+    scored a block at a time so the score matrix stays block_rows x len(queries).
+    """
+    candidates: list[list[tuple[np.ndarray, np.ndarray]]] = [[] for _ in range(queries.shape[0])]
+    for start in range(0, matrix.shape[0], block_rows):
+        scores = matrix[start: start + block_rows] @ queries.T
+        block_ids = ids[start: start + block_rows]
+        if top_k < scores.shape[0]:
+            best = np.argpartition(-scores, top_k - 1, axis=0)[:top_k]
+        else:
+            best = np.repeat(np.arange(scores.shape[0])[:, np.newaxis], scores.shape[1], axis=1)
+        for j, rows in enumerate(best.T):
+            candidates[j].append((block_ids[rows], scores[rows, j]))
+    return [
+        top_k_hits(np.concatenate([c_ids for c_ids, _ in parts]), np.concatenate([c_scores for _, c_scores in parts]), top_k)
+        if parts else []
+        for parts in candidates
+    ]
+
+
+def top_k_hits(ids: np.ndarray, scores: np.ndarray, top_k: int) -> list[tuple[int, float]]:
+    """Pick the top_k highest scores with argpartition and return (id, score) pairs, best first."""
+    if scores.shape[0] == 0:
+        return []
+    if top_k < scores.shape[0]:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(ids[i]), float(scores[i])) for i in order]
@@ -0,0 +1,66 @@
+import heapq
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+from .embedding import decode_embedding_block
+from .vector_index import VectorIndex, top_k_hits_many
+
+# Blocks of (ids, float32 matrix) produced from a streamed query
+EmbeddingBlocks = Iterable[tuple[np.ndarray, np.ndarray]]
+
+
+def decode_blocks(row_blocks: Iterable[Sequence[tuple]]) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Turn blocks of (id, embedding_vector[, legacy_json]) rows into (ids, matrix) pairs,
+    decoding each block's binary vectors with a single frombuffer.
+    """
+    for rows in row_blocks:
+        if not rows:
+            continue
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        values = [row[1] if row[1] is not None or len(row) < 3 else row[2] for row in rows]
+        yield ids, decode_embedding_block(values)
+
+
+def scan_top_k(
+    blocks: EmbeddingBlocks,
+    query: Sequence[float] | np.ndarray,
+    top_k: int,
+    allowed_ids: np.ndarray | None = None,
+) -> list[tuple[int, float]]:
+    """
+    Score streamed blocks against the query, keeping only a top_k heap between blocks.
+    Memory is bounded by one block whatever the table size.
+    """
+    return scan_top_k_many(blocks, np.asarray(query, dtype=np.float32)[np.newaxis], top_k, allowed_ids)[0]
+
+
+def scan_top_k_many(
+    blocks: EmbeddingBlocks,
+    queries: np.ndarray,
+    top_k: int,
+    allowed_ids: np.ndarray | None = None,
+) -> list[list[tuple[int, float]]]:
+    """Like scan_top_k for several queries at once: one pass, one matrix-matrix product per block."""
+    q = VectorIndex.normalize_rows(queries)
+    heaps: list[list[tuple[float, int]]] = [[] for _ in range(q.shape[0])]
+    if top_k <= 0:
+        return [[] for _ in heaps]
+    for ids, matrix in blocks:
+        if allowed_ids is not None:
+            keep = np.isin(ids, allowed_ids)
+            ids, matrix = ids[keep], matrix[keep]
+        if not len(ids):
+            continue
+        if matrix.shape[1] != q.shape[1]:
+            raise ValueError(f"Query has dimension {q.shape[1]}, stored embeddings have {matrix.shape[1]}")
+        block_hits = top_k_hits_many(ids, VectorIndex.normalize_rows(matrix), q, top_k)
+        for heap, hits in zip(heaps, block_hits):
+            for article_id, score in hits:
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, -article_id))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, -article_id))
+    return [[(-neg_id, score) for score, neg_id in sorted(heap, reverse=True)] for heap in heaps]
+
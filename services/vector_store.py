@@ -0,0 +1,171 @@
+from typing import Callable, Iterable, Iterator, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..repositories.vector_store import VectorStoreRepository
+from .embedding import decode_embedding_block, encode_embedding
+from .vector_index import VectorIndex
+from .vector_scan import scan_top_k, scan_top_k_many
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """
+    What search, chunking and the related-articles graph need from a vector backend.
+
+    Items are integer ids (article or chunk ids) with one embedding each;
+    scores are cosine similarities, best first. `allowed_ids` restricts a
+    query to a pre-computed subset before scoring. Implementations:
+    VectorIndex (and ShardedVectorIndex), IVFIndex, MappedVectorIndex,
+    QuantizedIndex and SqlVectorStore, selected by SEARCH_INDEX in core/deps.py.
+    """
+
+    @property
+    def built(self) -> bool:
+        """False until the store has been loaded; search loads it on first use."""
+        ...
+
+    def __len__(self) -> int: ...
+
+    def __contains__(self, item_id: int) -> bool: ...
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole contents with the given (id, embedding) pairs."""
+        ...
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Replace the whole contents from an id array and a matching row matrix."""
+        ...
+
+    def clear(self) -> None:
+        """Mark the store unbuilt so it is reloaded; shared backends may keep data until the rebuild."""
+        ...
+
+    def upsert(self, item_id: int, embedding: Sequence[float] | np.ndarray) -> None: ...
+
+    def remove(self, item_id: int) -> bool:
+        """Delete an item; returns whether it was stored."""
+        ...
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]: ...
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]: ...
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of the stored (ids, unit-length rows), e.g. to migrate to another backend."""
+        ...
+
+
+class SqlVectorStore:
+    """
+    Vector store kept in the vector_store_items table, one float32 blob per item.
+
+    Holds nothing in memory: every query streams the namespace's rows in
+    blocks and keeps a bounded top-k heap, so memory stays constant and every
+    worker sees writes immediately. Slower per query than the in-memory
+    indexes; works on SQLite and PostgreSQL alike.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], namespace: str, batch_size: int = 1000):
+        self.session_factory = session_factory
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self._built = False
+
+    def _run(self, action: Callable[[VectorStoreRepository], object]):
+        db = self.session_factory()
+        try:
+            return action(VectorStoreRepository(db))
+        finally:
+            db.close()
+
+    @property
+    def built(self) -> bool:
+        """True once this process has built the store or the table already holds rows for it."""
+        if not self._built:
+            self._built = self._run(lambda repo: repo.exists(self.namespace))
+        return self._built
+
+    def __len__(self) -> int:
+        return self._run(lambda repo: repo.count(self.namespace))
+
+    def __contains__(self, item_id: int) -> bool:
+        return self._run(lambda repo: repo.exists(self.namespace, item_id))
+
+    def build(self, items: Iterable[tuple[int, Sequence[float] | np.ndarray]]) -> None:
+        """Replace the whole store with the given (item_id, embedding) pairs."""
+        def blocks() -> Iterator[list[tuple[int, bytes]]]:
+            block = []
+            for item_id, embedding in items:
+                block.append((int(item_id), encode_embedding(VectorIndex.normalize(embedding))))
+                if len(block) == self.batch_size:
+                    yield block
+                    block = []
+            if block:
+                yield block
+
+        self._run(lambda repo: repo.replace_all(self.namespace, blocks()))
+        self._built = True
+
+    def build_arrays(self, ids: np.ndarray, matrix: np.ndarray) -> None:
+        """Replace the whole store from an id array and a matching row matrix."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(set(ids.tolist())) != len(ids):
+            raise ValueError("Duplicate article ids")
+        self.build(zip(ids.tolist(), matrix) if len(ids) else [])
+
+    def clear(self) -> None:
+        self._run(lambda repo: repo.replace_all(self.namespace, iter(())))
+        self._built = False
+
+    def upsert(self, item_id: int, embedding: Sequence[float] | np.ndarray) -> None:
+        vec = encode_embedding(VectorIndex.normalize(embedding))
+        self._run(lambda repo: repo.upsert(self.namespace, item_id, vec))
+
+    def remove(self, item_id: int) -> bool:
+        return self._run(lambda repo: repo.delete(self.namespace, item_id))
+
+    def _blocks(self) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        db = self.session_factory()
+        try:
+            for rows in VectorStoreRepository(db).iter_blocks(self.namespace, self.batch_size):
+                ids = np.fromiter((item_id for item_id, _ in rows), dtype=np.int64, count=len(rows))
+                yield ids, decode_embedding_block([blob for _, blob in rows])
+        finally:
+            db.close()
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copy of the stored (ids, unit-length rows), read block by block."""
+        blocks = list(self._blocks())
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.concatenate([ids for ids, _ in blocks]), np.concatenate([matrix for _, matrix in blocks])
+
+    def search(
+        self,
+        query: Sequence[float] | np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to top_k (item_id, cosine_similarity) pairs over every stored row."""
+        return scan_top_k(self._blocks(), query, top_k, allowed_ids)
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        allowed_ids: np.ndarray | None = None,
+    ) -> list[list[tuple[int, float]]]:
+        """One hit list per query from a single pass over the stored rows."""
+        return scan_top_k_many(self._blocks(), queries, top_k, allowed_ids)
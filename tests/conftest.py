@@ -18,6 +18,26 @@ from knowledge_base_app.main import app
 from knowledge_base_app.core.deps import get_db
 from knowledge_base_app.models.user import User
 from knowledge_base_app.core.security import hash_password
+from knowledge_base_app.services.embedding import EmbeddingService
+
+class CountingEmbeddingService(EmbeddingService):
+    """EmbeddingService whose provider call is replaced by a deterministic stub that records inputs."""
+
+    def __init__(self, **kwargs):
+        super().__init__(api_key="test", azure_endpoint="https://example.invalid", **kwargs)
+        self.calls = []
+        self.requests = 0
+
+    def generate_embedding(self, text: str, model: str | None = None) -> list[float]:
+        self.calls.append(text)
+        self.requests += 1
+        return [float(len(text)), 1.0, 0.0]
+
+    def generate_embeddings(self, texts: list[str], model: str | None = None) -> list[list[float]]:
+        self.calls.extend(texts)
+        self.requests += 1
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
 
 # Test database setup
 TEST_DATABASE_URL = "sqlite:///./test.db"
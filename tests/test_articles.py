@@ -194,3 +194,127 @@ def test_search_articles(client, authenticated_client, test_user, db_session):
     data = response.json()
     # Semantic search may not work perfectly with dummy embeddings, so just check it returns results
     assert len(data) >= 0  # At least returns without error
+
+
+def test_unchanged_content_is_not_re_embedded(db_session, test_user):
+    """Test retagging and duplicate content reuse stored vectors."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.vector_index import VectorIndex
+    from .conftest import CountingEmbeddingService
+
+    embedding_service = CountingEmbeddingService()
+    service = ArticleService(ArticleRepository(db_session), embedding_service, VectorIndex())
+
+    article = service.create_article(ArticleCreate(title="Docker", content="Docker basics"), test_user.id)
+    assert len(embedding_service.calls) == 1
+
+    service.update_article(article.id, ArticleCreate(title="Docker 101", content="Docker basics", tags=["ops"]))
+    assert len(embedding_service.calls) == 1
+
+    duplicate = service.create_article(ArticleCreate(title="Copy", content="Docker basics"), test_user.id)
+    assert len(embedding_service.calls) == 1
+    assert duplicate.embedding_vector == article.embedding_vector
+
+    service.update_article(article.id, ArticleCreate(title="Docker 101", content="Docker in depth"))
+    assert embedding_service.calls[-1] == "Docker in depth"
+
+
+def test_bulk_create_articles(db_session, test_user):
+    """Test bulk import embeds in packed requests, shares tags and reports per item."""
+    from knowledge_base_app.models.tag import Tag
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.vector_index import VectorIndex
+    from .conftest import CountingEmbeddingService
+
+    embedding_service = CountingEmbeddingService()
+    index = VectorIndex()
+    service = ArticleService(ArticleRepository(db_session), embedding_service, index)
+    articles = [
+        ArticleCreate(title=f"Doc {i}", content=f"Body {i % 3}", tags=["bulk", f"t{i % 2}"])
+        for i in range(7)
+    ]
+
+    results = service.bulk_create_articles(articles, test_user.id, batch_size=5)
+    assert all(isinstance(result, int) for result in results)
+    assert len(set(results)) == 7
+    # The second batch only repeats contents already stored by the first
+    assert embedding_service.requests == 1
+    assert sorted(embedding_service.calls) == ["Body 0", "Body 1", "Body 2"]
+    assert db_session.query(Tag).count() == 3
+    assert len(index) == 7
+
+
+def test_bulk_create_isolates_rejected_inputs(db_session, test_user):
+    """Test a provider rejecting one input fails only that item, not the rest of its request."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.vector_index import VectorIndex
+    from .conftest import CountingEmbeddingService
+
+    class RejectingEmbeddingService(CountingEmbeddingService):
+        def generate_embeddings(self, texts, model=None):
+            if "poison" in texts:
+                self.requests += 1
+                raise ValueError("input rejected")
+            return super().generate_embeddings(texts, model)
+
+    service = ArticleService(ArticleRepository(db_session), RejectingEmbeddingService(), VectorIndex())
+    contents = ["one", "two", "poison", "four", "five"]
+    results = service.bulk_create_articles([ArticleCreate(title=c, content=c) for c in contents], test_user.id)
+
+    assert [isinstance(result, Exception) for result in results] == [False, False, True, False, False]
+    assert len(service.index) == 4
+
+
+def test_bulk_import_reports_malformed_ndjson_lines_per_item(client, test_user):
+    """Test a bad NDJSON line is reported as that item's error while the other lines are imported."""
+    from knowledge_base_app.core.deps import get_current_user
+    from knowledge_base_app.main import app
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    body = '{"title": "a", "content": "alpha"}\n{"title": "b", \n\n{"title": "c", "content": "gamma"}\n'
+    response = client.post("/api/v1/articles/bulk", content=body, headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 1)
+    assert [result["id"] is not None for result in data["results"]] == [True, False, True]
+    assert data["results"][1]["error"].startswith("Invalid JSON")
+
+
+def indexed_articles(db_session, test_user, contents: list[str]):
+    """Articles embedded by the counting stub into a fresh index; returns (article ids, search service)."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.search import SearchService
+    from knowledge_base_app.services.vector_index import VectorIndex
+    from .conftest import CountingEmbeddingService
+
+    embedding_service, index = CountingEmbeddingService(), VectorIndex()
+    repo = ArticleRepository(db_session)
+    service = ArticleService(repo, embedding_service, index)
+    ids = [service.create_article(ArticleCreate(title=c, content=c, tags=["docs"]), test_user.id).id for c in contents]
+    return ids, SearchService(repo, embedding_service, index)
+
+
+def test_batch_search_endpoint_returns_hits(client, db_session, test_user):
+    """Test each query of a batch search gets its hits with the full article."""
+    from knowledge_base_app.core.deps import get_search_service
+    from knowledge_base_app.main import app
+
+    ids, search_service = indexed_articles(db_session, test_user, ["short", "a much longer body"])
+    app.dependency_overrides[get_search_service] = lambda: search_service
+    response = client.post("/api/v1/articles/search/batch", json={"queries": ["tiny", "q"], "top_k": 2})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["query"] for result in results] == ["tiny", "q"]
+    hit = results[0]["hits"][0]
+    assert hit["article"]["id"] in ids and hit["article"]["tags"][0]["name"] == "docs"
+    assert len(results[1]["hits"]) == 2
@@ -321,3 +321,204 @@ def test_chat_sources_verification(authenticated_client, db_session, test_user):
         # Sources should be article IDs
         assert all(isinstance(s, int) for s in sources)
 
+
+
+def local_chat_service(db_session, chat_response: str, session_factory=None, **options):
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.repositories.chat import ChatRepository
+    from knowledge_base_app.services.chat import ChatService
+    from knowledge_base_app.services.embedding import EmbeddingService
+    from knowledge_base_app.services.local_provider import AsyncLocalOpenAIClient, LocalOpenAIClient
+    from knowledge_base_app.services.search import SearchService
+    from knowledge_base_app.services.vector_index import VectorIndex
+
+    embeddings = EmbeddingService(api_key=None, azure_endpoint=None, client=LocalOpenAIClient(embedding_dimensions=8))
+    search = SearchService(ArticleRepository(db_session), embeddings, VectorIndex())
+    return ChatService(
+        ChatRepository(db_session), search, None, None,
+        client=AsyncLocalOpenAIClient(chat_response=chat_response), session_factory=session_factory, **options,
+    )
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_stream_message_yields_tokens_then_stores_reply(db_session, test_user):
+    """Test the streaming reply arrives as sources, token pieces and the stored message."""
+    import asyncio
+
+    chat = local_chat_service(db_session, "Kettles need descaling.")
+    session = chat.create_session(test_user.id, "stream")
+    events = asyncio.run(collect(chat.stream_message(session.id, "How do I descale?")))
+
+    assert events[0] == ("sources", [])
+    assert [data for event, data in events if event == "token"] == ["Kettles", " need", " descaling."]
+    event, message = events[-1]
+    assert event == "done" and message.content == "Kettles need descaling."
+    assert [m.role for m in chat.get_session_messages(session.id)] == ["user", "assistant"]
+
+
+def test_stream_closed_early_keeps_partial_reply(db_session, test_user):
+    """Test a client disconnect (the generator is closed) still stores what was streamed so far."""
+    import asyncio
+
+    chat = local_chat_service(db_session, "one two three")
+    session = chat.create_session(test_user.id, "stream")
+
+    async def read_one_token():
+        events = chat.stream_message(session.id, "Count")
+        assert (await anext(events))[0] == "sources"
+        assert await anext(events) == ("token", "one")
+        await events.aclose()
+
+    asyncio.run(read_one_token())
+    stored = chat.get_session_messages(session.id)[-1]
+    assert (stored.role, stored.content) == ("assistant", "one")
+
+
+def test_send_message_runs_steps_in_separate_sessions(db_session, test_user):
+    """Test the concurrent pipeline stores both turns and sends the history ending with the question once."""
+    import asyncio
+    from .conftest import TestingSessionLocal
+
+    chat = local_chat_service(db_session, None, session_factory=TestingSessionLocal)
+    session = chat.create_session(test_user.id, "async")
+    asyncio.run(chat.send_message(session.id, "first question"))
+    reply, sources = asyncio.run(chat.send_message(session.id, "second question"))
+
+    assert reply.role == "assistant" and sources == []
+    db_session.expire_all()
+    assert [m.content for m in chat.get_session_messages(session.id)][::2] == ["first question", "second question"]
+    prompt, _, _ = asyncio.run(chat._prepare_turn(session.id, "third question", None, None))
+    history = [m["content"] for m in prompt[1:-1]]
+    assert history[-1] == "third question" and history.count("third question") == 1
+
+
+def test_rolling_summary_replaces_older_messages_in_prompts(db_session, test_user):
+    """Test piled-up turns queue a summary job, and later prompts send the summary plus only newer messages."""
+    import asyncio
+    from knowledge_base_app.repositories.chat import ChatRepository
+    from knowledge_base_app.repositories.job import JobRepository
+    from knowledge_base_app.services.chat_summary import SUMMARIZE_CHAT_JOB, ChatSummaryService
+    from knowledge_base_app.services.local_provider import LocalOpenAIClient
+
+    chat = local_chat_service(db_session, "ok", summarize_every=1, recent_messages=2)
+    session = chat.create_session(test_user.id, "long")
+    asyncio.run(chat.send_message(session.id, "turn one"))
+    assert JobRepository(db_session).count_by_status() == {}
+    asyncio.run(chat.send_message(session.id, "turn two"))
+    assert JobRepository(db_session).count_by_status() == {f"{SUMMARIZE_CHAT_JOB}.queued": 1}
+
+    summaries = ChatSummaryService(ChatRepository(db_session), LocalOpenAIClient(chat_response="User asked turn one."), keep_recent=2)
+    assert summaries.summarize(session.id) is True
+    db_session.refresh(session)
+    first_two = [m.id for m in chat.get_session_messages(session.id)][:2]
+    assert (session.summary, session.summary_through_id) == ("User asked turn one.", first_two[-1])
+    assert summaries.summarize(session.id) is False  # only the recent window is left
+
+    prompt, _, unsummarized = asyncio.run(chat._prepare_turn(session.id, "turn three", None, None))
+    history = [m["content"] for m in prompt[1:-1]]
+    assert history == ["Summary of the earlier conversation:\nUser asked turn one.", "turn two", "ok", "turn three"]
+    assert unsummarized == 4
+
+
+def test_summary_refresh_folds_a_long_backlog_in_batches(db_session, test_user):
+    """Test each refresh folds at most max_messages messages and the next one continues from there."""
+    from knowledge_base_app.models.chat import ChatMessage
+    from knowledge_base_app.repositories.chat import ChatRepository
+    from knowledge_base_app.services.chat_summary import ChatSummaryService
+    from knowledge_base_app.services.local_provider import LocalOpenAIClient
+
+    session = ChatSession(title="backlog", user_id=test_user.id)
+    db_session.add(session)
+    db_session.commit()
+    messages = [ChatMessage(session_id=session.id, role="user", content=f"turn {n}") for n in range(10)]
+    db_session.add_all(messages)
+    db_session.commit()
+    ids = [m.id for m in messages]
+
+    summaries = ChatSummaryService(
+        ChatRepository(db_session), LocalOpenAIClient(chat_response="So far."), keep_recent=2, max_messages=3
+    )
+    through = []
+    while summaries.has_backlog(session.id):
+        assert summaries.summarize(session.id) is True
+        db_session.refresh(session)
+        through.append(session.summary_through_id)
+    assert through == [ids[2], ids[5], ids[7]]  # 8 older messages in batches of 3; the 2 newest stay verbatim
+    assert summaries.summarize(session.id) is False
+
+    # A token budget smaller than the batch ends the refresh early
+    session.summary, session.summary_through_id = None, None
+    db_session.commit()
+    tight = ChatSummaryService(
+        ChatRepository(db_session), LocalOpenAIClient(chat_response="So far."),
+        keep_recent=2, max_messages=3, input_tokens=summaries.counter.count("user: turn 0") + 1,
+    )
+    assert tight.summarize(session.id) is True
+    db_session.refresh(session)
+    assert session.summary_through_id == ids[0]
+
+
+def test_stream_endpoint_sends_server_sent_events(client, db_session, test_user):
+    """Test the streaming endpoint frames the reply as text/event-stream events."""
+    import json
+    from knowledge_base_app.core.deps import get_chat_service, get_current_user
+    from knowledge_base_app.main import app
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    app.dependency_overrides[get_chat_service] = lambda: local_chat_service(db_session, "Hello there")
+    session = ChatSession(title="SSE", user_id=test_user.id)
+    db_session.add(session)
+    db_session.commit()
+
+    with client.stream("POST", f"/api/v1/chat/sessions/{session.id}/messages/stream", json={"message": "Hi"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.read().decode()
+
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names == ["sources", "token", "token", "done"]
+    done = json.loads(events[-1][1].removeprefix("data: "))
+    assert done["content"] == "Hello there" and done["role"] == "assistant"
+
+
+def test_message_history_is_read_newest_first_in_pages(db_session, test_user):
+    """Test bounded reads return the newest messages oldest-first, and a cursor pages further back."""
+    from knowledge_base_app.repositories.chat import ChatRepository
+
+    repo = ChatRepository(db_session)
+    session = repo.create_session(test_user.id, "long")
+    ids = [repo.add_message(session.id, "user", f"message {n}").id for n in range(7)]
+
+    assert [m.id for m in repo.get_session_messages(session.id, limit=3)] == ids[4:]
+    assert [m.id for m in repo.get_session_messages(session.id, limit=3, before_id=ids[4])] == ids[1:4]
+    assert [m.id for m in repo.get_session_messages(session.id, limit=3, before_id=ids[1])] == ids[:1]
+    assert [m.id for m in repo.get_session_messages(session.id)] == ids
+    assert [m.id for m in repo.get_recent_messages(session.id, 10, after_id=ids[4])] == ids[5:]
+    assert [m.id for m in repo.get_recent_messages(session.id, 2)] == ids[5:]
+
+
+def test_list_endpoints_paginate_with_next_cursor(client, db_session, test_user):
+    """Test session and message listings return a page plus an X-Next-Cursor header until the last page."""
+    from knowledge_base_app.core.deps import get_current_user
+    from knowledge_base_app.main import app
+    from knowledge_base_app.repositories.chat import ChatRepository
+
+    app.dependency_overrides[get_current_user] = lambda: test_user
+    repo = ChatRepository(db_session)
+    sessions = [repo.create_session(test_user.id, f"session {n}").id for n in range(3)]
+    messages = [repo.add_message(sessions[0], "user", f"message {n}").id for n in range(5)]
+
+    first = client.get("/api/v1/chat/sessions", params={"limit": 2})
+    assert [s["id"] for s in first.json()] == sessions[:0:-1]
+    last = client.get("/api/v1/chat/sessions", params={"limit": 2, "before": first.headers["X-Next-Cursor"]})
+    assert [s["id"] for s in last.json()] == sessions[:1] and "X-Next-Cursor" not in last.headers
+
+    url = f"/api/v1/chat/sessions/{sessions[0]}/messages"
+    newest = client.get(url, params={"limit": 3})
+    assert [m["id"] for m in newest.json()] == messages[2:]
+    older = client.get(url, params={"limit": 3, "before": newest.headers["X-Next-Cursor"]})
+    assert [m["id"] for m in older.json()] == messages[:2] and "X-Next-Cursor" not in older.headers
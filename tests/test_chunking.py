@@ -0,0 +1,58 @@
+"""
+Tests for article chunking and the chunk index.
+"""
+from knowledge_base_app.models.chunk import ArticleChunk
+from knowledge_base_app.repositories.article import ArticleRepository
+from knowledge_base_app.repositories.chunk import ChunkRepository
+from knowledge_base_app.schemas.article import ArticleCreate
+from knowledge_base_app.services.article import ArticleService
+from knowledge_base_app.services.chunk import ChunkService
+from knowledge_base_app.services.chunking import TextChunker
+from knowledge_base_app.services.vector_index import VectorIndex
+
+from .conftest import CountingEmbeddingService
+
+
+def test_chunks_cover_text_with_overlap():
+    """Test spans cover the whole text, overlap, and break on word boundaries."""
+    text = " ".join(f"word{i}" for i in range(400))
+    spans = TextChunker(size=200, overlap=50).split(text)
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert end - start <= 200
+        assert start < next_start < end  # windows overlap
+        assert text[end - 1] == " " and text[next_start - 1] == " "
+
+
+def test_short_text_is_one_chunk():
+    assert TextChunker(size=200, overlap=50).split("short") == [(0, 5)]
+    assert TextChunker().split("") == []
+
+
+def test_article_lifecycle_keeps_chunks_indexed(db_session, test_user):
+    """Test chunks are created, replaced and removed along with their article."""
+    embedding_service = CountingEmbeddingService()
+    chunk_index = VectorIndex()
+    chunk_service = ChunkService(ChunkRepository(db_session), embedding_service, chunk_index, TextChunker(100, 20))
+    service = ArticleService(ArticleRepository(db_session), embedding_service, VectorIndex(), chunk_service)
+
+    long_body = " ".join(f"sentence {i}." for i in range(60))
+    article = service.create_article(ArticleCreate(title="Long", content=long_body), test_user.id)
+    chunks = db_session.query(ArticleChunk).filter_by(article_id=article.id).order_by(ArticleChunk.chunk_index).all()
+    assert len(chunks) > 1
+    assert all(long_body[c.start_offset:c.end_offset] == c.content for c in chunks)
+    assert len(chunk_index) == len(chunks)
+
+    # A single-chunk article reuses its article vector instead of a second call
+    calls = len(embedding_service.calls)
+    short = service.create_article(ArticleCreate(title="Short", content="Tiny body"), test_user.id)
+    assert len(embedding_service.calls) == calls + 1
+    assert len(chunk_index) == len(chunks) + 1
+
+    service.update_article(article.id, ArticleCreate(title="Long", content="Now short"))
+    assert db_session.query(ArticleChunk).filter_by(article_id=article.id).count() == 1
+    assert len(chunk_index) == 2
+
+    service.delete_article(short.id)
+    assert len(chunk_index) == 1
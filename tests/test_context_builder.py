@@ -0,0 +1,89 @@
+"""
+Tests for fitting RAG context and chat history into token budgets.
+"""
+from knowledge_base_app.models.article import Article
+from knowledge_base_app.models.chunk import ArticleChunk
+from knowledge_base_app.services.context_builder import ContextBuilder, TokenCounter
+
+FILLER = "Kettles come in many shapes and colours and sit on most kitchen counters. " * 12
+TIP = "To descale the kettle, boil a mix of water and vinegar, then rinse twice. "
+
+
+def make_article(article_id: int, content: str) -> Article:
+    return Article(id=article_id, title=f"Article {article_id}", content=content, content_hash=f"hash-{article_id}")
+
+
+def make_chunk(chunk_id: int, article: Article, start: int, end: int) -> ArticleChunk:
+    chunk = ArticleChunk(
+        id=chunk_id, article_id=article.id, chunk_index=chunk_id,
+        start_offset=start, end_offset=end, content=article.content[start:end],
+    )
+    chunk.article = article
+    return chunk
+
+
+def test_oversized_article_is_cut_to_its_most_relevant_passages():
+    """Test an article over its share keeps the passage matching the query and stays within budget."""
+    builder = ContextBuilder(context_tokens=250)
+    article = make_article(1, FILLER + "\n\n" + TIP + "\n\n" + FILLER)
+    context, sources = builder.build_article_context("how do I descale a kettle with vinegar", [(article, 0.9)])
+
+    assert sources == [1]
+    assert "descale the kettle" in context
+    assert builder.counter.count(context) <= 250
+    assert len(context) < len(article.content)
+
+
+def test_short_articles_are_kept_whole_and_budget_rolls_forward():
+    """Test articles that fit are quoted in full and one with no room left is dropped from the sources."""
+    builder = ContextBuilder(context_tokens=120)
+    short, long = make_article(1, TIP), make_article(2, FILLER * 4)
+    context, sources = builder.build_article_context("descale", [(short, 0.9), (long, 0.8)])
+    assert TIP in context and sources[0] == 1
+    assert builder.counter.count(context) <= 120
+
+    context, sources = ContextBuilder(context_tokens=5).build_article_context("descale", [(short, 0.9)])
+    assert (context, sources) == ("", [])
+
+
+def test_chunk_context_takes_best_hits_that_fit():
+    """Test passage hits are added best-first, skipping one too large for what is left."""
+    article = make_article(1, FILLER + TIP)
+    other = make_article(2, TIP * 2)
+    big = make_chunk(1, article, 0, len(FILLER))
+    tip = make_chunk(2, article, len(FILLER), len(FILLER) + len(TIP))
+    builder = ContextBuilder()
+    builder.context_tokens = builder.counter.count(TIP) * 3 + 20
+
+    context, sources = builder.build_chunk_context("descale", [(tip, 0.9), (big, 0.8), (make_chunk(3, other, 0, len(TIP)), 0.7)])
+    assert sources == [1, 2]
+    assert FILLER not in context and context.count("descale the kettle") == 2
+
+
+def test_history_is_trimmed_oldest_first_and_keeps_the_question():
+    """Test the newest messages that fit are kept in order, and the question even when over budget."""
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "word " * 40} for i in range(6)]
+    builder = ContextBuilder(history_tokens=0)
+    assert builder.fit_history(messages) == messages[-1:]
+
+    per_message = builder.counter.count(messages[0]["content"]) + 4
+    builder = ContextBuilder(history_tokens=per_message * 3, max_messages=10)
+    assert builder.fit_history(messages) == messages[-3:]
+    assert ContextBuilder(history_tokens=10_000, max_messages=4).fit_history(messages) == messages[-4:]
+
+
+def test_token_counts_are_cached_by_key():
+    """Test a keyed count is reused without re-counting and the cache stays bounded."""
+    counter = TokenCounter(cache_size=2)
+    assert counter.count("one two three", key="a") == counter.count("one two three")
+    assert counter.count("different text entirely", key="a") == counter.count("one two three")
+    counter.count("x", key="b")
+    counter.count("y", key="c")
+    assert list(counter._counts) == ["b", "c"]
+
+
+def test_truncate_fits_the_limit():
+    counter = TokenCounter()
+    cut = counter.truncate(TIP * 3, 10)
+    assert TIP.startswith(cut) and 0 < counter.count(cut) <= 10
+    assert counter.truncate(TIP, 1000) == TIP
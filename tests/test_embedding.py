@@ -0,0 +1,177 @@
+"""
+Tests for embedding storage helpers and the query embedding cache.
+"""
+import numpy as np
+
+from knowledge_base_app.repositories.embedding_cache import EmbeddingCacheRepository
+from knowledge_base_app.services.embedding_cache import EmbeddingCache
+
+from .conftest import CountingEmbeddingService
+
+
+def test_lru_evicts_oldest_and_counts():
+    """Test the in-process tier is bounded and tracks hits, misses and evictions."""
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", np.zeros(3))
+    cache.put("b", np.ones(3))
+    assert cache.get("a") is not None  # "a" is now most recently used
+    cache.put("c", np.ones(3))
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_ttl_expires_entries():
+    """Test entries older than the TTL are treated as misses."""
+    cache = EmbeddingCache(ttl_seconds=0)
+    cache.put("a", np.zeros(3))
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_embed_query_uses_both_tiers(db_session):
+    """Test repeated queries skip the provider, including after a restart."""
+    repo = EmbeddingCacheRepository(db_session)
+    service = CountingEmbeddingService(cache=EmbeddingCache(), cache_repo=repo)
+    first = service.embed_query("How do I reset  my password?")
+    second = service.embed_query("how do i reset my password?")
+    assert service.calls == ["how do i reset my password?"]
+    assert np.array_equal(first, second)
+
+    # A fresh process has an empty LRU but finds the persisted vector
+    restarted_cache = EmbeddingCache()
+    restarted = CountingEmbeddingService(cache=restarted_cache, cache_repo=repo)
+    assert np.array_equal(restarted.embed_query("How do I reset my password?"), first)
+    assert restarted.calls == []
+    assert restarted_cache.stats()["persistent_hits"] == 1
+
+
+def test_persistent_cache_expires_refreshes_and_prunes(db_session):
+    """Test shared-tier entries past the TTL miss, are refreshed when re-embedded, and are pruned."""
+    from datetime import datetime, timedelta, timezone
+    from knowledge_base_app.models.embedding_cache import EmbeddingCacheEntry
+
+    def age(key):
+        db_session.query(EmbeddingCacheEntry).filter(EmbeddingCacheEntry.key == key).update(
+            {EmbeddingCacheEntry.created_at: datetime.now(timezone.utc) - timedelta(hours=2)}
+        )
+        db_session.commit()
+
+    repo = EmbeddingCacheRepository(db_session, ttl_seconds=3600)
+    service = CountingEmbeddingService(cache_repo=repo)
+    first = service.embed_query("expiring query")
+    key = db_session.query(EmbeddingCacheEntry.key).scalar()
+    assert repo.get(key) is not None
+
+    age(key)
+    assert repo.get(key) is None
+    assert np.array_equal(service.embed_query("expiring query"), first)
+    assert len(service.calls) == 2  # re-embedded, and the stale row refreshed in place
+    assert repo.get(key) is not None
+
+    repo.put("stale", "m", b"\x00" * 12)
+    age("stale")
+    assert repo.prune() == 1
+    assert db_session.query(EmbeddingCacheEntry.key).all() == [(key,)]
+
+
+def test_pack_batches_respects_limits():
+    """Test texts are grouped by input count and token budget, keeping order."""
+    from knowledge_base_app.services.embedding import pack_batches
+
+    assert pack_batches(["a"] * 5, max_inputs=2) == [[0, 1], [2, 3], [4]]
+    texts = ["x" * 30, "x" * 30, "x" * 30]  # about 11 tokens each
+    assert pack_batches(texts, max_tokens=25) == [[0, 1], [2]]
+    assert pack_batches([]) == []
+
+
+def test_reembed_backfill_stages_then_cuts_over(db_session, test_user):
+    """Test a model switch: search only sees one model's vectors, staging is resumable, cutover swaps in place."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.repositories.chunk import ChunkRepository
+    from knowledge_base_app.repositories.embedding_backfill import EmbeddingBackfillRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.chunk import ChunkService
+    from knowledge_base_app.services.chunking import TextChunker
+    from knowledge_base_app.services.embedding_backfill import EmbeddingBackfillService
+    from knowledge_base_app.services.search import SearchService
+    from knowledge_base_app.services.vector_index import VectorIndex
+
+    article_repo, chunk_repo = ArticleRepository(db_session), ChunkRepository(db_session)
+    old = CountingEmbeddingService()
+    chunks = ChunkService(chunk_repo, old, VectorIndex(), TextChunker(100, 20))
+    articles = ArticleService(article_repo, old, VectorIndex(), chunks)
+    first = articles.create_article(ArticleCreate(title="a", content="word " * 50), test_user.id)
+    second = articles.create_article(ArticleCreate(title="b", content="short"), test_user.id)
+    assert first.embedding_model == "text-embedding-ada-002"
+
+    new = CountingEmbeddingService(model="text-embedding-3-small", dimensions=256)
+    backfill = EmbeddingBackfillService(EmbeddingBackfillRepository(db_session), chunk_repo, new)
+    assert backfill.stage_batch(limit=1) == [first.id]
+    assert backfill.stage_batch(after_id=first.id, limit=1) == [second.id]
+    assert backfill.stage_batch(after_id=second.id) == []
+    requests = new.requests
+    assert backfill.stage_batch() == []  # a restarted run finds nothing left to embed
+    assert new.requests == requests
+
+    # Live rows are untouched until cutover: the old model still serves everything
+    old_index, new_index = VectorIndex(), VectorIndex()
+    SearchService(article_repo, old, old_index).build_index()
+    SearchService(article_repo, new, new_index).build_index()
+    assert (len(old_index), len(new_index)) == (2, 0)
+
+    # An article edited after staging keeps its live vector (a real edit also replaces its chunk rows)
+    second.content_hash = "edited after staging"
+    db_session.commit()
+    assert backfill.cutover() == (1, len(chunk_repo.list_chunk_ids([first.id, second.id])))
+    db_session.refresh(first)
+    assert first.embedding_model == "text-embedding-3-small@256"
+    SearchService(article_repo, new, new_index).build_index()
+    assert list(new_index.ids) == [first.id]
+    assert EmbeddingBackfillRepository(db_session).count_staged(new.model_id) == 0
+
+
+def test_over_long_inputs_are_truncated_before_the_request():
+    """Test inputs beyond the per-input token limit are cut so they cannot fail the whole request."""
+    from knowledge_base_app.services.embedding import MAX_TOKENS_PER_INPUT, EmbeddingService, estimate_tokens
+    from knowledge_base_app.services.local_provider import LocalOpenAIClient
+
+    client = LocalOpenAIClient(embedding_dimensions=8)
+    sent = []
+    create = client.embeddings.create
+    client.embeddings.create = lambda input, **options: sent.append(input) or create(input=input, **options)
+    service = EmbeddingService(api_key=None, azure_endpoint=None, client=client)
+
+    long_text = "word " * (MAX_TOKENS_PER_INPUT * 2)
+    assert len(service.generate_embeddings(["short", long_text])) == 2
+    assert sent[0][0] == "short"
+    assert long_text.startswith(sent[0][1]) and estimate_tokens(sent[0][1]) <= MAX_TOKENS_PER_INPUT
+
+
+def test_services_share_one_pooled_openai_client(monkeypatch):
+    """Test embedding and chat services reuse the process-wide client instead of opening their own pools."""
+    import asyncio
+    from knowledge_base_app.core import deps
+
+    # The pool settings belong to the Azure client, whatever LLM_PROVIDER the suite runs with
+    monkeypatch.setattr(deps, "LLM_PROVIDER", "azure")
+    monkeypatch.setattr(deps, "AZURE_OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(deps, "AZURE_OPENAI_API_BASE", "https://example.invalid")
+    deps.close_openai_client()
+    asyncio.run(deps.close_async_openai_client())
+    client = deps.get_openai_client()
+    try:
+        assert deps.get_openai_client() is client
+        assert deps.get_embedding_service(None).client is client
+        assert deps.get_chat_service(None, None).client is deps.get_async_openai_client()
+        assert client.timeout.connect == deps.OPENAI_CONNECT_TIMEOUT
+        assert client.max_retries == deps.OPENAI_MAX_RETRIES
+    finally:
+        deps.close_openai_client()
+        asyncio.run(deps.close_async_openai_client())
+    assert deps.get_openai_client() is not client
+    deps.close_openai_client()  # not left behind for tests under the real provider
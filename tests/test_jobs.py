@@ -0,0 +1,162 @@
+"""
+Tests for the durable job queue and background article embedding.
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from knowledge_base_app.models.job import Job
+from knowledge_base_app.repositories.article import ArticleRepository
+from knowledge_base_app.repositories.job import JobRepository
+from knowledge_base_app.schemas.article import ArticleCreate
+from knowledge_base_app.services.article import EMBED_ARTICLE_JOB, ArticleService
+from knowledge_base_app.services.embedding import decode_embedding
+from knowledge_base_app.services.index_sync import IndexSync
+from knowledge_base_app.services.jobs import JobWorkerPool, retry_delay
+from knowledge_base_app.services.vector_index import VectorIndex
+
+from .conftest import CountingEmbeddingService, TestingSessionLocal
+
+
+def test_created_article_is_pending_until_the_job_runs(db_session, test_user):
+    """Test a create returns before embedding and a worker batch embeds, indexes and marks it ready."""
+    embedding_service, index = CountingEmbeddingService(), VectorIndex()
+
+    def handler(db, payloads):
+        service = ArticleService(ArticleRepository(db), embedding_service, index)
+        service.embed_articles([payload["article_id"] for payload in payloads])
+
+    writer = ArticleService(ArticleRepository(db_session), embedding_service, index, jobs=JobRepository(db_session))
+    first = writer.create_article(ArticleCreate(title="a", content="alpha"), test_user.id)
+    second = writer.create_article(ArticleCreate(title="b", content="beta"), test_user.id)
+    assert (first.embedding_status, first.embedding_vector) == ("pending", None)
+    assert embedding_service.requests == 0
+    assert writer.enqueue_pending() == 0  # both already have a job
+
+    pool = JobWorkerPool(TestingSessionLocal, {EMBED_ARTICLE_JOB: handler})
+    assert pool.drain() == 2
+    assert embedding_service.requests == 1  # one packed request for the whole batch
+    db_session.expire_all()
+    assert first.embedding_status == "ready" and first.embedding_vector is not None
+    assert {first.id, second.id} <= set(index.ids.tolist())
+    assert JobRepository(db_session).count_by_status() == {}
+
+
+def test_failing_job_retries_then_dead_letters(db_session):
+    """Test failures are requeued until max_attempts, then parked as dead and passed to on_dead."""
+    jobs = JobRepository(db_session)
+    jobs.enqueue("flaky", {"n": 1}, key="k", max_attempts=2)
+    jobs.enqueue("flaky", {"n": 1}, key="k")  # deduplicated while queued
+    dead = []
+
+    def handler(db, payloads):
+        raise RuntimeError("provider down")
+
+    pool = JobWorkerPool(
+        TestingSessionLocal, {"flaky": handler}, on_dead={"flaky": lambda db, payloads: dead.extend(payloads)},
+        backoff=lambda attempts: 0,
+    )
+    assert pool.run_once() == 1
+    assert jobs.count_by_status() == {"flaky.queued": 1}
+    assert pool.run_once() == 1
+    assert jobs.count_by_status() == {"flaky.dead": 1}
+    assert dead == [{"n": 1}]
+    assert pool.run_once() == 0
+
+    assert jobs.retry_dead() == 1
+    assert pool.run_once() == 1  # a fresh set of attempts
+    assert db_session.query(Job).one().last_error == "RuntimeError: provider down"
+
+
+def test_expired_claim_is_reclaimed(db_session):
+    """Test a job whose worker died becomes claimable after its visibility timeout, and only then."""
+    jobs = JobRepository(db_session)
+    jobs.enqueue("work", {})
+    claimed = jobs.claim("work", 10, visibility_timeout=60)
+    assert len(claimed) == 1
+    assert jobs.claim("work", 10, visibility_timeout=60) == []
+
+    db_session.query(Job).update({Job.locked_until: datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db_session.commit()
+    reclaimed = jobs.claim("work", 10, visibility_timeout=60)
+    assert [job.attempts for job in reclaimed] == [2]
+    jobs.complete(claimed)  # the stale worker's late completion does not delete the reclaimed job
+    assert jobs.count_by_status() == {"work.running": 1}
+    jobs.complete(reclaimed)
+    assert jobs.count_by_status() == {}
+
+
+def test_retry_delay_backs_off_exponentially():
+    assert [retry_delay(n) for n in (1, 2, 3)] == [5, 10, 20]
+    assert retry_delay(20) == 600
+
+
+def test_poison_payload_fails_alone(db_session):
+    """Test one payload that always raises is retried by itself while the rest of its batch completes."""
+    jobs = JobRepository(db_session)
+    jobs.enqueue_many("work", [(f"item:{n}", {"n": n}) for n in range(5)])
+    done = []
+
+    def handler(db, payloads):
+        if any(payload["n"] == 3 for payload in payloads):
+            raise ValueError("bad item")
+        done.extend(payload["n"] for payload in payloads)
+
+    pool = JobWorkerPool(TestingSessionLocal, {"work": handler}, backoff=lambda attempts: 0)
+    assert pool.run_once() == 5
+    assert sorted(done) == [0, 1, 2, 4]
+    assert jobs.count_by_status() == {"work.queued": 1}
+    assert db_session.query(Job).one().key == "item:3"
+
+
+def test_index_sync_picks_up_embeddings_stored_by_another_process(db_session, test_user):
+    """Test a serving index replays the vector changes a separate worker logged, and only those."""
+    embedding_service = CountingEmbeddingService()
+    repo = ArticleRepository(db_session)
+    worker = ArticleService(repo, embedding_service, VectorIndex(), jobs=JobRepository(db_session))
+    article = worker.create_article(ArticleCreate(title="a", content="alpha"), test_user.id)
+    loaded = []
+
+    def load_vectors(ids):
+        loaded.append(list(ids))
+        return {item_id: decode_embedding(vector) for item_id, vector, _ in ArticleRepository(db_session).list_embeddings_for(ids)}
+
+    serving = VectorIndex()
+    sync = IndexSync(serving, "articles", TestingSessionLocal, load_vectors)
+    sync.reset()
+    assert sync.sync_once() == 0
+
+    worker.embed_articles([article.id])
+    assert sync.sync_once() == 1 and article.id in serving
+    assert sync.sync_once() == 0
+    assert loaded == [[article.id]]  # nothing unchanged is read again
+
+    worker.update_article(article.id, ArticleCreate(title="a", content="beta"))
+    worker.embed_articles([article.id])
+    db_session.expire_all()
+    assert sync.sync_once() == 1
+    assert serving.search(load_vectors([article.id])[article.id], top_k=1)[0][1] == pytest.approx(1.0, abs=1e-5)
+
+    worker.delete_article(article.id)
+    assert sync.sync_once() == 1 and article.id not in serving
+
+
+def test_index_sync_rereads_changes_committed_out_of_order(db_session):
+    """Test a change id below the newest one seen is still applied when its transaction commits late."""
+    from knowledge_base_app.models.vector_change import VectorChange
+    from knowledge_base_app.repositories.vector_change import VectorChangeRepository
+
+    base, logged = VectorChangeRepository(db_session).latest_id(), db_session.query(VectorChange).count()
+    serving = VectorIndex()
+    sync = IndexSync(serving, "articles", TestingSessionLocal, lambda ids: {item_id: np.ones(3) for item_id in ids})
+    sync.reset()
+    db_session.add_all([VectorChange(id=base + 2, namespace="articles", item_id=20), VectorChange(id=base + 3, namespace="chunks", item_id=30)])
+    db_session.commit()
+    assert sync.sync_once() == 1 and list(serving.ids) == [20]  # change 1 is still in flight
+
+    db_session.add(VectorChange(id=base + 1, namespace="articles", item_id=10))
+    db_session.commit()
+    assert sync.sync_once() == 1 and 10 in serving
+    assert sync.sync_once() == 0
+    assert sync.prune() == 0 and db_session.query(VectorChange).count() == logged + 3  # all within the retention
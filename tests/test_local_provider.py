@@ -0,0 +1,65 @@
+"""
+Tests for the offline embedding and chat provider used for load testing.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from knowledge_base_app.repositories.article import ArticleRepository
+from knowledge_base_app.repositories.chat import ChatRepository
+from knowledge_base_app.schemas.article import ArticleCreate
+from knowledge_base_app.services.article import ArticleService
+from knowledge_base_app.services.chat import ChatService
+from knowledge_base_app.services.embedding import EmbeddingService
+from knowledge_base_app.services.local_provider import AsyncLocalOpenAIClient, LocalOpenAIClient
+from knowledge_base_app.services.search import SearchService
+from knowledge_base_app.services.vector_index import VectorIndex
+
+
+def local_embedding_service(client: LocalOpenAIClient, dimensions: int | None = None) -> EmbeddingService:
+    return EmbeddingService(api_key=None, azure_endpoint=None, model="local-hash", dimensions=dimensions, client=client)
+
+
+def test_local_embeddings_are_deterministic_unit_vectors():
+    """Test the same text always maps to the same normalized vector of the configured size."""
+    service = local_embedding_service(LocalOpenAIClient(embedding_dimensions=32))
+    first, second, other = service.generate_embeddings(["alpha", "alpha", "beta"])
+    assert len(first) == 32 and first == second and first != other
+    assert abs(np.linalg.norm(first) - 1.0) < 1e-5
+    assert service.generate_embedding("alpha") == first
+    assert len(local_embedding_service(LocalOpenAIClient(), dimensions=8).generate_embedding("alpha")) == 8
+
+
+def test_chat_round_trip_with_local_provider(db_session, test_user):
+    """Test search and a RAG chat turn run end to end offline, with an echoed or canned reply."""
+    client = LocalOpenAIClient(embedding_dimensions=16)
+    embeddings, index = local_embedding_service(client), VectorIndex()
+    ArticleService(ArticleRepository(db_session), embeddings, index).create_article(
+        ArticleCreate(title="Kettles", content="How to descale a kettle"), test_user.id
+    )
+    search = SearchService(ArticleRepository(db_session), embeddings, index)
+    chat = ChatService(ChatRepository(db_session), search, None, None, client=AsyncLocalOpenAIClient())
+    session = chat.create_session(test_user.id, "offline")
+
+    reply, sources = asyncio.run(chat.send_message(session.id, "How to descale a kettle"))
+    assert "How to descale a kettle" in reply.content  # echo of the user prompt
+    assert len(sources) == 1
+
+    chat.client = AsyncLocalOpenAIClient(chat_response="canned")
+    reply, _ = asyncio.run(chat.send_message(session.id, "Again?"))
+    assert reply.content == "canned"
+
+
+def test_local_provider_needs_no_azure_settings():
+    """Test the application imports without Azure credentials when the local provider is selected."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("AZURE_OPENAI")}
+    env["LLM_PROVIDER"] = "local"
+    result = subprocess.run(
+        [sys.executable, "-c", "from knowledge_base_app.core import deps; print(deps.EMBEDDING_MODEL_ID)"],
+        env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "local-hash"
@@ -0,0 +1,111 @@
+"""
+Tests for the precomputed related-articles graph.
+"""
+import numpy as np
+
+from knowledge_base_app.models.article import Article
+from knowledge_base_app.repositories.article import ArticleRepository
+from knowledge_base_app.repositories.neighbor import NeighborRepository
+from knowledge_base_app.services.embedding import encode_embedding
+from knowledge_base_app.services.related import RelatedArticlesService
+from knowledge_base_app.services.vector_index import VectorIndex
+
+
+def add_article(db_session, author_id: int, vector: list[float], index: VectorIndex) -> int:
+    article = Article(title="t", content="c", author_id=author_id, embedding_vector=encode_embedding(np.array(vector)))
+    db_session.add(article)
+    db_session.commit()
+    index.upsert(article.id, vector)
+    return article.id
+
+
+def related_ids(service: RelatedArticlesService, article_id: int) -> list[int]:
+    return [article.id for article, _ in service.get_related(article_id)]
+
+
+def test_graph_is_maintained_incrementally(db_session, test_user):
+    """Test new, changed and deleted articles update both their own and their neighbours' lists."""
+    index = VectorIndex()
+    service = RelatedArticlesService(NeighborRepository(db_session), ArticleRepository(db_session), index, k=2)
+    a = add_article(db_session, test_user.id, [1.0, 0.0, 0.0], index)
+    b = add_article(db_session, test_user.id, [0.9, 0.1, 0.0], index)
+    c = add_article(db_session, test_user.id, [0.0, 0.0, 1.0], index)
+    for article_id in (a, b, c):
+        service.refresh(article_id)
+    assert related_ids(service, a) == [b, c]
+
+    # A closer article displaces the weakest neighbour of a
+    d = add_article(db_session, test_user.id, [1.0, 0.05, 0.0], index)
+    service.refresh(d)
+    assert related_ids(service, a) == [d, b]
+
+    # Moving b far away makes the lists that held it recompute
+    db_session.get(Article, b).embedding_vector = encode_embedding(np.array([-1.0, 1.0, 0.0]))
+    db_session.commit()
+    index.upsert(b, [-1.0, 1.0, 0.0])
+    service.refresh(b)
+    assert b not in related_ids(service, a)
+
+    index.remove(d)
+    db_session.delete(db_session.get(Article, d))
+    db_session.commit()
+    service.remove(d)
+    assert d not in related_ids(service, a)
+    assert len(related_ids(service, a)) == 2
+
+
+def test_related_is_computed_on_first_request(db_session, test_user):
+    """Test an article missing from the graph gets its neighbours on demand."""
+    index = VectorIndex()
+    service = RelatedArticlesService(NeighborRepository(db_session), ArticleRepository(db_session), index)
+    a = add_article(db_session, test_user.id, [1.0, 0.0], index)
+    b = add_article(db_session, test_user.id, [1.0, 0.2], index)
+    related = service.get_related(a)
+    assert [article.id for article, _ in related] == [b]
+    assert NeighborRepository(db_session).list_sources(b) == [a]
+
+
+def test_refresh_after_score_drop_matches_full_rebuild(db_session, test_user):
+    """Test a neighbour that moves away, yet stays in the lists, no longer hides a better candidate."""
+    index = VectorIndex()
+    repo = NeighborRepository(db_session)
+    service = RelatedArticlesService(repo, ArticleRepository(db_session), index, k=2)
+    a = add_article(db_session, test_user.id, [1.0, 0.0], index)
+    b = add_article(db_session, test_user.id, [0.99, 0.1], index)
+    c = add_article(db_session, test_user.id, [0.95, 0.31], index)
+    d = add_article(db_session, test_user.id, [0.7, 0.7], index)
+    ids = [a, b, c, d]
+    for article_id in ids:
+        service.refresh(article_id)
+    assert related_ids(service, a) == [b, c]
+
+    # b moves away from a, but a is still among b's own nearest
+    db_session.get(Article, b).embedding_vector = encode_embedding(np.array([0.3, -0.95]))
+    db_session.commit()
+    index.upsert(b, [0.3, -0.95])
+    service.refresh(b)
+    incremental = {article_id: related_ids(service, article_id) for article_id in ids}
+
+    service.rebuild(ids)
+    assert incremental == {article_id: related_ids(service, article_id) for article_id in ids}
+    assert incremental[a] == [c, d]
+
+
+def test_related_endpoint_returns_neighbours(client, db_session, test_user):
+    """Test GET /articles/{id}/related serializes the stored neighbours with their scores."""
+    from knowledge_base_app.core.deps import get_related_articles_service
+    from knowledge_base_app.main import app
+
+    index = VectorIndex()
+    service = RelatedArticlesService(NeighborRepository(db_session), ArticleRepository(db_session), index)
+    a = add_article(db_session, test_user.id, [1.0, 0.0], index)
+    b = add_article(db_session, test_user.id, [1.0, 0.2], index)
+    service.refresh(a)
+    app.dependency_overrides[get_related_articles_service] = lambda: service
+
+    response = client.get(f"/api/v1/articles/{a}/related")
+    assert response.status_code == 200
+    related = response.json()
+    assert [item["article"]["id"] for item in related] == [b]
+    assert related[0]["score"] > 0.9
+    assert client.get("/api/v1/articles/99999/related").status_code == 404
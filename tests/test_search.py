@@ -0,0 +1,442 @@
+"""
+Tests for the in-memory vector index used by search.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from knowledge_base_app.services.embedding import encode_embedding, decode_embedding
+from knowledge_base_app.services.ivf_index import IVFIndex
+from knowledge_base_app.services.mmap_index import MappedVectorIndex
+from knowledge_base_app.services.vector_index import VectorIndex
+
+
+def brute_force(vectors: dict[int, np.ndarray], query: np.ndarray, top_k: int) -> list[int]:
+    q = query / np.linalg.norm(query)
+    scores = {i: float(v @ q / np.linalg.norm(v)) for i, v in vectors.items()}
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
+
+
+def test_search_matches_brute_force():
+    """Test index ranking agrees with a per-vector cosine loop."""
+    rng = np.random.default_rng(0)
+    vectors = {i: rng.normal(size=32) for i in range(1, 201)}
+    index = VectorIndex(initial_capacity=8)
+    index.build(vectors.items())
+
+    query = rng.normal(size=32)
+    results = index.search(query, top_k=5)
+    assert [article_id for article_id, score in results] == brute_force(vectors, query, 5)
+    scores = [score for article_id, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_upsert_and_remove_keep_index_current():
+    """Test updates replace vectors and removals drop them."""
+    index = VectorIndex()
+    index.build([(1, [1.0, 0.0]), (2, [0.0, 1.0]), (3, [1.0, 1.0])])
+
+    index.upsert(2, [1.0, 0.01])
+    assert len(index) == 3
+    assert index.search([1.0, 0.0], top_k=2)[0][0] in (1, 2)
+
+    assert index.remove(1)
+    assert not index.remove(1)
+    assert 1 not in index
+    assert [article_id for article_id, _ in index.search([1.0, 0.0], top_k=5)] == [2, 3]
+
+
+def test_top_k_larger_than_index_and_zero_vectors():
+    """Test small indexes return everything and zero vectors score 0."""
+    index = VectorIndex()
+    index.build([(1, [0.0, 0.0]), (2, [3.0, 4.0])])
+    results = index.search([3.0, 4.0], top_k=10)
+    assert [article_id for article_id, _ in results] == [2, 1]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == 0.0
+
+
+def test_dimension_mismatch_raises():
+    """Test mixing embedding sizes is rejected."""
+    index = VectorIndex()
+    index.upsert(1, [1.0, 0.0, 0.0])
+    with pytest.raises(ValueError):
+        index.upsert(2, [1.0, 0.0])
+
+
+def test_embedding_storage_round_trip():
+    """Test binary storage is packed float32 and legacy JSON still decodes."""
+    vector = [0.25, -1.5, 3.0]
+    blob = encode_embedding(vector)
+    assert len(blob) == 4 * len(vector)
+    assert decode_embedding(blob).tolist() == vector
+    assert decode_embedding("[0.25, -1.5, 3.0]").tolist() == vector
+    assert decode_embedding(None) is None
+
+
+def test_ivf_index_recall_against_exact():
+    """Test IVF returns nearly the same neighbours as exact search."""
+    rng = np.random.default_rng(1)
+    centres = rng.normal(size=(20, 16))
+    data = centres[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 16))
+    ids = np.arange(1, 2001)
+    exact = VectorIndex()
+    exact.build_arrays(ids, data)
+    ivf = IVFIndex(nlist=16, nprobe=4, min_train_size=500)
+    ivf.build_arrays(ids, data)
+    assert ivf.trained
+
+    found = total = 0
+    for query in data[:50]:
+        truth = {article_id for article_id, _ in exact.search(query, top_k=10)}
+        found += len(truth & {article_id for article_id, _ in ivf.search(query, top_k=10)})
+        total += len(truth)
+    assert found / total > 0.9
+
+
+def test_ivf_index_incremental_insert_and_delete():
+    """Test IVF trains once enough vectors arrive and honours deletes."""
+    rng = np.random.default_rng(2)
+    ivf = IVFIndex(nlist=4, nprobe=4, min_train_size=100)
+    for article_id in range(1, 100):
+        ivf.upsert(article_id, rng.normal(size=8))
+    assert not ivf.trained
+    ivf.upsert(100, rng.normal(size=8))
+    ivf.wait_for_training()  # clustered in the background; searches stay exact until then
+    assert ivf.trained
+    assert len(ivf) == 100
+
+    target = rng.normal(size=8)
+    ivf.upsert(7, target)
+    assert ivf.search(target, top_k=1)[0][0] == 7
+    assert ivf.remove(7)
+    assert 7 not in ivf
+    assert all(article_id != 7 for article_id, _ in ivf.search(target, top_k=100))
+
+
+def test_ivf_trains_in_background_without_losing_writes():
+    """Test searches and writes go on while k-means runs, and writes made meanwhile survive the swap."""
+    import threading
+
+    rng = np.random.default_rng(5)
+    ivf = IVFIndex(nlist=4, nprobe=4, min_train_size=50)
+    release = threading.Event()
+    kmeans = ivf._kmeans
+    ivf._kmeans = lambda rows: release.wait(10) and kmeans(rows)
+    vectors = {article_id: rng.normal(size=8) for article_id in range(1, 51)}
+    for article_id, vector in vectors.items():
+        ivf.upsert(article_id, vector)
+
+    # Training is blocked: the index answers exactly and takes writes
+    assert not ivf.trained
+    assert ivf.search(vectors[9], top_k=1)[0][0] == 9
+    ivf.upsert(999, vectors[9] * 2)
+    ivf.upsert(12, -vectors[12])
+    assert ivf.remove(3)
+
+    release.set()
+    ivf.wait_for_training()
+    assert ivf.trained and len(ivf) == 50
+    assert 999 in ivf and 3 not in ivf
+    assert {hit[0] for hit in ivf.search(vectors[9], top_k=2)} == {9, 999}
+    assert ivf.search(-vectors[12], top_k=1)[0][0] == 12
+
+
+def test_reciprocal_rank_fusion_prefers_items_ranked_by_both():
+    """Test RRF rewards ids that appear high in several rankings."""
+    from knowledge_base_app.services.search import reciprocal_rank_fusion
+
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]])
+    assert [item_id for item_id, _ in fused][:2] == [1, 3]
+    assert {item_id for item_id, _ in fused} == {1, 2, 3, 4}
+
+
+def test_lexical_search_uses_full_text_index(db_session, test_user):
+    """Test keyword search finds exact terms, follows edits and deletes, and needs no embeddings."""
+    from knowledge_base_app.models.article import Article
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import SearchMode
+    from knowledge_base_app.services.search import SearchService
+
+    db_session.add_all([
+        Article(title="Error E1234 on login", content="Clear the cache", author_id=test_user.id),
+        Article(title="Deploying", content="If you see E1234 restart the pod", author_id=test_user.id),
+        Article(title="Unrelated", content="Nothing here", author_id=test_user.id),
+    ])
+    db_session.commit()
+    repo = ArticleRepository(db_session)
+
+    hits = repo.search_lexical("what is e1234?")
+    assert len(hits) == 2
+    # Title matches outrank body matches
+    assert repo.get(hits[0][0]).title == "Error E1234 on login"
+    assert repo.search_lexical('"unbalanced AND (') == []
+
+    unrelated = db_session.query(Article).filter_by(title="Unrelated").one()
+    unrelated.content = "Now mentions e1234"
+    db_session.commit()
+    assert len(repo.search_lexical("E1234")) == 3
+    db_session.delete(unrelated)
+    db_session.commit()
+    assert len(repo.search_lexical("E1234")) == 2
+
+    service = SearchService(repo, embedding_service=None, index=VectorIndex())
+    results = service.search_articles("E1234", top_k=1, mode=SearchMode.LEXICAL)
+    assert [article.title for article, _ in results] == ["Error E1234 on login"]
+
+
+def test_filtered_search_scores_only_allowed_ids():
+    """Test a filter returns the best allowed matches rather than a thinned global top-k."""
+    rng = np.random.default_rng(2)
+    vectors = {i: rng.normal(size=16) for i in range(1, 301)}
+    allowed = np.array([i for i in vectors if i % 7 == 0], dtype=np.int64)
+    query = rng.normal(size=16)
+    expected = brute_force({i: vectors[i] for i in allowed.tolist()}, query, 5)
+
+    index = VectorIndex()
+    index.build(vectors.items())
+    assert [article_id for article_id, _ in index.search(query, top_k=5, allowed_ids=allowed)] == expected
+    assert index.search(query, top_k=5, allowed_ids=np.array([], dtype=np.int64)) == []
+
+    ivf = IVFIndex(nlist=8, nprobe=1, min_train_size=100)
+    ivf.build(vectors.items())
+    assert ivf.trained
+    # Selective filters and filters the probed buckets cannot satisfy are both answered exactly
+    assert [article_id for article_id, _ in ivf.search(query, top_k=5, allowed_ids=allowed[:6])] == \
+        brute_force({i: vectors[i] for i in allowed[:6].tolist()}, query, 5)
+    assert len(ivf.search(query, top_k=len(allowed), allowed_ids=allowed)) == len(allowed)
+
+
+def test_search_service_filters_by_tag_and_author(db_session, test_user):
+    """Test tag and author filters restrict vector, lexical and chunk search."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.repositories.chunk import ChunkRepository
+    from knowledge_base_app.schemas.article import ArticleCreate, SearchMode
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.chunk import ChunkService
+    from knowledge_base_app.services.chunking import TextChunker
+    from knowledge_base_app.services.search import SearchService
+    from .conftest import CountingEmbeddingService
+
+    repo, chunk_repo = ArticleRepository(db_session), ChunkRepository(db_session)
+    embeddings = CountingEmbeddingService()
+    index, chunk_index = VectorIndex(), VectorIndex()
+    chunk_service = ChunkService(chunk_repo, embeddings, chunk_index, TextChunker())
+    articles = ArticleService(repo, embeddings, index, chunk_service)
+    billing = articles.create_article(ArticleCreate(title="Refunds", content="refund policy", tags=["billing"]), test_user.id)
+    articles.create_article(ArticleCreate(title="Refund bug", content="refund endpoint errors", tags=["eng"]), test_user.id)
+
+    search = SearchService(repo, embeddings, index, chunk_repo, chunk_index)
+    for mode in SearchMode:
+        results = search.search_articles("refund", top_k=5, mode=mode, tags=["billing"])
+        assert [article.id for article, _ in results] == [billing.id]
+    assert len(search.search_articles("refund", top_k=5, author_id=test_user.id)) == 2
+    assert search.search_articles("refund", top_k=5, author_id=test_user.id + 1) == []
+
+    chunks = search.search_chunks("refund", top_k=5, tags=["billing"])
+    assert {chunk.article_id for chunk, _ in chunks} == {billing.id}
+    assert search.search_chunks("refund", top_k=5, tags=["missing"]) == []
+
+
+def test_mapped_index_is_shared_through_the_file(tmp_path):
+    """Test two handles on one file agree, and writes reach the other handle after a flush."""
+    rng = np.random.default_rng(3)
+    vectors = {i: rng.normal(size=16) for i in range(1, 101)}
+    path = str(tmp_path / "articles.idx")
+    writer = MappedVectorIndex(path, flush_delay=60)
+    reader = MappedVectorIndex(path, flush_delay=60)
+    assert not reader.built
+
+    writer.build(vectors.items())
+    query = rng.normal(size=16)
+    assert reader.built and reader.generation == 1
+    assert [article_id for article_id, _ in reader.search(query, top_k=5)] == brute_force(vectors, query, 5)
+
+    writer.upsert(500, query)
+    assert writer.remove(1)
+    assert writer.search(query, top_k=1)[0][0] == 500
+    assert 500 not in reader and 1 in reader
+
+    writer.flush()
+    assert len(reader) == 100 and reader.generation == 2
+    assert reader.search(query, top_k=1)[0][0] == 500
+    assert 1 not in reader
+    allowed = np.array([2, 3, 500], dtype=np.int64)
+    assert [article_id for article_id, _ in reader.search(query, top_k=5, allowed_ids=allowed)][0] == 500
+    assert len(reader.search(query, top_k=5, allowed_ids=allowed)) == 3
+
+
+def test_reused_mapped_index_recovers_writes_lost_in_a_crash(tmp_path):
+    """Test reconciling a reused file against the stored vectors restores unflushed writes."""
+    rng = np.random.default_rng(4)
+    stored = {i: rng.normal(size=8) for i in range(1, 21)}
+    path = str(tmp_path / "articles.idx")
+    crashed = MappedVectorIndex(path, flush_delay=60)
+    crashed.build(stored.items())
+    # Committed to the database, but still in the overlay when the process died
+    stored[21] = rng.normal(size=8)
+    stored[5] = rng.normal(size=8)
+    del stored[7]
+    crashed.upsert(21, stored[21])
+    crashed.upsert(5, stored[5])
+    crashed.remove(7)
+    crashed._timer.cancel()
+
+    restarted = MappedVectorIndex(path, flush_delay=60)
+    assert restarted.built and 21 not in restarted
+    blocks = [(np.array(ids, dtype=np.int64), np.vstack([stored[i] for i in ids])) for ids in ([1, 2, 3, 4, 5, 6, 8], sorted(stored)[7:])]
+    assert restarted.reconcile(blocks) == 3
+    assert len(restarted) == 20 and 21 in restarted and 7 not in restarted
+    assert restarted.search(stored[5], top_k=1)[0][0] == 5
+    assert MappedVectorIndex(path).generation == 2  # flushed for the other workers
+    assert restarted.reconcile(blocks) == 0
+
+
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_quantized_index_rescoring_recovers_exact_ranking(mode):
+    """Test quantized candidates rescored with full vectors match exact search."""
+    from knowledge_base_app.services.quantized_index import QuantizedIndex
+
+    rng = np.random.default_rng(4)
+    vectors = {i: rng.normal(size=64) for i in range(1, 401)}
+    index = QuantizedIndex(mode, full_vectors=lambda ids: {i: vectors[i] for i in ids}, rescore_factor=40)
+    index.build(vectors.items())
+    assert index.nbytes < 400 * 64 * 4 / 3
+
+    query = rng.normal(size=64)
+    results = index.search(query, top_k=5)
+    assert [article_id for article_id, _ in results] == brute_force(vectors, query, 5)
+    assert results[0][1] == pytest.approx(max(v @ query / np.linalg.norm(v) / np.linalg.norm(query) for v in vectors.values()), rel=1e-5)
+
+    index.upsert(999, query)
+    vectors[999] = query
+    assert index.search(query, top_k=1)[0][0] == 999
+    assert [article_id for article_id, _ in index.search(query, top_k=5, allowed_ids=np.array([1, 2]))] == \
+        brute_force({1: vectors[1], 2: vectors[2]}, query, 2)
+    assert index.remove(999) and 999 not in index
+
+
+def test_scan_top_k_over_blocks_matches_brute_force():
+    """Test the streaming heap scan agrees with exact search across block boundaries."""
+    from knowledge_base_app.services.vector_scan import scan_top_k
+
+    rng = np.random.default_rng(5)
+    vectors = {i: rng.normal(size=16) for i in range(1, 251)}
+    ids = np.array(list(vectors), dtype=np.int64)
+    matrix = np.vstack(list(vectors.values())).astype(np.float32)
+    blocks = [(ids[start: start + 32], matrix[start: start + 32]) for start in range(0, len(ids), 32)]
+
+    query = rng.normal(size=16)
+    assert [article_id for article_id, _ in scan_top_k(blocks, query, 7)] == brute_force(vectors, query, 7)
+    allowed = ids[::5]
+    assert [article_id for article_id, _ in scan_top_k(blocks, query, 3, allowed_ids=allowed)] == \
+        brute_force({i: vectors[i] for i in allowed.tolist()}, query, 3)
+
+
+def test_streaming_scan_reads_whole_table_in_blocks(db_session, test_user):
+    """Test the database scan covers every embedded article, legacy JSON included, beyond any row cap."""
+    from knowledge_base_app.models.article import Article
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.services.search import SearchService
+    from knowledge_base_app.services.vector_scan import decode_blocks, scan_top_k
+
+    rng = np.random.default_rng(6)
+    vectors = {}
+    for i in range(30):
+        vec = rng.normal(size=8).astype(np.float32)
+        article = Article(title=f"a{i}", content="x", author_id=test_user.id)
+        if i % 3:
+            article.embedding_vector = encode_embedding(vec)
+        else:
+            article.embedding = json.dumps(vec.tolist())
+        db_session.add(article)
+        db_session.flush()
+        vectors[article.id] = vec
+    db_session.add(Article(title="unembedded", content="x", author_id=test_user.id))
+    db_session.commit()
+    repo = ArticleRepository(db_session)
+
+    assert [len(rows) for rows in repo.iter_embedding_blocks(batch_size=8)] == [8, 8, 8, 6]
+    query = rng.normal(size=8)
+    hits = scan_top_k(decode_blocks(repo.iter_embedding_blocks(batch_size=8)), query, 5)
+    assert [article_id for article_id, _ in hits] == brute_force(vectors, query, 5)
+
+    index = VectorIndex()
+    SearchService(repo, embedding_service=None, index=index).build_index()
+    assert len(index) == 30
+    assert [article_id for article_id, _ in index.search(query, top_k=5)] == brute_force(vectors, query, 5)
+
+
+def test_search_many_matches_single_queries(tmp_path):
+    """Test multi-query scoring returns the same hits as one search per query, for every index type."""
+    from knowledge_base_app.services.vector_index import top_k_hits_many
+    from knowledge_base_app.services.vector_scan import scan_top_k_many
+
+    rng = np.random.default_rng(7)
+    vectors = {i: rng.normal(size=16) for i in range(1, 121)}
+    ids = np.array(list(vectors), dtype=np.int64)
+    matrix = VectorIndex.normalize_rows(np.vstack(list(vectors.values())))
+    queries = rng.normal(size=(4, 16))
+    expected = [brute_force(vectors, query, 6) for query in queries]
+
+    blocked = top_k_hits_many(ids, matrix, VectorIndex.normalize_rows(queries), 6, block_rows=7)
+    assert [[article_id for article_id, _ in hits] for hits in blocked] == expected
+
+    exact = VectorIndex()
+    exact.build(vectors.items())
+    mapped = MappedVectorIndex(str(tmp_path / "a.idx"), flush_delay=60)
+    mapped.build(vectors.items())
+    mapped.upsert(1000, queries[0])
+    scanned = scan_top_k_many([(ids[:50], matrix[:50]), (ids[50:], matrix[50:])], queries, 6)
+    for results in (exact.search_many(queries, top_k=6), scanned):
+        assert [[article_id for article_id, _ in hits] for hits in results] == expected
+    assert [hits[0][0] for hits in mapped.search_many(queries, top_k=6)][0] == 1000
+    assert [[article_id for article_id, _ in hits] for hits in mapped.search_many(queries[1:], top_k=6)] == expected[1:]
+    allowed = ids[::3]
+    for many, single in zip(
+        exact.search_many(queries, top_k=3, allowed_ids=allowed),
+        [exact.search(query, top_k=3, allowed_ids=allowed) for query in queries],
+    ):
+        assert [article_id for article_id, _ in many] == [article_id for article_id, _ in single]
+        assert [score for _, score in many] == pytest.approx([score for _, score in single])
+
+
+def test_batch_search_uses_one_embedding_request(db_session, test_user):
+    """Test a batch of queries costs one provider request and returns hits per query."""
+    from knowledge_base_app.repositories.article import ArticleRepository
+    from knowledge_base_app.schemas.article import ArticleCreate
+    from knowledge_base_app.services.article import ArticleService
+    from knowledge_base_app.services.search import SearchService
+    from .conftest import CountingEmbeddingService
+
+    repo, index = ArticleRepository(db_session), VectorIndex()
+    articles = ArticleService(repo, CountingEmbeddingService(), index)
+    for body in ("short", "a much longer body of text"):
+        articles.create_article(ArticleCreate(title=body, content=body), test_user.id)
+
+    embeddings = CountingEmbeddingService()
+    search = SearchService(repo, embeddings, index)
+    results = search.search_articles_batch(["abc", "a much longer query text", "abc"], top_k=1)
+    assert embeddings.requests == 1
+    assert embeddings.calls == ["abc", "a much longer query text"]
+    assert [[article.title for article, _ in hits] for hits in results] == [["short"], ["a much longer body of text"], ["short"]]
+
+
+def test_sharded_index_matches_exact():
+    """Test splitting the matrix across threads does not change results."""
+    from knowledge_base_app.services.sharded_index import ShardedVectorIndex
+
+    rng = np.random.default_rng(8)
+    vectors = {i: rng.normal(size=16) for i in range(1, 301)}
+    index = ShardedVectorIndex(shards=4, min_shard_rows=10)
+    index.build(vectors.items())
+    assert len(index._shards(None)) == 4
+
+    queries = rng.normal(size=(3, 16))
+    for query, hits in zip(queries, index.search_many(queries, top_k=5)):
+        assert [article_id for article_id, _ in index.search(query, top_k=5)] == brute_force(vectors, query, 5)
+        assert [article_id for article_id, _ in hits] == brute_force(vectors, query, 5)
+    allowed = np.arange(2, 301, 4)
+    assert [article_id for article_id, _ in index.search(queries[0], top_k=3, allowed_ids=allowed)] == \
+        brute_force({i: vectors[i] for i in allowed.tolist()}, queries[0], 3)
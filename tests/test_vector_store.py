@@ -0,0 +1,111 @@
+"""
+Conformance tests every VectorStore backend must pass.
+"""
+import numpy as np
+import pytest
+
+from knowledge_base_app.services.ivf_index import IVFIndex
+from knowledge_base_app.services.mmap_index import MappedVectorIndex
+from knowledge_base_app.services.quantized_index import QuantizedIndex
+from knowledge_base_app.services.sharded_index import ShardedVectorIndex
+from knowledge_base_app.services.vector_index import VectorIndex
+from knowledge_base_app.services.vector_store import SqlVectorStore, VectorStore
+
+from .conftest import TestingSessionLocal
+
+DIM = 16
+# Near-orthogonal vectors, so every backend (binary codes included) ranks the query's own item first
+VECTORS = {item_id: np.eye(DIM, dtype=np.float32)[item_id - 1] + 0.01 for item_id in range(1, 13)}
+# Full-precision source the quantized stores rescore from, including the vectors upserted below
+FULL_VECTORS = {**VECTORS, 40: VECTORS[1] + VECTORS[2], 99: VECTORS[3] * 2}
+
+
+@pytest.fixture(params=["numpy", "sharded", "ivf", "mmap", "int8", "binary", "sql"])
+def store(request, tmp_path):
+    if request.param == "numpy":
+        return VectorIndex(initial_capacity=4)
+    if request.param == "sharded":
+        return ShardedVectorIndex(shards=3, min_shard_rows=1)
+    if request.param == "ivf":
+        return IVFIndex(nlist=4, nprobe=4, min_train_size=8)
+    if request.param == "mmap":
+        return MappedVectorIndex(str(tmp_path / "store.idx"), flush_delay=60)
+    if request.param in QuantizedIndex.MODES:
+        return QuantizedIndex(request.param, full_vectors=lambda ids: {i: FULL_VECTORS[i] for i in ids if i in FULL_VECTORS})
+    request.getfixturevalue("db_session")
+    return SqlVectorStore(TestingSessionLocal, "articles", batch_size=5)
+
+
+def ids_of(hits):
+    return [item_id for item_id, _ in hits]
+
+
+def test_backend_implements_protocol(store):
+    """Test each backend satisfies the VectorStore protocol."""
+    assert isinstance(store, VectorStore)
+
+
+def test_upsert_count_and_delete(store):
+    """Test writes are visible to count, membership and queries."""
+    store.build(VECTORS.items())
+    assert store.built
+    assert len(store) == 12
+    assert 3 in store and 99 not in store
+
+    store.upsert(99, VECTORS[3] * 2)
+    assert len(store) == 13 and 99 in store
+    assert set(ids_of(store.search(VECTORS[3], top_k=2))) == {3, 99}
+
+    assert store.remove(3) is True
+    assert store.remove(3) is False
+    assert 3 not in store and len(store) == 12
+    assert ids_of(store.search(VECTORS[3], top_k=1)) == [99]
+
+
+def test_query_with_filter(store):
+    """Test allowed_ids restricts results to the given subset, for single and batched queries."""
+    store.build(VECTORS.items())
+    allowed = np.array([2, 5, 7], dtype=np.int64)
+
+    assert ids_of(store.search(VECTORS[5], top_k=5))[0] == 5
+    assert ids_of(store.search(VECTORS[5], top_k=1, allowed_ids=np.array([2, 7]))) in ([2], [7])
+    hits = store.search(VECTORS[7], top_k=10, allowed_ids=allowed)
+    assert ids_of(hits)[0] == 7 and set(ids_of(hits)) <= set(allowed.tolist())
+
+    queries = np.vstack([VECTORS[2], VECTORS[5], VECTORS[9]])
+    many = store.search_many(queries, top_k=2, allowed_ids=allowed)
+    assert [ids_of(hits)[0] for hits in many[:2]] == [2, 5]
+    assert all(set(ids_of(hits)) <= set(allowed.tolist()) for hits in many)
+    scores = [score for _, score in store.search(VECTORS[1], top_k=12)]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_snapshot_round_trips_between_backends(store):
+    """Test a snapshot holds every stored unit vector and can seed another store."""
+    store.build_arrays(np.array(list(VECTORS), dtype=np.int64), np.vstack(list(VECTORS.values())))
+    store.upsert(40, VECTORS[1] + VECTORS[2])
+    store.remove(12)
+
+    ids, matrix = store.snapshot()
+    order = np.argsort(ids)
+    ids, matrix = ids[order], matrix[order]
+    expected = {item_id: FULL_VECTORS[item_id] for item_id in FULL_VECTORS if item_id not in (12, 99)}
+    assert ids.tolist() == sorted(expected)
+    assert matrix == pytest.approx(VectorIndex.normalize_rows(np.vstack([expected[i] for i in ids.tolist()])), abs=1e-5)
+
+    copy = VectorIndex()
+    copy.build_arrays(ids, matrix)
+    assert ids_of(copy.search(VECTORS[4], top_k=1)) == [4]
+
+
+def test_empty_cleared_and_rebuilt_store(store):
+    """Test an empty store returns no hits and a cleared store is rebuilt with only the new contents."""
+    assert store.search(VECTORS[1], top_k=3) == []
+    assert store.search_many(np.vstack([VECTORS[1]]), top_k=3) == [[]]
+    store.build(VECTORS.items())
+    store.clear()
+    assert not store.built
+
+    store.build([(item_id, VECTORS[item_id]) for item_id in (4, 8)])
+    assert store.built and len(store) == 2
+    assert set(ids_of(store.search(VECTORS[1], top_k=5))) == {4, 8}